@@ -6,7 +6,7 @@ Telegram Bot - 主程式入口
 import asyncio
 import logging
 from telegram import Update
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, CallbackQueryHandler, ContextTypes
+from telegram.ext import Application, CommandHandler, MessageHandler, TypeHandler, filters, CallbackQueryHandler, ContextTypes
 from telegram.error import TimedOut, NetworkError
 
 # 導入配置
@@ -27,8 +27,24 @@ from handlers import (
     handle_withdraw,
     handle_customer_service,
     handle_inline_buttons,
-    handle_reply_keyboard
+    handle_reply_keyboard,
+    show_range_report,
+    show_operator_report,
+    export_report_command,
+    operator_export_command,
+    bet_log_stats_command,
+    show_leaderboard,
+    rebate_dry_run_command,
+    show_referral,
+    track_user_activity
 )
+from handlers.betting import run_confirmation_expiry_scheduler
+from handlers.auto_bet_engine import stop_all_auto_bet_sessions
+from handlers.round_settlement import run_round_loop, request_round_drain
+from handlers.rebate_engine import run_rebate_scheduler
+from handlers.task_supervisor import spawn_task, drain_tasks
+from platform_client import close_platform_client
+from state import run_idle_state_sweeper, restore_state, checkpoint_state, run_snapshot_checkpointer, run_bet_log_flusher, flush_bet_log, run_report_rollup_pruner
 
 # 日誌配置
 logging.basicConfig(
@@ -51,6 +67,9 @@ async def run_bot_async():
         .build()
     )
     
+    # 記錄用戶活動時間（group=-1，在所有處理器之前運行）
+    application.add_handler(TypeHandler(Update, track_user_activity), group=-1)
+    
     # 註冊命令處理器
     # /start - 回到主页
     application.add_handler(CommandHandler("start", start_command))
@@ -64,6 +83,22 @@ async def run_bot_async():
     application.add_handler(CommandHandler("withdraw", handle_withdraw))
     # /customerservice - 客戶服務
     application.add_handler(CommandHandler("customer_service", handle_customer_service))
+    # /range_report - 日期范围报表
+    application.add_handler(CommandHandler("range_report", show_range_report))
+    # /operator_report - 平台报表（仅限运营人员）
+    application.add_handler(CommandHandler("operator_report", show_operator_report))
+    # /export_report - 导出个人报表（CSV）
+    application.add_handler(CommandHandler("export_report", export_report_command))
+    # /operator_export - 导出平台报表（CSV，仅限运营人员）
+    application.add_handler(CommandHandler("operator_export", operator_export_command))
+    # /bet_log_stats - 投注日志统计（RTP 核对，仅限运营人员）
+    application.add_handler(CommandHandler("bet_log_stats", bet_log_stats_command))
+    # /leaderboard - 排行榜
+    application.add_handler(CommandHandler("leaderboard", show_leaderboard))
+    # /rebate_dry_run - 返水试算（仅限运营人员）
+    application.add_handler(CommandHandler("rebate_dry_run", rebate_dry_run_command))
+    # /referral - 推广链接和团队统计
+    application.add_handler(CommandHandler("referral", show_referral))
     
     # 註冊回調查詢處理器（處理 Inline 按鈕點擊）
     application.add_handler(CallbackQueryHandler(handle_inline_buttons))
@@ -103,11 +138,51 @@ async def run_bot_async():
     await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
     logger.info("Telegram Bot 已啟動並開始輪詢")
     
+    # 啟動閒置用戶臨時狀態清理器和定期快照
+    sweeper_task = asyncio.create_task(run_idle_state_sweeper())
+    checkpointer_task = asyncio.create_task(run_snapshot_checkpointer())
+    # 啟動投注日誌定期寫盤
+    bet_log_task = asyncio.create_task(run_bet_log_flusher())
+    # 啟動過期日報表數據的每日清理
+    rollup_pruner_task = asyncio.create_task(run_report_rollup_pruner())
+    # 啟動投注確認超時調度器（所有確認共用一個任務）
+    confirmation_task = asyncio.create_task(run_confirmation_expiry_scheduler(application.bot))
+    # 啟動每日返水結算（啟動時先補結算前一天）
+    rebate_task = asyncio.create_task(run_rebate_scheduler())
+    # 啟動哈希輪次循環（所有投注按輪次批量開獎，並推進自動下注；由任務管理器持有，關閉時排空）
+    spawn_task("round_loop", run_round_loop())
+    
     # 保持運行直到停止
     try:
         await asyncio.Event().wait()  # 永遠等待
     except asyncio.CancelledError:
+        sweeper_task.cancel()
+        checkpointer_task.cancel()
+        bet_log_task.cancel()
+        rollup_pruner_task.cancel()
+        confirmation_task.cancel()
+        rebate_task.cancel()
         await application.updater.stop()
+        # 停止接收更新後，讓自動下注在當次開獎後停止，並等待待開獎的輪次、充值和消息發送完成
+        stopped = stop_all_auto_bet_sessions()
+        request_round_drain()
+        if stopped:
+            logger.info(f"已要求 {stopped} 個自動下注在當次下注完成後停止")
+        cancelled = await drain_tasks()
+        if cancelled:
+            logger.warning(f"關閉時取消了 {cancelled} 個未完成的後台任務")
+        # 把排空期間開獎的投注寫入投注日誌
+        try:
+            await flush_bet_log()
+        except Exception as e:
+            logger.error(f"關閉前寫入投注日誌失敗: {e}", exc_info=True)
+        # 寫入最後一次快照（包含排空期間完成的派獎和退款）
+        try:
+            await checkpoint_state()
+        except Exception as e:
+            logger.error(f"關閉前寫入狀態快照失敗: {e}", exc_info=True)
+        # 關閉網投平台的連接池
+        await close_platform_client()
         await application.stop()
         await application.shutdown()
 
@@ -124,6 +199,9 @@ async def main():
         print("="*60 + "\n")
         return
     
+    # 從快照恢復上次運行的狀態
+    restore_state()
+    
     # 運行 Bot
     await run_bot_async()
 
@@ -0,0 +1,163 @@
+"""
+回調數據編碼模組
+把 Inline 按鈕的 callback_data 編碼為短令牌：「~」+ base64url（無填充）字節串
+字節串為 [schema 版本][動作ID][參數...]，參數按 schema 中聲明的類型逐個編碼：
+- uint：無符號 LEB128 變長整數（0-127 只佔一個字節）
+- numstr：非負整數字符串（如投注金額 "50"），按 uint 編碼，解碼後還原為字符串
+- enum：取值在 schema 中的下標，一個字節
+
+已發出的按鈕在用戶點擊前會一直存在，因此已發布的 schema 不能修改：
+新增動作可以在當前版本追加新的動作ID，修改已有動作的參數或取值必須增加版本號並保留舊版本
+"""
+
+import base64
+
+# 令牌前綴（不在 base64url 字母表中，與舊的文字 callback_data 不會混淆）
+CALLBACK_TOKEN_PREFIX = "~"
+
+# 編碼時使用的 schema 版本
+CALLBACK_SCHEMA_VERSION = 1
+
+# 報表的遊戲類型（「总计」和 8 個遊戲，順序固定）
+_REPORT_GAME_VALUES = ("总计", "哈希转盘", "哈希大小", "哈希单双", "幸运哈希", "幸运庄闲", "平倍牛牛", "十倍牛牛", "百家乐")
+
+# 提款密碼鍵盤的按鍵
+_PASSWORD_KEY_VALUES = ("0", "1", "2", "3", "4", "5", "6", "7", "8", "9", "cancel", "delete")
+
+# 提款方式
+_WITHDRAW_METHOD_VALUES = ("bank_card", "trc20", "erc20")
+
+# 排行榜的週期和指標
+_LEADERBOARD_PERIOD_VALUES = ("day", "week")
+_LEADERBOARD_METRIC_VALUES = ("volume", "payout")
+
+# 各版本的 schema
+# key: 版本, value: {動作ID: (動作名稱, ((參數名, 類型, enum 取值), ...))}
+CALLBACK_SCHEMAS: dict[int, dict[int, tuple[str, tuple[tuple[str, str, tuple[str, ...] | None], ...]]]] = {
+    1: {
+        1: ("daily_report_prev_day", ()),
+        2: ("daily_report_next_day", ()),
+        3: ("daily_report_game", (("game_name", "enum", _REPORT_GAME_VALUES),)),
+        4: ("monthly_report_prev_month", ()),
+        5: ("monthly_report_next_month", ()),
+        6: ("monthly_report_game", (("game_name", "enum", _REPORT_GAME_VALUES),)),
+        7: ("pwd", (("key", "enum", _PASSWORD_KEY_VALUES),)),
+        8: ("withdraw_method", (("method", "enum", _WITHDRAW_METHOD_VALUES),)),
+        9: ("confirm_bet", (("bet_amount", "numstr", None),)),
+        10: ("confirm_auto_bet_stop", (("bet_amount", "numstr", None),)),
+        11: ("confirm_auto_bet", (("bet_amount", "numstr", None), ("bet_count", "uint", None))),
+        12: ("official_service", ()),
+        13: ("leaderboard", (
+            ("period", "enum", _LEADERBOARD_PERIOD_VALUES),
+            ("metric", "enum", _LEADERBOARD_METRIC_VALUES),
+            ("game_name", "enum", _REPORT_GAME_VALUES)
+        )),
+    },
+}
+
+# 當前版本的 動作名稱 -> (動作ID, 參數定義)
+_ENCODE_TABLE = {
+    name: (action_id, params)
+    for action_id, (name, params) in CALLBACK_SCHEMAS[CALLBACK_SCHEMA_VERSION].items()
+}
+
+
+def _write_uint(out: bytearray, value: int) -> None:
+    """寫入一個無符號 LEB128 整數"""
+    if value < 0:
+        raise ValueError(f"不能編碼負數: {value}")
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_uint(raw: bytes, position: int) -> tuple[int, int]:
+    """讀取一個無符號 LEB128 整數，返回 (值, 下一個位置)"""
+    value = 0
+    shift = 0
+    while True:
+        byte = raw[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, position
+        shift += 7
+
+
+def is_callback_token(data: str) -> bool:
+    """callback_data 是否為編碼後的令牌"""
+    return data.startswith(CALLBACK_TOKEN_PREFIX)
+
+
+def get_callback_actions() -> set[str]:
+    """當前 schema 版本的所有動作名稱"""
+    return set(_ENCODE_TABLE)
+
+
+def encode_callback(action: str, **params) -> str:
+    """
+    把動作和參數編碼為 callback_data 令牌
+    :param action: 動作名稱（見 CALLBACK_SCHEMAS）
+    :param params: 動作的參數
+    :return: 令牌（如 "~AQs0ZA"）
+    :raises KeyError: 動作不存在或缺少參數
+    :raises ValueError: 參數值不能按聲明的類型編碼
+    """
+    action_id, specs = _ENCODE_TABLE[action]
+    out = bytearray((CALLBACK_SCHEMA_VERSION, action_id))
+    for name, kind, values in specs:
+        value = params[name]
+        if kind == "enum":
+            out.append(values.index(value))
+        elif kind == "numstr":
+            _write_uint(out, int(str(value), 10))
+        else:
+            _write_uint(out, int(value))
+    return CALLBACK_TOKEN_PREFIX + base64.urlsafe_b64encode(bytes(out)).rstrip(b"=").decode("ascii")
+
+
+def decode_callback(data: str) -> tuple[str, dict[str, object]] | None:
+    """
+    解碼 callback_data 令牌
+    :param data: callback_data
+    :return: (動作名稱, 參數)；不是令牌、版本或動作未知、數據損壞時返回 None
+    """
+    if not data.startswith(CALLBACK_TOKEN_PREFIX):
+        return None
+    encoded = data[len(CALLBACK_TOKEN_PREFIX):]
+    try:
+        raw = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+        schema = CALLBACK_SCHEMAS.get(raw[0])
+        if schema is None or raw[1] not in schema:
+            return None
+        action, specs = schema[raw[1]]
+        params: dict[str, object] = {}
+        position = 2
+        for name, kind, values in specs:
+            if kind == "enum":
+                params[name] = values[raw[position]]
+                position += 1
+            else:
+                value, position = _read_uint(raw, position)
+                params[name] = str(value) if kind == "numstr" else value
+    except (ValueError, IndexError):
+        return None
+    if position != len(raw):
+        return None
+    return action, params
+
+
+__all__ = [
+    'CALLBACK_TOKEN_PREFIX',
+    'CALLBACK_SCHEMA_VERSION',
+    'CALLBACK_SCHEMAS',
+    'is_callback_token',
+    'get_callback_actions',
+    'encode_callback',
+    'decode_callback'
+]
@@ -10,16 +10,22 @@ from handlers.commands import (
     handle_profile,
     handle_deposit,
     handle_withdraw,
-    handle_customer_service
+    handle_customer_service,
+    show_referral
 )
 from handlers.callbacks import handle_inline_buttons
 from handlers.keyboard import handle_reply_keyboard
 from handlers.reports import (
     show_daily_report,
-    show_monthly_report
+    show_monthly_report,
+    show_range_report,
+    show_operator_report
 )
+from handlers.report_export import export_report_command, operator_export_command, bet_log_stats_command
+from handlers.leaderboard import show_leaderboard
+from handlers.rebate_engine import rebate_dry_run_command
 from handlers.betting import execute_single_bet
-from handlers.base import return_to_home, handle_user_registration_and_login
+from handlers.base import return_to_home, handle_user_registration_and_login, track_user_activity
 
 __all__ = [
     'start_command',
@@ -32,7 +38,16 @@ __all__ = [
     'handle_reply_keyboard',
     'show_daily_report',
     'show_monthly_report',
+    'show_range_report',
+    'show_operator_report',
+    'export_report_command',
+    'operator_export_command',
+    'bet_log_stats_command',
+    'show_leaderboard',
+    'rebate_dry_run_command',
+    'show_referral',
     'execute_single_bet',
     'return_to_home',
-    'handle_user_registration_and_login'
+    'handle_user_registration_and_login',
+    'track_user_activity'
 ]
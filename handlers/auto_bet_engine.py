@@ -0,0 +1,306 @@
+"""
+自動下注引擎
+所有用戶的自動下注（固定次數和下注到點擊停止）在每個哈希輪次結束時統一推進：
+上一輪次的一注由輪次開獎模組批量開獎後，引擎檢查每個會話的停止條件並為仍在進行的會話下一注，
+產生的消息交給 outbound 發送通道按聊天順序發送
+推進成本與進行中的投注數成正比，不再為每個用戶保留一個睡眠中的協程
+"""
+
+import logging
+from datetime import datetime
+
+from messages import (
+    get_bet_success_message,
+    get_waiting_hash_message,
+    get_auto_bet_start_message,
+    get_auto_bet_stop_bet_message
+)
+from state import (
+    from_micros,
+    to_micros,
+    get_user_usdt_balance,
+    deduct_user_balance,
+    get_user_state,
+    set_user_state,
+    set_user_betting_source,
+    set_user_auto_bet_amount,
+    set_user_auto_bet_count,
+    set_user_auto_bet_continuous
+)
+from handlers.betting import send_bet_result
+from handlers.round_oracle import RoundResult
+from handlers.round_settlement import place_round_bet, register_round_hook
+from keyboards import get_hash_wheel_betting_keyboard, get_stop_betting_keyboard
+
+logger = logging.getLogger(__name__)
+
+
+class AutoBetSession:
+    """一個用戶的自動下注會話（停止條件都在這一條記錄上判斷）"""
+
+    __slots__ = (
+        "bot",
+        "user_id",
+        "chat_id",
+        "bet_amount",
+        "bet_amount_float",
+        "target_count",
+        "placed_count",
+        "pending_stake",
+        "result",
+        "stop_requested"
+    )
+
+    def __init__(self, bot, user_id: int, chat_id: int, bet_amount: str, target_count: int | None):
+        """
+        :param bot: Bot 對象（用於發送消息）
+        :param user_id: 用戶ID
+        :param chat_id: 聊天ID
+        :param bet_amount: 每次下注金額（字符串）
+        :param target_count: 下注次數，None 表示下注到點擊停止
+        """
+        self.bot = bot
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.bet_amount = bet_amount
+        self.bet_amount_float = float(bet_amount)
+        self.target_count = target_count
+        # 已下注次數（含等待開獎的一注）
+        self.placed_count = 0
+        # 已扣款、等待輪次開獎的投注金額
+        self.pending_stake: float | None = None
+        # 上一注的開獎結果（彩金, 派彩後餘額, 開獎時間, 輪次結果），由輪次開獎回調寫入
+        self.result: tuple[float, float, datetime, RoundResult] | None = None
+        self.stop_requested = False
+
+    @property
+    def continuous(self) -> bool:
+        return self.target_count is None
+
+
+# 進行中的自動下注會話
+# key: user_id, value: 會話
+_sessions: dict[int, AutoBetSession] = {}
+
+
+def start_auto_bet_session(bot, chat_id: int, user_id: int, bet_amount: str, count: int | None) -> AutoBetSession:
+    """
+    開始自動下注（第一注在下一個輪次開始時下注，開始消息由調用方發送）
+    用戶已有進行中的會話時，沿用該會話（含等待開獎的一注）並改為新的金額和次數
+    :param bot: Bot 對象
+    :param chat_id: 聊天ID
+    :param user_id: 用戶ID
+    :param bet_amount: 每次下注金額（字符串）
+    :param count: 下注次數，None 表示下注到點擊停止
+    :return: 會話
+    """
+    session = _sessions.get(user_id)
+    if session is None:
+        session = AutoBetSession(bot, user_id, chat_id, bet_amount, count)
+        _sessions[user_id] = session
+    else:
+        logger.info(f"用戶 {user_id} 已有進行中的自動下注，改為新的設置")
+        session.chat_id = chat_id
+        session.bet_amount = bet_amount
+        session.bet_amount_float = float(bet_amount)
+        session.target_count = count
+        session.placed_count = 0
+        session.stop_requested = False
+
+    # 同步舊的自動下注狀態（菜單處理和閒置清理依賴這些狀態判斷是否在自動下注）
+    set_user_auto_bet_count(user_id, count)
+    set_user_auto_bet_continuous(user_id, count is None)
+    set_user_state(user_id, "auto_bet_stopping")
+
+    logger.info(f"用戶 {user_id} 開始自動下注，金額: {bet_amount}元，次數: {count if count is not None else '持續'}")
+    return session
+
+
+def stop_auto_bet_session(user_id: int) -> bool:
+    """
+    要求停止用戶的自動下注（等待開獎的一注仍會在本輪次開獎）
+    :param user_id: 用戶ID
+    :return: 是否有進行中的會話
+    """
+    set_user_auto_bet_count(user_id, None)
+    set_user_auto_bet_continuous(user_id, False)
+    session = _sessions.get(user_id)
+    if session is None:
+        return False
+    session.stop_requested = True
+    return True
+
+
+def stop_all_auto_bet_sessions() -> int:
+    """
+    要求所有自動下注在當次下注開獎後停止（關閉 Bot 前調用）
+    :return: 被停止的會話數量
+    """
+    for user_id in list(_sessions):
+        stop_auto_bet_session(user_id)
+    return len(_sessions)
+
+
+def get_auto_bet_session_count() -> int:
+    """進行中的自動下注會話數量"""
+    return len(_sessions)
+
+
+def _progress(session: AutoBetSession) -> str:
+    """已完成次數（用於停止消息）"""
+    return f"{session.placed_count}/{session.target_count}"
+
+
+def _make_settle_callback(session: AutoBetSession):
+    """生成記錄開獎結果的回調（消息在輪次處理函數中統一生成）"""
+    def on_settled(payout_micros: int, balance_micros: int, settled_at: datetime, round_result: RoundResult) -> None:
+        session.result = (from_micros(payout_micros), from_micros(balance_micros), settled_at, round_result)
+    return on_settled
+
+
+def _take_result(session: AutoBetSession, messages: list) -> None:
+    """取出上一注的開獎結果，生成結果消息"""
+    stake = session.pending_stake
+    bonus_amount, final_balance, settled_at, round_result = session.result
+    session.pending_stake = None
+    session.result = None
+    if bonus_amount > 0:
+        logger.info(f"用戶 {session.user_id} 中獎，彩金: {bonus_amount:.2f} USDT，當前餘額: {final_balance:.2f} USDT")
+    else:
+        logger.info(f"用戶 {session.user_id} 未中獎，當前餘額: {final_balance:.2f} USDT")
+    messages.append(("result", stake, bonus_amount, final_balance, settled_at, round_result))
+
+
+def _stop_reason(session: AutoBetSession) -> str | None:
+    """
+    檢查會話是否應該結束
+    :return: 結束原因（"stopped"、"completed"），繼續下注時返回 None
+    """
+    if session.stop_requested:
+        return "stopped"
+    # 固定次數下注時用戶離開了停止下注菜單，視為停止
+    if not session.continuous and get_user_state(session.user_id) != "auto_bet_stopping":
+        return "stopped"
+    if not session.continuous and session.placed_count >= session.target_count:
+        return "completed"
+    return None
+
+
+def _place(session: AutoBetSession, messages: list) -> bool:
+    """
+    為會話下一注（原子扣款）
+    :return: 是否下注成功（餘額不足時返回 False）
+    """
+    user_id = session.user_id
+    if not deduct_user_balance(user_id, session.bet_amount_float):
+        return False
+
+    session.pending_stake = session.bet_amount_float
+    session.placed_count += 1
+    place_round_bet(user_id, to_micros(session.bet_amount_float), _make_settle_callback(session))
+    new_balance = get_user_usdt_balance(user_id)
+    logger.info(f"用戶 {user_id} 執行自動下注第 {session.placed_count} 次，金額: {session.bet_amount_float:.2f} USDT，剩餘餘額: {new_balance:.2f} USDT")
+
+    if session.continuous:
+        messages.append(("text", get_auto_bet_stop_bet_message(session.placed_count, session.bet_amount, f"{new_balance:.2f}")))
+    else:
+        messages.append(("text", get_bet_success_message(f"{session.bet_amount_float:.2f}", f"{new_balance:.2f}")))
+        messages.append(("text", get_auto_bet_start_message(session.placed_count, session.target_count, session.bet_amount)))
+    messages.append(("text", get_waiting_hash_message()))
+    return True
+
+
+def _finish(session: AutoBetSession, reason: str, messages: list) -> None:
+    """結束會話：清理狀態並返回到哈希轉盤投注菜單"""
+    user_id = session.user_id
+    del _sessions[user_id]
+
+    if reason == "insufficient":
+        balance = get_user_usdt_balance(user_id)
+        if session.continuous:
+            messages.append(("text", f"余额不足，自动下注已停止。当前余额：{balance:.2f} USDT"))
+        else:
+            messages.append(("text", f"余额不足，自动下注已停止。当前余额：{balance:.2f} USDT，已完成 {_progress(session)} 次"))
+    elif reason == "error" and not session.continuous:
+        messages.append(("text", f"自动下注过程中发生错误，已停止。实际完成 {_progress(session)} 次"))
+    elif reason == "stopped" and not session.continuous:
+        messages.append(("text", f"已停止自动下注，已完成 {_progress(session)} 次"))
+    elif reason == "completed" and not session.continuous:
+        messages.append(("text", f"自动下注 {session.target_count} 次已完成（实际完成 {session.placed_count} 次）"))
+
+    set_user_auto_bet_continuous(user_id, False)
+    set_user_auto_bet_amount(user_id, None)
+    set_user_auto_bet_count(user_id, None)
+    # 用戶仍停留在停止下注菜單時才返回投注菜單（點擊停止或離開時菜單已由對應處理器切換）
+    if get_user_state(user_id) == "auto_bet_stopping":
+        messages.append(("menu", "请选择"))
+        set_user_state(user_id, "beginner_room_betting")
+        set_user_betting_source(user_id, "hash_wheel")
+    logger.info(f"用戶 {user_id} 自動下注結束（{reason}），共完成 {session.placed_count} 次")
+
+
+def _make_session_send(session: AutoBetSession, messages: list):
+    """把一個會話在本輪次產生的消息合併成一個發送函數（按順序發送）"""
+    bot = session.bot
+    chat_id = session.chat_id
+    user_id = session.user_id
+
+    async def send() -> None:
+        for message in messages:
+            kind = message[0]
+            if kind == "text":
+                await bot.send_message(chat_id=chat_id, text=message[1], reply_markup=get_stop_betting_keyboard())
+            elif kind == "result":
+                _, stake, bonus_amount, final_balance, bet_time, round_result = message
+                await send_bet_result(
+                    bot, chat_id, user_id, stake, bonus_amount, final_balance, bet_time, round_result,
+                    reply_markup=get_stop_betting_keyboard()
+                )
+            elif kind == "menu":
+                await bot.send_message(chat_id=chat_id, text=message[1], reply_markup=get_hash_wheel_betting_keyboard())
+    return send
+
+
+def advance_auto_bets() -> list:
+    """
+    推進所有會話（每個輪次開獎後由輪次循環調用）：取出開獎結果、檢查停止條件、下一注
+    上一注尚未開獎的會話（本輪次中途開始的）跳過，等下一輪次
+    :return: 需要發送的 [(chat_id, send)]
+    """
+    sends = []
+
+    for session in list(_sessions.values()):
+        if session.pending_stake is not None and session.result is None:
+            continue
+        messages = []
+        try:
+            if session.result is not None:
+                _take_result(session, messages)
+
+            reason = _stop_reason(session)
+            if reason is None and not _place(session, messages):
+                reason = "insufficient"
+            if reason is not None:
+                _finish(session, reason, messages)
+        except Exception as e:
+            logger.error(f"推進用戶 {session.user_id} 的自動下注時發生錯誤: {e}", exc_info=True)
+            if _sessions.get(session.user_id) is session:
+                _finish(session, "error", messages)
+
+        if messages:
+            sends.append((session.chat_id, _make_session_send(session, messages)))
+
+    return sends
+
+
+register_round_hook(advance_auto_bets)
+
+
+__all__ = [
+    'AutoBetSession',
+    'start_auto_bet_session',
+    'stop_auto_bet_session',
+    'stop_all_auto_bet_sessions',
+    'get_auto_bet_session_count',
+    'advance_auto_bets'
+]
@@ -9,43 +9,53 @@ from telegram.ext import ContextTypes
 
 from messages import (
     get_user_check_message,
-    get_account_info_message
+    get_account_info_message,
+    get_platform_unavailable_message
 )
 from keyboards import get_home_keyboard
 from state import (
     set_user_state,
+    touch_user_activity,
     get_user_account,
     get_user_password,
     get_user_usdt_balance
 )
-from platform_api import (
-    check_user_exists,
-    register_user,
-    login_user,
-    check_user_login_status
-)
+from platform_api import check_user_login_status
+from platform_client import get_platform_client, PlatformAPIError
 from handlers.utils import send_photo_with_cache
 
 logger = logging.getLogger(__name__)
 
 
+async def track_user_activity(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    記錄用戶活動時間（在所有處理器之前運行，用於閒置狀態淘汰）
+    :param update: Telegram Update 對象
+    :param context: Context 對象
+    """
+    if update.effective_user:
+        touch_user_activity(update.effective_user.id)
+
+
 async def handle_user_registration_and_login(update: Update, context: ContextTypes.DEFAULT_TYPE) -> tuple[str, str]:
     """
     處理用戶註冊和登入邏輯
     :param update: Telegram Update 對象
     :param context: Context 對象
     :return: (說明報文, 賬戶信息訊息) 元組
+    :raises PlatformAPIError: 網投平台請求失敗
     """
     user = update.effective_user
     user_id = user.id
+    client = get_platform_client()
     
     # 檢查TG ID用戶是否存在
-    user_exists = check_user_exists(user_id)
+    user_exists = await client.user_exists(user_id)
     user_logged_in = False
     
     if not user_exists:
         # 如果沒有這個TG ID用戶，於網投平台註冊該TG用戶
-        username, password = register_user(user)
+        username, password = await client.register_user(user)
         show_password = False  # 新註冊用戶不顯示密碼
         user_logged_in = False
         logger.info(f"新用戶註冊: TG ID={user_id}, 用戶名={username}")
@@ -62,7 +72,7 @@ async def handle_user_registration_and_login(update: Update, context: ContextTyp
             logger.info(f"用戶已登入: TG ID={user_id}, 用戶名={username}")
         else:
             # 用戶無登入，幫用戶登入，不顯示密碼
-            login_user(user_id)
+            await client.login_user(user_id)
             show_password = False
             user_logged_in = True  # 登入後視為已登入
             logger.info(f"幫用戶登入: TG ID={user_id}, 用戶名={username}")
@@ -95,7 +105,12 @@ async def return_to_home(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     user_id = update.effective_user.id
     
     # 處理用戶註冊和登入，獲取說明報文和賬戶信息訊息
-    check_message, account_message = await handle_user_registration_and_login(update, context)
+    try:
+        check_message, account_message = await handle_user_registration_and_login(update, context)
+    except PlatformAPIError as e:
+        logger.error(f"用戶 {user_id} 返回首頁時網投平台請求失敗: {e}")
+        await update.message.reply_text(get_platform_unavailable_message())
+        return
     
     # 發送主要圖片和說明報文（作為圖片caption）
     await send_photo_with_cache(
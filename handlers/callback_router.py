@@ -0,0 +1,188 @@
+"""
+Inline 按鈕回調路由模組
+導入時把註冊的 callback_data 模式編譯成按「_」分段的前綴樹，分派時沿樹走一遍即可取得處理函數和參數
+固定分段優先於參數分段，與註冊順序無關；同一模式重複註冊或同一位置的參數定義衝突會在導入時報錯
+
+模式語法（以「_」分段）：
+- 固定文字：official_service
+- 參數：confirm_bet_{amount}，參數值為字符串
+- 整數參數：confirm_auto_bet_{amount}_{count:int}，轉換失敗視為不匹配
+- 剩餘參數：withdraw_method_{method:rest}，匹配剩下的所有分段（可包含「_」），只能放在最後
+
+新發出的按鈕使用 callback_codec.py 編碼的短令牌，按動作名稱直接查表分派；
+文字模式保留用於分派更新前已發出的按鈕
+"""
+
+import re
+from typing import Awaitable, Callable
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from callback_codec import decode_callback, get_callback_actions, is_callback_token
+
+# 回調處理函數：(update, context, **模式中的參數)
+CallbackHandler = Callable[..., Awaitable[None]]
+
+_PARAM_PATTERN = re.compile(r"\{(\w+)(?::(int|rest))?\}")
+
+# 模式按「_」分段，參數名中的「_」不分段
+_PATTERN_SEPARATOR = re.compile(r"_(?![^{]*\})")
+
+_CONVERTERS: dict[str, Callable[[str], object]] = {
+    "str": str,
+    "int": int,
+    "rest": str,
+}
+
+
+class _RouteNode:
+    """前綴樹節點"""
+
+    __slots__ = ("children", "param", "param_node", "handler", "pattern")
+
+    def __init__(self):
+        # 固定分段 -> 子節點
+        self.children: dict[str, _RouteNode] = {}
+        # 參數分段：(參數名, 類型)，每個節點最多一個
+        self.param: tuple[str, str] | None = None
+        self.param_node: _RouteNode | None = None
+        self.handler: CallbackHandler | None = None
+        self.pattern: str | None = None
+
+
+_root = _RouteNode()
+
+# 令牌動作路由表
+# key: 動作名稱（見 callback_codec.CALLBACK_SCHEMAS）, value: 處理函數
+_action_routes: dict[str, CallbackHandler] = {}
+
+
+def callback_route(pattern: str, action: str | None = None):
+    """
+    裝飾器：註冊 callback_data 模式的處理函數
+    :param pattern: callback_data 模式
+    :param action: 對應的令牌動作名稱（參數名必須與模式一致）
+    :raises ValueError: 模式重複、參數定義衝突、剩餘參數不在最後，或動作不存在/重複註冊
+    """
+    def decorator(handler: CallbackHandler) -> CallbackHandler:
+        register_callback_route(pattern, handler)
+        if action is not None:
+            register_action_route(action, handler)
+        return handler
+    return decorator
+
+
+def register_action_route(action: str, handler: CallbackHandler) -> None:
+    """
+    註冊令牌動作的處理函數
+    :param action: 動作名稱
+    :param handler: 處理函數
+    :raises ValueError: 動作不在 schema 中或重複註冊
+    """
+    if action not in get_callback_actions():
+        raise ValueError(f"回調動作不存在: {action}")
+    if action in _action_routes:
+        raise ValueError(f"回調動作重複註冊: {action}")
+    _action_routes[action] = handler
+
+
+def register_callback_route(pattern: str, handler: CallbackHandler) -> None:
+    """
+    註冊 callback_data 模式的處理函數
+    :param pattern: callback_data 模式
+    :param handler: 處理函數
+    :raises ValueError: 模式重複、參數定義衝突或剩餘參數不在最後
+    """
+    segments = _PATTERN_SEPARATOR.split(pattern)
+    node = _root
+    for position, segment in enumerate(segments):
+        match = _PARAM_PATTERN.fullmatch(segment)
+        if match is None:
+            node = node.children.setdefault(segment, _RouteNode())
+            continue
+        param = (match.group(1), match.group(2) or "str")
+        if param[1] == "rest" and position != len(segments) - 1:
+            raise ValueError(f"剩餘參數必須是最後一段: {pattern}")
+        if node.param is None:
+            node.param = param
+            node.param_node = _RouteNode()
+        elif node.param != param:
+            raise ValueError(f"回調路由參數衝突: {pattern}（同一位置已定義 {node.param}）")
+        node = node.param_node
+
+    if node.handler is not None:
+        raise ValueError(f"回調路由重複註冊: {pattern}（已有 {node.pattern}）")
+    node.handler = handler
+    node.pattern = pattern
+
+
+def _match(node: _RouteNode, segments: list[str], position: int, params: dict[str, object]) -> _RouteNode | None:
+    """從 node 開始匹配 segments[position:]，固定分段優先，失敗時回退到參數分段"""
+    if position == len(segments):
+        return node if node.handler is not None else None
+
+    child = node.children.get(segments[position])
+    if child is not None:
+        found = _match(child, segments, position + 1, params)
+        if found is not None:
+            return found
+
+    if node.param is None:
+        return None
+    name, kind = node.param
+    if kind == "rest":
+        params[name] = "_".join(segments[position:])
+        return node.param_node if node.param_node.handler is not None else None
+    try:
+        params[name] = _CONVERTERS[kind](segments[position])
+    except ValueError:
+        return None
+    found = _match(node.param_node, segments, position + 1, params)
+    if found is None:
+        params.pop(name, None)
+    return found
+
+
+def resolve_callback_route(data: str) -> tuple[CallbackHandler, dict[str, object]] | None:
+    """
+    查找 callback_data 對應的處理函數
+    :param data: callback_data（令牌或文字）
+    :return: (處理函數, 參數)，沒有匹配的模式時返回 None
+    """
+    if is_callback_token(data):
+        decoded = decode_callback(data)
+        if decoded is None:
+            return None
+        action, params = decoded
+        handler = _action_routes.get(action)
+        return (handler, params) if handler is not None else None
+
+    params: dict[str, object] = {}
+    node = _match(_root, data.split("_"), 0, params)
+    if node is None:
+        return None
+    return node.handler, params
+
+
+async def dispatch_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, data: str) -> bool:
+    """
+    分派一個回調
+    :return: 是否找到處理函數
+    """
+    route = resolve_callback_route(data)
+    if route is None:
+        return False
+    handler, params = route
+    await handler(update, context, **params)
+    return True
+
+
+__all__ = [
+    'CallbackHandler',
+    'callback_route',
+    'register_callback_route',
+    'register_action_route',
+    'resolve_callback_route',
+    'dispatch_callback'
+]
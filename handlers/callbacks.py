@@ -1,25 +1,18 @@
 """
 回調處理模組
 處理所有 Inline 按鈕點擊事件
+每個按鈕的處理函數在導入時註冊到回調路由（handlers/callback_router.py）
 """
 
-import asyncio
 import logging
 from telegram import Update
 from telegram.ext import ContextTypes
 
 from messages import get_withdraw_amount_prompt
 from state import (
-    get_user_bank_card_binding_state,
-    set_user_bank_card_binding_state,
-    get_user_wallet_binding_state,
-    set_user_wallet_binding_state,
-    get_user_deposit_withdraw_state,
-    set_user_deposit_withdraw_state,
-    get_user_withdraw_state,
+    get_user_pending_input,
     set_user_withdraw_state,
     set_user_withdraw_method,
-    set_user_withdraw_amount,
     get_user_usdt_balance,
     get_user_withdrawal_password_state,
     set_user_withdrawal_password_state,
@@ -27,21 +20,22 @@ from state import (
     set_user_withdrawal_password_input,
     get_user_withdrawal_password_confirm,
     set_user_withdrawal_password_confirm,
-    get_user_withdrawal_password_message_id,
     set_user_withdrawal_password_message_id,
-    get_user_bank_card_password,
     set_user_bank_card_password
 )
-from handlers.reports import handle_daily_report_buttons, handle_monthly_report_buttons
-from handlers.betting import execute_single_bet, start_fixed_count_auto_bet, start_continuous_auto_bet
+import handlers.reports  # noqa: F401  註冊報表按鈕的回調路由
+from handlers.betting import execute_single_bet
+from handlers.auto_bet_engine import start_auto_bet_session
 from handlers.constants import MESSAGE_FEATURE_DEVELOPING
+from handlers.task_supervisor import spawn_task
+from handlers.utils import clear_user_input_flows
+from handlers.callback_router import callback_route, dispatch_callback
 from state import (
-    get_user_bet_confirmation,
     get_user_bet_confirmation_by_message_id,
     clear_user_bet_confirmation,
-    get_user_auto_bet_confirmation,
     get_user_auto_bet_confirmation_by_message_id,
-    clear_user_auto_bet_confirmation
+    clear_user_auto_bet_confirmation,
+    BET_CONFIRMATION_TIMEOUT
 )
 from messages import (
     get_withdrawal_password_setup_message,
@@ -49,8 +43,7 @@ from messages import (
     get_withdrawal_password_success_message,
     get_withdrawal_password_mismatch_message
 )
-from keyboards import get_password_input_keyboard, get_security_center_keyboard
-from telegram import InlineKeyboardMarkup
+from keyboards import get_password_input_keyboard, get_stop_betting_keyboard, get_empty_inline_keyboard
 
 logger = logging.getLogger(__name__)
 
@@ -58,28 +51,14 @@ logger = logging.getLogger(__name__)
 async def handle_inline_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     處理 Inline 按鈕點擊（双向客服、官方客服、观战频道、日統計報表等）
+    按 callback_data 查回調路由分派
     """
     query = update.callback_query
     user_id = update.effective_user.id
     
-    # 清除所有綁定狀態（用戶點擊了 Inline 按鈕，表示要進行其他操作）
-    if get_user_bank_card_binding_state(user_id):
-        set_user_bank_card_binding_state(user_id, False)
-        logger.info(f"用戶 {user_id} 點擊 Inline 按鈕，清除銀行卡綁定狀態")
-    
-    if get_user_wallet_binding_state(user_id):
-        set_user_wallet_binding_state(user_id, None)
-        logger.info(f"用戶 {user_id} 點擊 Inline 按鈕，清除錢包綁定狀態")
-    
-    if get_user_deposit_withdraw_state(user_id):
-        set_user_deposit_withdraw_state(user_id, None)
-        logger.info(f"用戶 {user_id} 點擊 Inline 按鈕，清除充值/提款狀態")
-    
-    if get_user_withdraw_state(user_id):
-        set_user_withdraw_state(user_id, None)
-        set_user_withdraw_method(user_id, None)
-        set_user_withdraw_amount(user_id, None)
-        logger.info(f"用戶 {user_id} 點擊 Inline 按鈕，清除提款流程狀態")
+    # 清除所有輸入流程狀態（用戶點擊了 Inline 按鈕，表示要進行其他操作）
+    if get_user_pending_input(user_id) is not None:
+        clear_user_input_flows(user_id, " Inline 按鈕", include_withdrawal_password=False)
     
     # 回答回調查詢（防止 Telegram 顯示加載動畫）
     try:
@@ -90,292 +69,284 @@ async def handle_inline_buttons(update: Update, context: ContextTypes.DEFAULT_TY
     callback_data = query.data
     logger.info(f"用戶 {user_id} 點擊了 Inline 按鈕: {callback_data}")
     
-    # 處理日統計報表的按鈕
-    if callback_data.startswith("daily_report_"):
-        await handle_daily_report_buttons(update, context, callback_data)
-        return
+    if not await dispatch_callback(update, context, callback_data):
+        logger.warning(f"用戶 {user_id} 點擊了未知的 Inline 按鈕: {callback_data}")
+
+
+@callback_route("withdraw_method_{method:rest}", action="withdraw_method")
+async def _select_withdraw_method(update: Update, context: ContextTypes.DEFAULT_TYPE, method: str) -> None:
+    """處理提款方式選擇"""
+    query = update.callback_query
+    user_id = update.effective_user.id
+    set_user_withdraw_method(user_id, method)
+    set_user_withdraw_state(user_id, "enter_amount")
     
-    # 處理月統計報表的按鈕
-    if callback_data.startswith("monthly_report_"):
-        await handle_monthly_report_buttons(update, context, callback_data)
-        return
+    # 刪除選擇提款方式的消息
+    try:
+        await query.message.delete()
+    except Exception as e:
+        logger.warning(f"刪除消息失敗（可忽略）: {e}")
     
-    # 處理提款密碼輸入按鈕（優先處理，因為 pwd_ 可能與其他回調衝突）
-    if callback_data.startswith("pwd_"):
-        await handle_withdrawal_password_input(update, context, callback_data)
-        return
+    # 發送輸入金額提示
+    usdt_balance = get_user_usdt_balance(user_id)
+    await query.message.chat.send_message(get_withdraw_amount_prompt(f"{usdt_balance:.2f}"))
+    logger.info(f"用戶 {user_id} 選擇提款方式: {method}")
+
+
+@callback_route("confirm_bet_{bet_amount}", action="confirm_bet")
+async def _confirm_bet(update: Update, context: ContextTypes.DEFAULT_TYPE, bet_amount: str) -> None:
+    """處理確認下注按鈕"""
+    query = update.callback_query
+    user_id = update.effective_user.id
+    message_id = query.message.message_id
     
-    # 處理提款方式選擇
-    if callback_data.startswith("withdraw_method_"):
-        method = callback_data.replace("withdraw_method_", "")
-        set_user_withdraw_method(user_id, method)
-        set_user_withdraw_state(user_id, "enter_amount")
-        
-        # 刪除選擇提款方式的消息
+    # 根據消息ID獲取確認狀態
+    confirmation = get_user_bet_confirmation_by_message_id(user_id, message_id)
+    
+    if not confirmation:
+        # 確認狀態不存在，說明已超時或被清除
+        from messages import get_bet_timeout_message
+        # 防錯誤機制：更新消息為超時訊息
         try:
-            await query.message.delete()
+            await query.message.edit_text(
+                text=get_bet_timeout_message(),
+                reply_markup=get_empty_inline_keyboard()
+            )
         except Exception as e:
-            logger.warning(f"刪除消息失敗（可忽略）: {e}")
-        
-        # 發送輸入金額提示
-        usdt_balance = get_user_usdt_balance(user_id)
-        await query.message.chat.send_message(get_withdraw_amount_prompt(f"{usdt_balance:.2f}"))
-        logger.info(f"用戶 {user_id} 選擇提款方式: {method}")
+            logger.warning(f"更新超時消息時發生錯誤（可忽略）: {e}")
+        await query.answer(get_bet_timeout_message(), show_alert=True)
+        logger.info(f"用戶 {user_id} 嘗試確認已超時的投注，金額: {bet_amount}元")
         return
     
-    # 處理確認下注按鈕
-    if callback_data.startswith("confirm_bet_"):
-        bet_amount = callback_data.replace("confirm_bet_", "")
-        message_id = query.message.message_id
-        
-        # 根據消息ID獲取確認狀態
-        confirmation = get_user_bet_confirmation_by_message_id(user_id, message_id)
-        
-        if not confirmation:
-            # 確認狀態不存在，說明已超時或被清除
-            from messages import get_bet_timeout_message
-            # 防錯誤機制：更新消息為超時訊息
-            try:
-                await query.message.edit_text(
-                    text=get_bet_timeout_message(),
-                    reply_markup=InlineKeyboardMarkup([])
-                )
-            except Exception as e:
-                logger.warning(f"更新超時消息時發生錯誤（可忽略）: {e}")
-            await query.answer(get_bet_timeout_message(), show_alert=True)
-            logger.info(f"用戶 {user_id} 嘗試確認已超時的投注，金額: {bet_amount}元")
-            return
-        
-        # 檢查金額是否匹配
-        if confirmation.get("amount") != bet_amount:
-            from messages import get_bet_timeout_message
-            await query.answer(get_bet_timeout_message(), show_alert=True)
-            logger.info(f"用戶 {user_id} 嘗試確認金額不匹配的投注")
-            return
-        
-        # 檢查是否超時（30秒）
-        import time
-        elapsed_time = time.time() - confirmation.get("timestamp", 0)
-        if elapsed_time > 30:
-            # 已超時，防錯誤機制：更新消息為超時訊息
-            from messages import get_bet_timeout_message
-            clear_user_bet_confirmation(user_id, message_id)
-            try:
-                await query.message.edit_text(
-                    text=get_bet_timeout_message(),
-                    reply_markup=InlineKeyboardMarkup([])
-                )
-            except Exception as e:
-                logger.warning(f"更新超時消息時發生錯誤（可忽略）: {e}")
-            await query.answer(get_bet_timeout_message(), show_alert=True)
-            logger.info(f"用戶 {user_id} 確認投注時已超時，金額: {bet_amount}元")
-            return
-        
-        # 確認有效，清除確認狀態
+    # 檢查金額是否匹配
+    if confirmation.get("amount") != bet_amount:
+        from messages import get_bet_timeout_message
+        await query.answer(get_bet_timeout_message(), show_alert=True)
+        logger.info(f"用戶 {user_id} 嘗試確認金額不匹配的投注")
+        return
+    
+    # 檢查是否超時（30秒）
+    import time
+    elapsed_time = time.time() - confirmation.get("timestamp", 0)
+    if elapsed_time > BET_CONFIRMATION_TIMEOUT:
+        # 已超時，防錯誤機制：更新消息為超時訊息
+        from messages import get_bet_timeout_message
         clear_user_bet_confirmation(user_id, message_id)
-        
-        # 編輯消息，移除按鈕
         try:
-            await query.message.edit_reply_markup(reply_markup=InlineKeyboardMarkup([]))
+            await query.message.edit_text(
+                text=get_bet_timeout_message(),
+                reply_markup=get_empty_inline_keyboard()
+            )
         except Exception as e:
-            logger.warning(f"編輯確認消息時發生錯誤（可忽略）: {e}")
-        
-        # 執行投注
-        await query.answer("正在處理投注...")
-        logger.info(f"用戶 {user_id} 確認下注，金額: {bet_amount}元")
-        asyncio.create_task(
-            execute_single_bet(context, query.message.chat.id, user_id, bet_amount)
-        )
+            logger.warning(f"更新超時消息時發生錯誤（可忽略）: {e}")
+        await query.answer(get_bet_timeout_message(), show_alert=True)
+        logger.info(f"用戶 {user_id} 確認投注時已超時，金額: {bet_amount}元")
         return
     
-    # 處理確認下注到點擊停止按鈕（必須在 confirm_auto_bet_ 之前檢查，因為它是子字符串）
-    if callback_data.startswith("confirm_auto_bet_stop_"):
-        bet_amount = callback_data.replace("confirm_auto_bet_stop_", "")
-        message_id = query.message.message_id
-        
-        # 根據消息ID獲取確認狀態（count為-1表示持續下注）
-        confirmation = get_user_auto_bet_confirmation_by_message_id(user_id, message_id)
-        
-        if not confirmation:
-            # 確認狀態不存在，說明已超時或被清除
-            from messages import get_auto_bet_timeout_message
-            # 防錯誤機制：更新消息為超時訊息
-            try:
-                await query.message.edit_text(
-                    text=get_auto_bet_timeout_message(),
-                    reply_markup=InlineKeyboardMarkup([])
-                )
-            except Exception as e:
-                logger.warning(f"更新超時消息時發生錯誤（可忽略）: {e}")
-            await query.answer(get_auto_bet_timeout_message(), show_alert=True)
-            logger.info(f"用戶 {user_id} 嘗試確認已超時的下注到點擊停止，金額: {bet_amount}元")
-            return
-        
-        # 檢查參數是否匹配（count應該為-1）
-        if confirmation.get("amount") != bet_amount or confirmation.get("count") != -1:
-            from messages import get_auto_bet_timeout_message
-            await query.answer(get_auto_bet_timeout_message(), show_alert=True)
-            logger.info(f"用戶 {user_id} 嘗試確認參數不匹配的下注到點擊停止")
-            return
-        
-        # 檢查是否超時（30秒）
-        import time
-        elapsed_time = time.time() - confirmation.get("timestamp", 0)
-        if elapsed_time > 30:
-            # 已超時，防錯誤機制：更新消息為超時訊息
-            from messages import get_auto_bet_timeout_message
-            clear_user_auto_bet_confirmation(user_id, message_id)
-            try:
-                await query.message.edit_text(
-                    text=get_auto_bet_timeout_message(),
-                    reply_markup=InlineKeyboardMarkup([])
-                )
-            except Exception as e:
-                logger.warning(f"更新超時消息時發生錯誤（可忽略）: {e}")
-            await query.answer(get_auto_bet_timeout_message(), show_alert=True)
-            logger.info(f"用戶 {user_id} 確認下注到點擊停止時已超時，金額: {bet_amount}元")
-            return
-        
-        # 確認有效，清除確認狀態
-        clear_user_auto_bet_confirmation(user_id, message_id)
-        
-        # 編輯消息，移除按鈕
+    # 確認有效，清除確認狀態
+    clear_user_bet_confirmation(user_id, message_id)
+    
+    # 編輯消息，移除按鈕
+    try:
+        await query.message.edit_reply_markup(reply_markup=get_empty_inline_keyboard())
+    except Exception as e:
+        logger.warning(f"編輯確認消息時發生錯誤（可忽略）: {e}")
+    
+    # 執行投注
+    await query.answer("正在處理投注...")
+    logger.info(f"用戶 {user_id} 確認下注，金額: {bet_amount}元")
+    spawn_task(
+        "bet",
+        execute_single_bet(context, query.message.chat.id, user_id, bet_amount),
+        name=f"bet-{user_id}"
+    )
+
+
+@callback_route("confirm_auto_bet_stop_{bet_amount}", action="confirm_auto_bet_stop")
+async def _confirm_auto_bet_until_stopped(update: Update, context: ContextTypes.DEFAULT_TYPE, bet_amount: str) -> None:
+    """處理確認下注到點擊停止按鈕"""
+    query = update.callback_query
+    user_id = update.effective_user.id
+    message_id = query.message.message_id
+    
+    # 根據消息ID獲取確認狀態（count為-1表示持續下注）
+    confirmation = get_user_auto_bet_confirmation_by_message_id(user_id, message_id)
+    
+    if not confirmation:
+        # 確認狀態不存在，說明已超時或被清除
+        from messages import get_auto_bet_timeout_message
+        # 防錯誤機制：更新消息為超時訊息
         try:
-            await query.message.edit_reply_markup(reply_markup=InlineKeyboardMarkup([]))
+            await query.message.edit_text(
+                text=get_auto_bet_timeout_message(),
+                reply_markup=get_empty_inline_keyboard()
+            )
         except Exception as e:
-            logger.warning(f"編輯確認消息時發生錯誤（可忽略）: {e}")
-        
-        # 執行持續自動下注
-        await query.answer("正在開始自動下注...")
-        logger.info(f"用戶 {user_id} 確認下注到點擊停止，金額: {bet_amount}元")
-        asyncio.create_task(
-            start_continuous_auto_bet(context, query.message.chat.id, user_id, bet_amount)
-        )
+            logger.warning(f"更新超時消息時發生錯誤（可忽略）: {e}")
+        await query.answer(get_auto_bet_timeout_message(), show_alert=True)
+        logger.info(f"用戶 {user_id} 嘗試確認已超時的下注到點擊停止，金額: {bet_amount}元")
         return
     
-    # 處理確認自動下注按鈕（固定次數）
-    if callback_data.startswith("confirm_auto_bet_"):
-        # callback_data 格式: "confirm_auto_bet_{amount}_{count}"
-        parts = callback_data.replace("confirm_auto_bet_", "").split("_")
-        if len(parts) != 2:
-            logger.warning(f"無效的自動下注確認回調數據: {callback_data}")
-            return
-        
-        bet_amount = parts[0]
-        bet_count = int(parts[1])
-        message_id = query.message.message_id
-        
-        # 根據消息ID獲取確認狀態
-        confirmation = get_user_auto_bet_confirmation_by_message_id(user_id, message_id)
-        
-        if not confirmation:
-            # 確認狀態不存在，說明已超時或被清除
-            from messages import get_auto_bet_timeout_message
-            # 防錯誤機制：更新消息為超時訊息
-            try:
-                await query.message.edit_text(
-                    text=get_auto_bet_timeout_message(),
-                    reply_markup=InlineKeyboardMarkup([])
-                )
-            except Exception as e:
-                logger.warning(f"更新超時消息時發生錯誤（可忽略）: {e}")
-            await query.answer(get_auto_bet_timeout_message(), show_alert=True)
-            logger.info(f"用戶 {user_id} 嘗試確認已超時的自動下注，金額: {bet_amount}元，次數: {bet_count}次")
-            return
-        
-        # 檢查參數是否匹配
-        if confirmation.get("amount") != bet_amount or confirmation.get("count") != bet_count:
-            from messages import get_auto_bet_timeout_message
-            await query.answer(get_auto_bet_timeout_message(), show_alert=True)
-            logger.info(f"用戶 {user_id} 嘗試確認參數不匹配的自動下注，金額: {bet_amount}，次數: {bet_count}，確認狀態: {confirmation}")
-            return
-        
-        # 檢查是否超時（30秒）
-        import time
-        elapsed_time = time.time() - confirmation.get("timestamp", 0)
-        if elapsed_time > 30:
-            # 已超時，防錯誤機制：更新消息為超時訊息
-            from messages import get_auto_bet_timeout_message
-            clear_user_auto_bet_confirmation(user_id, message_id)
-            try:
-                await query.message.edit_text(
-                    text=get_auto_bet_timeout_message(),
-                    reply_markup=InlineKeyboardMarkup([])
-                )
-            except Exception as e:
-                logger.warning(f"更新超時消息時發生錯誤（可忽略）: {e}")
-            await query.answer(get_auto_bet_timeout_message(), show_alert=True)
-            logger.info(f"用戶 {user_id} 確認自動下注時已超時，金額: {bet_amount}元，次數: {bet_count}次")
-            return
-        
-        # 確認有效，清除確認狀態
+    # 檢查參數是否匹配（count應該為-1）
+    if confirmation.get("amount") != bet_amount or confirmation.get("count") != -1:
+        from messages import get_auto_bet_timeout_message
+        await query.answer(get_auto_bet_timeout_message(), show_alert=True)
+        logger.info(f"用戶 {user_id} 嘗試確認參數不匹配的下注到點擊停止")
+        return
+    
+    # 檢查是否超時（30秒）
+    import time
+    elapsed_time = time.time() - confirmation.get("timestamp", 0)
+    if elapsed_time > BET_CONFIRMATION_TIMEOUT:
+        # 已超時，防錯誤機制：更新消息為超時訊息
+        from messages import get_auto_bet_timeout_message
         clear_user_auto_bet_confirmation(user_id, message_id)
-        
-        # 編輯消息，移除按鈕
         try:
-            await query.message.edit_reply_markup(reply_markup=InlineKeyboardMarkup([]))
+            await query.message.edit_text(
+                text=get_auto_bet_timeout_message(),
+                reply_markup=get_empty_inline_keyboard()
+            )
         except Exception as e:
-            logger.warning(f"編輯確認消息時發生錯誤（可忽略）: {e}")
-        
-        # 執行自動下注
-        await query.answer("正在開始自動下注...")
-        logger.info(f"用戶 {user_id} 確認自動下注，金額: {bet_amount}元，次數: {bet_count}次")
-        
-        # 設置狀態為停止下注模式，並發送停止下注鍵盤
-        from state import set_user_state
-        from keyboards import get_stop_betting_keyboard
-        set_user_state(user_id, "auto_bet_stopping")
-        
+            logger.warning(f"更新超時消息時發生錯誤（可忽略）: {e}")
+        await query.answer(get_auto_bet_timeout_message(), show_alert=True)
+        logger.info(f"用戶 {user_id} 確認下注到點擊停止時已超時，金額: {bet_amount}元")
+        return
+    
+    # 確認有效，清除確認狀態
+    clear_user_auto_bet_confirmation(user_id, message_id)
+    
+    # 編輯消息，移除按鈕
+    try:
+        await query.message.edit_reply_markup(reply_markup=get_empty_inline_keyboard())
+    except Exception as e:
+        logger.warning(f"編輯確認消息時發生錯誤（可忽略）: {e}")
+    
+    # 執行持續自動下注
+    await query.answer("正在開始自動下注...")
+    logger.info(f"用戶 {user_id} 確認下注到點擊停止，金額: {bet_amount}元")
+    # 先發送開始消息和停止下注鍵盤，再交給自動下注引擎（保證開始消息在第一注之前）
+    try:
+        await query.message.chat.send_message(
+            "已开始持续自动下注，点击「停止下注」可停止下注",
+            reply_markup=get_stop_betting_keyboard()
+        )
+    except Exception as e:
+        logger.warning(f"發送停止下注鍵盤時發生錯誤（可忽略）: {e}")
+    start_auto_bet_session(context.bot, query.message.chat.id, user_id, bet_amount, None)
+
+
+@callback_route("confirm_auto_bet_{bet_amount}_{bet_count:int}", action="confirm_auto_bet")
+async def _confirm_auto_bet(update: Update, context: ContextTypes.DEFAULT_TYPE, bet_amount: str, bet_count: int) -> None:
+    """處理確認自動下注按鈕（固定次數）"""
+    query = update.callback_query
+    user_id = update.effective_user.id
+    message_id = query.message.message_id
+    
+    # 根據消息ID獲取確認狀態
+    confirmation = get_user_auto_bet_confirmation_by_message_id(user_id, message_id)
+    
+    if not confirmation:
+        # 確認狀態不存在，說明已超時或被清除
+        from messages import get_auto_bet_timeout_message
+        # 防錯誤機制：更新消息為超時訊息
         try:
-            await query.message.chat.send_message(
-                "已开始自动下注，点击「停止下注」可停止下注",
-                reply_markup=get_stop_betting_keyboard()
+            await query.message.edit_text(
+                text=get_auto_bet_timeout_message(),
+                reply_markup=get_empty_inline_keyboard()
             )
         except Exception as e:
-            logger.warning(f"發送停止下注鍵盤時發生錯誤（可忽略）: {e}")
-        
-        # 固定次數下注模式
-        asyncio.create_task(
-            start_fixed_count_auto_bet(context, query.message.chat.id, user_id, bet_amount, bet_count)
-        )
+            logger.warning(f"更新超時消息時發生錯誤（可忽略）: {e}")
+        await query.answer(get_auto_bet_timeout_message(), show_alert=True)
+        logger.info(f"用戶 {user_id} 嘗試確認已超時的自動下注，金額: {bet_amount}元，次數: {bet_count}次")
         return
     
-    # 處理初級房投注金額選擇（已廢棄，改用 execute_single_bet）
-    if callback_data.startswith("beginner_bet_"):
-        bet_amount = callback_data.replace("beginner_bet_", "")
-        await execute_single_bet(context, query.message.chat.id, user_id, bet_amount)
+    # 檢查參數是否匹配
+    if confirmation.get("amount") != bet_amount or confirmation.get("count") != bet_count:
+        from messages import get_auto_bet_timeout_message
+        await query.answer(get_auto_bet_timeout_message(), show_alert=True)
+        logger.info(f"用戶 {user_id} 嘗試確認參數不匹配的自動下注，金額: {bet_amount}，次數: {bet_count}，確認狀態: {confirmation}")
         return
     
-    # 處理官方客服按鈕
-    if callback_data == "official_service":
-        # 獲取機器人的 username
-        bot_info = await context.bot.get_me()
-        bot_username = bot_info.username
-        
-        # 發送系統訊息（與 /customer_service 相同）
-        message = f"请联系客服(@{bot_username})"
-        await query.message.reply_text(message)
-        logger.info(f"用戶 {user_id} 點擊官方客服按鈕，已發送客服聯繫訊息")
+    # 檢查是否超時（30秒）
+    import time
+    elapsed_time = time.time() - confirmation.get("timestamp", 0)
+    if elapsed_time > BET_CONFIRMATION_TIMEOUT:
+        # 已超時，防錯誤機制：更新消息為超時訊息
+        from messages import get_auto_bet_timeout_message
+        clear_user_auto_bet_confirmation(user_id, message_id)
+        try:
+            await query.message.edit_text(
+                text=get_auto_bet_timeout_message(),
+                reply_markup=get_empty_inline_keyboard()
+            )
+        except Exception as e:
+            logger.warning(f"更新超時消息時發生錯誤（可忽略）: {e}")
+        await query.answer(get_auto_bet_timeout_message(), show_alert=True)
+        logger.info(f"用戶 {user_id} 確認自動下注時已超時，金額: {bet_amount}元，次數: {bet_count}次")
         return
     
-    # 處理其他已廢棄的按鈕（保留以兼容舊代碼）
-    if callback_data in ("two_way_service", "official_channel", "watch_channel"):
-        await query.message.reply_text(MESSAGE_FEATURE_DEVELOPING)
+    # 確認有效，清除確認狀態
+    clear_user_auto_bet_confirmation(user_id, message_id)
+    
+    # 編輯消息，移除按鈕
+    try:
+        await query.message.edit_reply_markup(reply_markup=get_empty_inline_keyboard())
+    except Exception as e:
+        logger.warning(f"編輯確認消息時發生錯誤（可忽略）: {e}")
+    
+    # 執行自動下注
+    await query.answer("正在開始自動下注...")
+    logger.info(f"用戶 {user_id} 確認自動下注，金額: {bet_amount}元，次數: {bet_count}次")
+    
+    # 發送停止下注鍵盤，然後交給自動下注引擎（固定次數模式，會話開始時設置為停止下注狀態）
+    try:
+        await query.message.chat.send_message(
+            "已开始自动下注，点击「停止下注」可停止下注",
+            reply_markup=get_stop_betting_keyboard()
+        )
+    except Exception as e:
+        logger.warning(f"發送停止下注鍵盤時發生錯誤（可忽略）: {e}")
+    start_auto_bet_session(context.bot, query.message.chat.id, user_id, bet_amount, bet_count)
+
+
+@callback_route("beginner_bet_{bet_amount}")
+async def _beginner_bet(update: Update, context: ContextTypes.DEFAULT_TYPE, bet_amount: str) -> None:
+    """處理初級房投注金額選擇（已廢棄，改用 execute_single_bet）"""
+    await execute_single_bet(context, update.callback_query.message.chat.id, update.effective_user.id, bet_amount)
+
+
+@callback_route("official_service", action="official_service")
+async def _official_service(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """處理官方客服按鈕"""
+    query = update.callback_query
+    user_id = update.effective_user.id
+    # 獲取機器人的 username
+    bot_info = await context.bot.get_me()
+    bot_username = bot_info.username
+    
+    # 發送系統訊息（與 /customer_service 相同）
+    message = f"请联系客服(@{bot_username})"
+    await query.message.reply_text(message)
+    logger.info(f"用戶 {user_id} 點擊官方客服按鈕，已發送客服聯繫訊息")
 
 
-async def handle_withdrawal_password_input(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str):
+@callback_route("two_way_service")
+@callback_route("official_channel")
+@callback_route("watch_channel")
+async def _deprecated_button(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """處理其他已廢棄的按鈕（保留以兼容舊代碼）"""
+    await update.callback_query.message.reply_text(MESSAGE_FEATURE_DEVELOPING)
+
+
+@callback_route("pwd_{key}", action="pwd")
+async def handle_withdrawal_password_input(update: Update, context: ContextTypes.DEFAULT_TYPE, key: str):
     """
     處理提款密碼輸入的 Inline 按鈕點擊
+    :param key: 按鍵（"cancel"、"delete" 或數字 "0"-"9"）
     """
     query = update.callback_query
     user_id = update.effective_user.id
     
-    # 回答回調查詢
-    try:
-        await query.answer()
-    except Exception as e:
-        logger.warning(f"回答回調查詢時發生錯誤（可忽略）: {e}")
-    
     # 檢查用戶是否在設置提款密碼
     withdrawal_password_state = get_user_withdrawal_password_state(user_id)
     if withdrawal_password_state not in {"inputting", "confirming"}:
@@ -383,17 +354,17 @@ async def handle_withdrawal_password_input(update: Update, context: ContextTypes
         return
     
     # 處理「取消」按鈕
-    if callback_data == "pwd_cancel":
+    if key == "cancel":
         await query.message.edit_text(
             "已取消設置提款密碼",
-            reply_markup=InlineKeyboardMarkup([])
+            reply_markup=get_empty_inline_keyboard()
         )
         set_user_withdrawal_password_state(user_id, None)
         logger.info(f"用戶 {user_id} 取消設置提款密碼")
         return
     
     # 處理「删除」按鈕
-    if callback_data == "pwd_delete":
+    if key == "delete":
         current_password = ""
         if withdrawal_password_state == "inputting":
             current_password = get_user_withdrawal_password_input(user_id)
@@ -426,11 +397,8 @@ async def handle_withdrawal_password_input(update: Update, context: ContextTypes
         return
     
     # 處理數字按鈕（pwd_0 到 pwd_9）
-    if callback_data.startswith("pwd_") and len(callback_data) == 5:
-        digit = callback_data[-1]  # 獲取最後一個字符（數字）
-        
-        if digit not in "0123456789":
-            return
+    if len(key) == 1 and key in "0123456789":
+        digit = key
         
         # 獲取當前密碼
         current_password = ""
@@ -487,7 +455,7 @@ async def handle_withdrawal_password_input(update: Update, context: ContextTypes
                         set_user_bank_card_password(user_id, confirm_password)
                         await query.message.edit_text(
                             text=get_withdrawal_password_success_message(),
-                            reply_markup=InlineKeyboardMarkup([])
+                            reply_markup=get_empty_inline_keyboard()
                         )
                         set_user_withdrawal_password_state(user_id, None)
                         logger.info(f"用戶 {user_id} 提款密碼設置成功")
@@ -495,7 +463,7 @@ async def handle_withdrawal_password_input(update: Update, context: ContextTypes
                         # 密碼不一致，重新開始
                         await query.message.edit_text(
                             text=get_withdrawal_password_mismatch_message(),
-                            reply_markup=InlineKeyboardMarkup([])
+                            reply_markup=get_empty_inline_keyboard()
                         )
                         set_user_withdrawal_password_state(user_id, None)
                         logger.info(f"用戶 {user_id} 提款密碼確認不一致，設置失敗")
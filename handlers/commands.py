@@ -7,11 +7,14 @@ import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
+from callback_codec import encode_callback
+
 from messages import (
     get_start_game_message,
     get_profile_message,
     get_deposit_amount_prompt,
-    get_withdraw_method_selection_message
+    get_withdraw_method_selection_message,
+    get_referral_message
 )
 from keyboards import (
     get_game_level1_keyboard,
@@ -23,12 +26,20 @@ from state import (
     get_user_usdt_balance,
     get_user_bank_card_number,
     get_user_wallet_address,
-    set_user_withdraw_state
+    set_user_withdraw_state,
+    from_micros,
+    bind_referrer,
+    get_referrer,
+    get_referral_stats
 )
+from platform_client import get_platform_client, PlatformAPIError
 from handlers.base import return_to_home
 from handlers.utils import send_photo_with_cache
 from handlers.message_deduplication import is_message_processed, mark_message_processed
 
+# 推廣鏈接參數的前綴（/start ref_<上級ID>）
+REFERRAL_START_PREFIX = "ref_"
+
 logger = logging.getLogger(__name__)
 
 
@@ -51,10 +62,59 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     logger.info(f"用戶 {user_id} 使用 /start 命令 (message_id={message_id})")
     
+    # 推廣鏈接（/start ref_<上級ID>）只對新用戶生效，在註冊之前綁定上級
+    # 平台請求失敗時不綁定，由 return_to_home 提示用戶稍後再試
+    if context.args:
+        try:
+            if not await get_platform_client().user_exists(user_id):
+                await _bind_referral_from_start(user_id, context.args[0])
+        except PlatformAPIError as e:
+            logger.error(f"用戶 {user_id} 的推廣鏈接檢查時網投平台請求失敗: {e}")
+    
     # 調用 return_to_home 執行返回主頁的邏輯
     await return_to_home(update, context)
 
 
+async def _bind_referral_from_start(user_id: int, start_param: str) -> None:
+    """
+    解析 /start 的推廣參數並綁定上級（上級必須是網投平台上已註冊的用戶，參數無效時只記錄日誌）
+    :raises PlatformAPIError: 網投平台請求失敗
+    """
+    if not start_param.startswith(REFERRAL_START_PREFIX):
+        return
+    referrer_text = start_param[len(REFERRAL_START_PREFIX):]
+    if not referrer_text.isdigit() or not await get_platform_client().user_exists(int(referrer_text)):
+        logger.warning(f"用戶 {user_id} 的推廣參數無效: {start_param}")
+        return
+    referrer_id = int(referrer_text)
+    if bind_referrer(user_id, referrer_id):
+        logger.info(f"用戶 {user_id} 通過推廣鏈接綁定上級 {referrer_id}")
+    else:
+        logger.warning(f"用戶 {user_id} 綁定上級 {referrer_id} 失敗（已有上級或形成循環）")
+
+
+async def show_referral(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    處理 /referral 指令：發送推廣鏈接和團隊統計（統計為增量維護的累計值，不遍歷下級）
+    """
+    user_id = update.effective_user.id
+    stats = get_referral_stats(user_id)
+    link = f"https://t.me/{context.bot.username}?start={REFERRAL_START_PREFIX}{user_id}"
+    await send_photo_with_cache(
+        update,
+        context,
+        "images/推广链接.jpg",
+        get_referral_message(
+            link,
+            str(stats["direct_count"]),
+            str(stats["downline_count"]),
+            f"{from_micros(stats['downline_volume']):.2f}",
+            get_referrer(user_id) is not None
+        )
+    )
+    logger.info(f"用戶 {user_id} 查看推廣信息")
+
+
 async def show_start_game_info(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     顯示開始遊戲的說明文案和官方客服按鈕，並切換到第一層遊戲菜單
@@ -64,7 +124,7 @@ async def show_start_game_info(update: Update, context: ContextTypes.DEFAULT_TYP
     # 創建官方客服 Inline 按鈕
     official_service_button = InlineKeyboardButton(
         text="官方客服",
-        callback_data="official_service"
+        callback_data=encode_callback("official_service")
     )
     
     # 組裝 Inline Keyboard（只有一個按鈕）
@@ -151,7 +211,7 @@ async def handle_withdraw(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         formatted_card = format_bank_card_number(bank_card_number)
         buttons.append(InlineKeyboardButton(
             text=f"银行卡：尾号 {formatted_card[-6:]}",
-            callback_data="withdraw_method_bank_card"
+            callback_data=encode_callback("withdraw_method", method="bank_card")
         ))
     
     # 檢查USDT-TRC20
@@ -159,7 +219,7 @@ async def handle_withdraw(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     if trc20_address:
         buttons.append(InlineKeyboardButton(
             text=f"USDT-TRC20：尾数 {trc20_address[-6:]}",
-            callback_data="withdraw_method_trc20"
+            callback_data=encode_callback("withdraw_method", method="trc20")
         ))
     
     # 檢查USDT-ERC20
@@ -167,7 +227,7 @@ async def handle_withdraw(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     if erc20_address:
         buttons.append(InlineKeyboardButton(
             text=f"USDT-ERC20：尾数 {erc20_address[-6:]}",
-            callback_data="withdraw_method_erc20"
+            callback_data=encode_callback("withdraw_method", method="erc20")
         ))
     
     # 如果沒有任何綁定的提款方式，提示用戶
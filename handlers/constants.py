@@ -15,7 +15,7 @@ GAME_BUTTONS = [
     "百家乐",
 ]
 
-# 測試用的哈希結果數據（實際應從API獲取）
+# 測試用的哈希結果數據（輪次結果由 handlers/round_oracle.py 提供，本地哈希鏈以這個交易哈希為種子）
 TEST_HASH_VALUE = "...3c27e7b94**654**feb**32**"
 TEST_HASH_URL = "https://tronscan.org/#/transaction/e540d19aa31f8770dec2064ac88e2864849cdc28340f4ba3c27e7b94654feb32"
 TEST_BONUS = "1600"
@@ -32,7 +32,7 @@ ALL_MENU_BUTTONS = {
     # 安全中心按鈕
     "提款密码", "USDT-TRC20绑定", "USDT-ERC20绑定", "返回上页",
     # 個人報表按鈕
-    "日统计", "周统计", "返回上页",
+    "日统计", "周统计", "排行榜", "导出报表", "返回上页",
     # 初級房投注按鈕
     "2元", "5元", "10元", "30元", "50元", "自动下注", "确认当前房型", "返回房型选单",
     # 自動下注金額選擇按鈕
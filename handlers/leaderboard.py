@@ -0,0 +1,118 @@
+"""
+排行榜處理模組
+顯示當天/當週的投注榜和中獎榜（全部遊戲或單個遊戲），榜單由 state/leaderboard.py 在開獎時增量維護，
+查看時只讀取前 k 名
+"""
+
+import logging
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes
+
+from messages import get_leaderboard_message
+from state import (
+    from_micros,
+    get_leaderboard,
+    get_leaderboard_period,
+    LEADERBOARD_PERIODS,
+    LEADERBOARD_METRICS,
+    REPORT_TOTAL
+)
+from callback_codec import encode_callback
+from keyboards import register_keyboard, get_keyboard
+from handlers.constants import GAME_BUTTONS
+from handlers.reports import OPERATOR_IDS, refresh_report_message
+from handlers.callback_router import register_action_route
+
+logger = logging.getLogger(__name__)
+
+# 按鈕文字
+_PERIOD_LABELS = {"day": "今日", "week": "本周"}
+_METRIC_LABELS = {"volume": "投注榜", "payout": "中奖榜"}
+
+
+def _leaderboard_keyboard_name(period: str, metric: str, game: str) -> str:
+    return f"leaderboard_{period}_{metric}_{game}"
+
+
+def _build_leaderboard_keyboard(period: str, metric: str, game: str) -> InlineKeyboardMarkup:
+    """
+    構建排行榜的 Inline 鍵盤：切換週期/指標時保持遊戲，切換遊戲時保持週期和指標
+    """
+    switch_buttons = [
+        InlineKeyboardButton(
+            text=f"{_PERIOD_LABELS[other_period]}{_METRIC_LABELS[other_metric]}",
+            callback_data=encode_callback("leaderboard", period=other_period, metric=other_metric, game_name=game)
+        )
+        for other_period in LEADERBOARD_PERIODS
+        for other_metric in LEADERBOARD_METRICS
+    ]
+    game_buttons = [
+        InlineKeyboardButton(
+            text=name,
+            callback_data=encode_callback("leaderboard", period=period, metric=metric, game_name=name)
+        )
+        for name in (REPORT_TOTAL, *GAME_BUTTONS)
+    ]
+    return InlineKeyboardMarkup([
+        switch_buttons[0:2],  # 第一行：今日投注榜、今日中奖榜
+        switch_buttons[2:4],  # 第二行：本周投注榜、本周中奖榜
+        game_buttons[0:3],    # 第三行起：总计和各遊戲
+        game_buttons[3:6],
+        game_buttons[6:9]
+    ])
+
+
+# 每種 (週期, 指標, 遊戲) 組合的鍵盤固定不變，導入時構建一次
+for _period in LEADERBOARD_PERIODS:
+    for _metric in LEADERBOARD_METRICS:
+        for _game in (REPORT_TOTAL, *GAME_BUTTONS):
+            register_keyboard(_leaderboard_keyboard_name(_period, _metric, _game), _build_leaderboard_keyboard(_period, _metric, _game))
+
+
+def _mask_user_id(user_id: int) -> str:
+    """隱藏用戶ID的中間部分（如 12****89）"""
+    text = str(user_id)
+    return f"{text[:2]}****{text[-2:]}" if len(text) > 4 else text
+
+
+def _render_leaderboard(viewer_id: int, period: str, metric: str, game: str) -> str:
+    """生成排行榜內容（營運人員看到完整的用戶ID）"""
+    _, start_date, end_date = get_leaderboard_period(period)
+    show_full_id = viewer_id in OPERATOR_IDS
+    entries = [
+        (str(user_id) if show_full_id else _mask_user_id(user_id), f"{from_micros(score):.2f}")
+        for user_id, score in get_leaderboard(period, metric, game)
+    ]
+    return get_leaderboard_message(period, start_date, end_date, metric, game, entries)
+
+
+async def show_leaderboard(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    顯示排行榜（「排行榜」按鈕和 /leaderboard 指令），默認為今日投注榜、全部遊戲
+    """
+    user_id = update.effective_user.id
+    period, metric, game = "day", "volume", REPORT_TOTAL
+    await update.message.reply_text(
+        _render_leaderboard(user_id, period, metric, game),
+        reply_markup=get_keyboard(_leaderboard_keyboard_name(period, metric, game))
+    )
+    logger.info(f"用戶 {user_id} 查看排行榜")
+
+
+async def _leaderboard_switch(update: Update, context: ContextTypes.DEFAULT_TYPE, period: str, metric: str, game_name: str) -> None:
+    """處理排行榜的週期、指標和遊戲切換"""
+    user_id = update.effective_user.id
+    if period not in LEADERBOARD_PERIODS or metric not in LEADERBOARD_METRICS or game_name not in (REPORT_TOTAL, *GAME_BUTTONS):
+        logger.warning(f"用戶 {user_id} 的排行榜回調參數無效：{period}，{metric}，{game_name}")
+        return
+    await refresh_report_message(
+        update,
+        None,
+        _render_leaderboard(user_id, period, metric, game_name),
+        get_keyboard(_leaderboard_keyboard_name(period, metric, game_name))
+    )
+    logger.info(f"用戶 {user_id} 切換排行榜：{period}，{metric}，{game_name}")
+
+
+# 排行榜的按鈕一直使用令牌，沒有需要兼容的舊文字回調，只註冊令牌動作
+register_action_route("leaderboard", _leaderboard_switch)
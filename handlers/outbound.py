@@ -0,0 +1,79 @@
+"""
+消息發送模組
+後台消息的統一發送通道：同一聊天內按提交順序發送，不同聊天之間併發發送（有上限）
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Iterable
+
+from handlers.task_supervisor import spawn_task, get_task_counts
+
+# 同時進行中的發送請求上限，可在 config.py 中覆蓋
+try:
+    from config import OUTBOUND_CONCURRENCY
+except ImportError:
+    OUTBOUND_CONCURRENCY = 30
+
+logger = logging.getLogger(__name__)
+
+# 每個聊天最後提交的發送任務（新任務等它完成後再發送，保證順序）
+# key: chat_id, value: 發送任務
+_chat_tails: dict[int, asyncio.Task] = {}
+
+# 全局併發上限（在第一次發送時創建，綁定到運行中的事件循環）
+_send_semaphore: asyncio.Semaphore | None = None
+
+
+async def _run_send(chat_id: int, previous: asyncio.Task | None, send: Callable[[], Awaitable]) -> None:
+    """等待同一聊天的上一個發送完成，然後在併發上限內執行發送"""
+    global _send_semaphore
+    if previous is not None and not previous.done():
+        await asyncio.wait([previous])
+    if _send_semaphore is None:
+        _send_semaphore = asyncio.Semaphore(OUTBOUND_CONCURRENCY)
+    async with _send_semaphore:
+        try:
+            await send()
+        except Exception as e:
+            logger.error(f"後台發送消息失敗，chat_id={chat_id}: {e}")
+
+
+def _forget_send(chat_id: int, task: asyncio.Task) -> None:
+    """發送完成後釋放聊天隊尾的引用"""
+    if _chat_tails.get(chat_id) is task:
+        del _chat_tails[chat_id]
+
+
+def submit_send(chat_id: int, send: Callable[[], Awaitable]) -> asyncio.Task:
+    """
+    提交一個後台發送（不等待結果）
+    :param chat_id: 聊天ID（同一聊天的發送按提交順序執行）
+    :param send: 無參數的協程函數，執行實際的 Bot API 調用（可包含多個按順序發送的消息）
+    :return: 發送任務
+    """
+    task = spawn_task("outbound", _run_send(chat_id, _chat_tails.get(chat_id), send), name=f"outbound-{chat_id}")
+    _chat_tails[chat_id] = task
+    task.add_done_callback(lambda finished: _forget_send(chat_id, finished))
+    return task
+
+
+def submit_send_batch(sends: Iterable[tuple[int, Callable[[], Awaitable]]]) -> int:
+    """
+    一次提交多個後台發送
+    :param sends: [(chat_id, send)]
+    :return: 提交的數量
+    """
+    count = 0
+    for chat_id, send in sends:
+        submit_send(chat_id, send)
+        count += 1
+    return count
+
+
+def get_pending_send_count() -> int:
+    """進行中（含排隊）的後台發送數量"""
+    return get_task_counts().get("outbound", 0)
+
+
+__all__ = ['OUTBOUND_CONCURRENCY', 'submit_send', 'submit_send_batch', 'get_pending_send_count']
@@ -0,0 +1,224 @@
+"""
+返水結算模組
+每天結算前一天的返水：從報表預聚合讀取每個 (用戶, 遊戲) 的投注金額（數組副本），
+在後台線程中按階梯費率（投注金額越高費率越高）一次向量運算算出全部返水，再分批通過賬本批量入賬
+- 費率用百萬分率的整數計算，返水金額向下取整到微 USDT
+- 每批入賬後讓出事件循環，不阻塞投注和其他更新
+- 開始入賬前整批結果連同進度寫入快照（state/rebate_state.py），重啟後按保存的結果從中斷處繼續，
+  不會因為重新計算的結果不同而重複發放或漏發
+"""
+
+import asyncio
+import logging
+from datetime import datetime, time as time_type, timedelta
+
+import numpy as np
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from messages import get_rebate_dry_run_message, get_rebate_dry_run_usage_message, get_operator_only_message
+from state import (
+    MICROS_PER_USDT,
+    from_micros,
+    ledger_credit_many,
+    get_daily_bet_volumes,
+    start_rebate_settlement,
+    get_rebate_pending,
+    get_rebate_progress,
+    set_rebate_progress,
+    is_rebate_settled
+)
+from handlers.reports import OPERATOR_IDS
+
+# 返水階梯：(當天單個遊戲的投注金額下限（USDT）, 返水比例)，按下限從低到高排列，可在 config.py 中覆蓋
+try:
+    from config import REBATE_TIERS
+except ImportError:
+    REBATE_TIERS = (
+        (0, 0.0),
+        (100, 0.003),
+        (1_000, 0.005),
+        (10_000, 0.008),
+    )
+
+# 每天結算返水的時間（結算前一天），可在 config.py 中覆蓋
+try:
+    from config import REBATE_RUN_TIME
+except ImportError:
+    REBATE_RUN_TIME = time_type(0, 10)
+
+# 每批入賬的用戶數，可在 config.py 中覆蓋
+try:
+    from config import REBATE_CREDIT_BATCH
+except ImportError:
+    REBATE_CREDIT_BATCH = 10_000
+
+logger = logging.getLogger(__name__)
+
+_PPM = 1_000_000
+
+# 階梯下限（微 USDT）和費率（百萬分率）
+_TIER_FLOORS = np.array([int(floor * MICROS_PER_USDT) for floor, _ in REBATE_TIERS], dtype=np.int64)
+_TIER_RATES_PPM = np.array([round(rate * _PPM) for _, rate in REBATE_TIERS], dtype=np.int64)
+
+
+class RebateBatch:
+    """一天的返水計算結果"""
+
+    __slots__ = ("date", "user_ids", "volumes", "rebates", "tier_counts", "tier_rebates")
+
+    def __init__(self, date: str, user_ids: np.ndarray, volumes: np.ndarray, rebates: np.ndarray,
+                 tier_counts: np.ndarray, tier_rebates: np.ndarray):
+        self.date = date
+        # 按用戶ID排序、去重的用戶（只包含返水大於 0 的用戶），與 volumes、rebates 一一對應
+        self.user_ids = user_ids
+        # 各用戶當天的投注金額（微 USDT）
+        self.volumes = volumes
+        # 各用戶的返水（微 USDT）
+        self.rebates = rebates
+        # 各階梯的 (用戶, 遊戲) 條目數和返水合計（微 USDT）
+        self.tier_counts = tier_counts
+        self.tier_rebates = tier_rebates
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+
+def _build_rebate_batch(date: str, user_ids: np.ndarray, volumes: np.ndarray) -> RebateBatch:
+    """
+    由 (用戶, 遊戲) 的投注金額計算返水（純數組運算，在後台線程中調用）
+    每個 (用戶, 遊戲) 按當天該遊戲的投注金額落入的階梯計算，再按用戶合計
+    """
+    tiers = np.searchsorted(_TIER_FLOORS, volumes, side="right") - 1
+    # 低於最低一檔的投注沒有返水
+    eligible = tiers >= 0
+    user_ids, volumes, tiers = user_ids[eligible], volumes[eligible], tiers[eligible]
+    rebates = volumes * _TIER_RATES_PPM[tiers] // _PPM
+    tier_counts = np.bincount(tiers, minlength=len(_TIER_FLOORS))
+    tier_rebates = np.zeros(len(_TIER_FLOORS), dtype=np.int64)
+    np.add.at(tier_rebates, tiers, rebates)
+
+    # 按用戶合計
+    unique_ids, inverse = np.unique(user_ids, return_inverse=True)
+    user_volumes = np.zeros(len(unique_ids), dtype=np.int64)
+    user_rebates = np.zeros(len(unique_ids), dtype=np.int64)
+    np.add.at(user_volumes, inverse, volumes)
+    np.add.at(user_rebates, inverse, rebates)
+    keep = user_rebates > 0
+    return RebateBatch(date, unique_ids[keep], user_volumes[keep], user_rebates[keep], tier_counts, tier_rebates)
+
+
+async def compute_rebates(date: str) -> RebateBatch:
+    """
+    計算某一天的返水（不入賬）：在事件循環上複製當天的投注金額，計算在後台線程完成
+    :param date: 日期（YYYY-MM-DD）
+    :return: 計算結果
+    """
+    user_ids, _, volumes = get_daily_bet_volumes(date)
+    return await asyncio.to_thread(_build_rebate_batch, date, user_ids, volumes)
+
+
+async def settle_rebates(date: str) -> int:
+    """
+    結算並入賬某一天的返水（已全部入賬的日期不會重複結算，中斷後從上次的進度繼續）
+    :param date: 日期（YYYY-MM-DD），必須是已結束的日期
+    :return: 本次入賬的用戶數
+    """
+    if is_rebate_settled(date):
+        return 0
+    pending = get_rebate_pending(date)
+    if pending is None:
+        batch = await compute_rebates(date)
+        start_rebate_settlement(date, batch.user_ids, batch.rebates)
+        pending = (0, batch.user_ids, batch.rebates)
+    else:
+        logger.info(f"{date} 的返水從第 {pending[0]}/{len(pending[1])} 個用戶繼續入賬")
+    credited, user_ids, rebates = pending
+
+    started = credited
+    while credited < len(user_ids):
+        end = min(credited + REBATE_CREDIT_BATCH, len(user_ids))
+        ledger_credit_many(user_ids[credited:end], rebates[credited:end], "rebate")
+        credited = end
+        set_rebate_progress(date, credited)
+        # 讓出事件循環，處理其他更新
+        await asyncio.sleep(0)
+
+    logger.info(
+        f"{date} 的返水結算完成：{credited - started} 個用戶入賬，"
+        f"合計 {from_micros(int(rebates[started:].sum())):.2f} USDT"
+    )
+    return credited - started
+
+
+async def run_rebate_scheduler(run_time: time_type = REBATE_RUN_TIME) -> None:
+    """
+    每天在 run_time 結算前一天的返水（啟動時先補結算前一天）
+    :param run_time: 每天的結算時間
+    """
+    while True:
+        yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+        try:
+            await settle_rebates(yesterday)
+        except Exception as e:
+            logger.error(f"結算 {yesterday} 的返水時發生錯誤: {e}", exc_info=True)
+
+        now = datetime.now()
+        next_run = datetime.combine(now.date(), run_time)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        await asyncio.sleep((next_run - now).total_seconds())
+
+
+def _format_rebate_tiers(batch: RebateBatch) -> list[tuple[str, str, str, str]]:
+    """各階梯的 (投注下限, 返水比例, 條目數, 返水合計)，均為已格式化的字符串"""
+    return [
+        (f"{floor:,}", f"{rate * 100:.2f}%", str(int(count)), f"{from_micros(int(amount)):.2f}")
+        for (floor, rate), count, amount in zip(REBATE_TIERS, batch.tier_counts, batch.tier_rebates)
+    ]
+
+
+async def rebate_dry_run_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    處理 /rebate_dry_run 指令：試算某一天的返水，不入賬（僅限 OPERATOR_IDS）
+    /rebate_dry_run [日期]，默認為前一天
+    """
+    user_id = update.effective_user.id
+    if user_id not in OPERATOR_IDS:
+        await update.message.reply_text(get_operator_only_message())
+        logger.warning(f"用戶 {user_id} 嘗試試算返水，已拒絕")
+        return
+
+    args = context.args or []
+    date = args[0] if args else (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    try:
+        datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        date = None
+    if date is None or len(args) > 1:
+        await update.message.reply_text(get_rebate_dry_run_usage_message())
+        return
+
+    batch = await compute_rebates(date)
+    progress = get_rebate_progress(date)
+    await update.message.reply_text(get_rebate_dry_run_message(
+        date,
+        str(len(batch)),
+        f"{from_micros(int(batch.volumes.sum())):.2f}",
+        f"{from_micros(int(batch.rebates.sum())):.2f}",
+        _format_rebate_tiers(batch),
+        None if progress is None else f"{progress[0]}/{progress[1]}"
+    ))
+    logger.info(f"營運人員 {user_id} 試算 {date} 的返水：{len(batch)} 個用戶")
+
+
+__all__ = [
+    'REBATE_TIERS',
+    'REBATE_RUN_TIME',
+    'REBATE_CREDIT_BATCH',
+    'RebateBatch',
+    'compute_rebates',
+    'settle_rebates',
+    'run_rebate_scheduler',
+    'rebate_dry_run_command'
+]
@@ -0,0 +1,88 @@
+"""
+Reply Keyboard 路由模組
+導入時把 (菜單狀態, 按鈕文字) 編譯成處理函數表，另按「等待的自由文本輸入類型」建立一個處理函數表
+每條訊息只需一到兩次字典查找，分派成本不隨菜單數量增長
+"""
+
+from typing import Awaitable, Callable
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+# 按鈕處理函數：(update, context, user_id, message_text)
+ReplyHandler = Callable[[Update, ContextTypes.DEFAULT_TYPE, int, str], Awaitable[None]]
+
+# 自由文本輸入處理函數：返回是否已處理（False 時繼續按菜單狀態分派）
+InputHandler = Callable[[Update, ContextTypes.DEFAULT_TYPE, int, str], Awaitable[bool]]
+
+# 按鈕路由表
+# key: (菜單狀態, 按鈕文字), value: 處理函數
+_reply_routes: dict[tuple[str, str], ReplyHandler] = {}
+
+# 自由文本輸入路由表
+# key: 輸入類型（見 state/input_state.py）, value: 處理函數
+_input_routes: dict[str, InputHandler] = {}
+
+# 已註冊路由的菜單狀態（不在其中的狀態視為未知狀態）
+_menu_states: set[str] = set()
+
+
+def reply_route(states: str | tuple[str, ...], *texts: str):
+    """
+    裝飾器：把處理函數註冊到一個或多個菜單狀態下的一個或多個按鈕
+    :param states: 菜單狀態（單個或元組）
+    :param texts: 按鈕文字
+    :raises ValueError: 同一 (狀態, 按鈕) 重複註冊
+    """
+    if isinstance(states, str):
+        states = (states,)
+
+    def decorator(handler: ReplyHandler) -> ReplyHandler:
+        for state in states:
+            for text in texts:
+                if (state, text) in _reply_routes:
+                    raise ValueError(f"按鈕路由重複註冊: {state} / {text}")
+                _reply_routes[(state, text)] = handler
+            _menu_states.add(state)
+        return handler
+    return decorator
+
+
+def input_route(kind: str):
+    """
+    裝飾器：註冊一種自由文本輸入的處理函數
+    :param kind: 輸入類型
+    :raises ValueError: 同一類型重複註冊
+    """
+    def decorator(handler: InputHandler) -> InputHandler:
+        if kind in _input_routes:
+            raise ValueError(f"文本輸入路由重複註冊: {kind}")
+        _input_routes[kind] = handler
+        return handler
+    return decorator
+
+
+def resolve_reply_route(state: str, text: str) -> ReplyHandler | None:
+    """查找菜單狀態下按鈕的處理函數，沒有時返回 None"""
+    return _reply_routes.get((state, text))
+
+
+def resolve_input_route(kind: str) -> InputHandler | None:
+    """查找自由文本輸入類型的處理函數，沒有時返回 None"""
+    return _input_routes.get(kind)
+
+
+def is_menu_state(state: str) -> bool:
+    """菜單狀態是否有已註冊的路由"""
+    return state in _menu_states
+
+
+__all__ = [
+    'ReplyHandler',
+    'InputHandler',
+    'reply_route',
+    'input_route',
+    'resolve_reply_route',
+    'resolve_input_route',
+    'is_menu_state'
+]
@@ -0,0 +1,111 @@
+"""
+報表緩存模組
+緩存已生成的報表內容（LRU）：
+- 已結束的日期/月份的數據不會再變化，生成一次後一直有效
+- 當天/當月的條目記錄生成時的報表數據版本（state/report_rollup.py），數據有新事件時才重新生成
+另支持在後台預先生成用戶接下來可能查看的報表（如「上一日」），翻頁時直接命中緩存
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+from state import get_rollup_version
+from handlers.task_supervisor import spawn_task
+
+# 緩存的報表條數上限，可在 config.py 中覆蓋
+try:
+    from config import REPORT_CACHE_MAX_ENTRIES
+except ImportError:
+    REPORT_CACHE_MAX_ENTRIES = 50_000
+
+logger = logging.getLogger(__name__)
+
+
+class _CachedReport:
+    """一條緩存的報表"""
+
+    __slots__ = ("text", "version")
+
+    def __init__(self, text: str, version: int | None):
+        self.text = text
+        # 生成時的報表數據版本；None 表示週期已結束，內容不再變化
+        self.version = version
+
+
+# 報表緩存（按最近使用排序，最舊的在前）
+# key: (報表類型, user_id, 週期, 遊戲), value: _CachedReport
+_cache: OrderedDict[Hashable, _CachedReport] = OrderedDict()
+
+# 進行中的預取（避免同一報表重複啟動任務）
+_prefetching: set[Hashable] = set()
+
+
+def _lookup(user_id: int, key: Hashable) -> str | None:
+    """查找仍然有效的緩存內容"""
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    if entry.version is not None and entry.version != get_rollup_version(user_id):
+        return None
+    _cache.move_to_end(key)
+    return entry.text
+
+
+def _store(user_id: int, key: Hashable, closed: bool, text: str) -> None:
+    """寫入緩存並淘汰最久未使用的條目"""
+    _cache[key] = _CachedReport(text, None if closed else get_rollup_version(user_id))
+    _cache.move_to_end(key)
+    while len(_cache) > REPORT_CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+
+
+def get_cached_report(user_id: int, key: Hashable, closed: bool, render: Callable[[], str]) -> str:
+    """
+    獲取報表內容，緩存有效時直接返回，否則生成並寫入緩存
+    :param user_id: 用戶ID（用於檢查報表數據版本）
+    :param key: 緩存鍵（必須包含 user_id 和週期）
+    :param closed: 報表週期是否已結束（已結束的報表不再檢查版本）
+    :param render: 生成報表內容的函數
+    :return: 報表內容
+    """
+    text = _lookup(user_id, key)
+    if text is None:
+        text = render()
+        _store(user_id, key, closed, text)
+    return text
+
+
+def prefetch_report(user_id: int, key: Hashable, closed: bool, render: Callable[[], str]) -> None:
+    """
+    在後台預先生成報表並寫入緩存（已緩存或正在預取時不做任何事）
+    參數同 get_cached_report
+    """
+    if key in _prefetching or _lookup(user_id, key) is not None:
+        return
+
+    async def prefetch() -> None:
+        try:
+            # 讓出事件循環，先完成當前報表的發送
+            await asyncio.sleep(0)
+            if _lookup(user_id, key) is None:
+                _store(user_id, key, closed, render())
+        finally:
+            _prefetching.discard(key)
+
+    _prefetching.add(key)
+    spawn_task("report_prefetch", prefetch(), name=f"report-prefetch-{user_id}")
+
+
+def clear_report_cache() -> None:
+    """清空報表緩存"""
+    _cache.clear()
+
+
+__all__ = [
+    'REPORT_CACHE_MAX_ENTRIES',
+    'get_cached_report',
+    'prefetch_report',
+    'clear_report_cache'
+]
@@ -0,0 +1,288 @@
+"""
+報表導出模組
+把一個日期範圍的每日匯總和投注明細導出為 gzip 壓縮的 CSV 文件，以 Telegram 文件發送，
+另外提供營運人員按日期範圍核對投注日誌（注數、金額、RTP）的指令：
+- 每日匯總在後台線程中從報表預聚合中讀取（每天每個遊戲一行，數據量很小）
+- 投注明細由生成器從投注日誌（state/bet_log.py）逐段、逐塊讀取（跳過時間範圍之外的段），在後台線程中邊生成邊壓縮寫入臨時文件，
+  內存佔用只與塊大小有關，不隨導出範圍增長；壓縮後的大小超過上限時立即停止
+導出任務通過任務管理器在後台運行，不阻塞其他用戶的更新
+"""
+
+import asyncio
+import csv
+import gzip
+import io
+import logging
+import os
+import tempfile
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from telegram import Bot, Update
+from telegram.ext import ContextTypes
+
+from messages import (
+    get_report_export_started_message,
+    get_report_export_caption,
+    get_report_export_usage_message,
+    get_report_export_failed_message,
+    get_bet_log_stats_message,
+    get_bet_log_stats_usage_message,
+    get_operator_only_message
+)
+from state import (
+    from_micros,
+    flush_bet_log,
+    scan_bet_log,
+    summarize_bet_log,
+    get_pending_bet_count,
+    get_daily_rollup,
+    REPORT_TOTAL,
+    REPORT_DAILY_RETENTION_DAYS,
+    PLATFORM_ROLLUP_ID,
+    METRIC_BET_AMOUNT,
+    METRIC_BET_COUNT,
+    METRIC_PAYOUT,
+    METRIC_DEPOSIT,
+    METRIC_WITHDRAW,
+    METRIC_TRANSFER_COUNT
+)
+from handlers.constants import GAME_BUTTONS
+from handlers.reports import OPERATOR_IDS, parse_range_report_args
+from handlers.task_supervisor import spawn_task
+
+# 每次從投注日誌讀取並寫出的行數（決定導出時的內存佔用），可在 config.py 中覆蓋
+try:
+    from config import REPORT_EXPORT_CHUNK_ROWS
+except ImportError:
+    REPORT_EXPORT_CHUNK_ROWS = 65_536
+
+# 導出文件的大小上限（字節，Telegram Bot API 上傳文件上限為 50 MB），可在 config.py 中覆蓋
+try:
+    from config import REPORT_EXPORT_MAX_BYTES
+except ImportError:
+    REPORT_EXPORT_MAX_BYTES = 50 * 1024 * 1024
+
+# CSV 表頭（每日匯總和投注明細共用，以 type 區分；不適用的列留空）
+REPORT_EXPORT_HEADER = (
+    "type", "time", "user_id", "game", "round_id",
+    "bet_amount", "payout_amount", "bet_count",
+    "deposit_amount", "withdraw_amount", "transfer_count"
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _collect_daily_rows(rollup_id: int, start_date: str, end_date: str, game: str) -> list[list]:
+    """
+    讀取日期範圍內每天的匯總（在後台線程中調用，只包含有數據的日期和遊戲）
+    :param rollup_id: 用戶ID（全平台為 PLATFORM_ROLLUP_ID）
+    :param game: 遊戲名稱，「总计」表示每個遊戲各一行加上總計行
+    """
+    games = (*GAME_BUTTONS, REPORT_TOTAL) if game == REPORT_TOTAL else (game,)
+    user_column = "" if rollup_id == PLATFORM_ROLLUP_ID else rollup_id
+    rows = []
+    day = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    while day <= end:
+        date = day.strftime("%Y-%m-%d")
+        for name in games:
+            stats = get_daily_rollup(rollup_id, date, name)
+            if not stats.any():
+                continue
+            rows.append([
+                "daily", date, user_column, name, "",
+                f"{from_micros(int(stats[METRIC_BET_AMOUNT])):.2f}",
+                f"{from_micros(int(stats[METRIC_PAYOUT])):.2f}",
+                int(stats[METRIC_BET_COUNT]),
+                f"{from_micros(int(stats[METRIC_DEPOSIT])):.2f}",
+                f"{from_micros(int(stats[METRIC_WITHDRAW])):.2f}",
+                int(stats[METRIC_TRANSFER_COUNT])
+            ])
+        day += timedelta(days=1)
+    return rows
+
+
+def _iter_bet_rows(user_id: int | None, start_ms: int, end_ms: int, game_id: int | None) -> Iterator[list[list]]:
+    """
+    按塊生成投注明細行（在後台線程中調用，每次只有一塊在內存中）
+    :param user_id: 只導出該用戶的投注，None 表示全部用戶
+    :param start_ms: 開始時間（Unix 毫秒，含）
+    :param end_ms: 結束時間（Unix 毫秒，不含）
+    :param game_id: 遊戲下標，None 表示全部遊戲
+    """
+    for segment in scan_bet_log(start_ms=start_ms, end_ms=end_ms):
+        for offset in range(0, len(segment["ts_ms"]), REPORT_EXPORT_CHUNK_ROWS):
+            window = slice(offset, offset + REPORT_EXPORT_CHUNK_ROWS)
+            ts_ms = segment["ts_ms"][window]
+            mask = (ts_ms >= start_ms) & (ts_ms < end_ms)
+            if user_id is not None:
+                mask &= segment["user_id"][window] == user_id
+            if game_id is not None:
+                mask &= segment["game"][window] == game_id
+            if not mask.any():
+                continue
+            yield [
+                [
+                    "bet",
+                    datetime.fromtimestamp(ts / 1000).strftime("%Y-%m-%d %H:%M:%S"),
+                    bettor,
+                    GAME_BUTTONS[game],
+                    round_id,
+                    f"{from_micros(stake):.2f}",
+                    f"{from_micros(payout):.2f}",
+                    1, "", "", ""
+                ]
+                for ts, bettor, game, round_id, stake, payout in zip(
+                    ts_ms[mask].tolist(),
+                    segment["user_id"][window][mask].tolist(),
+                    segment["game"][window][mask].tolist(),
+                    segment["round_id"][window][mask].tolist(),
+                    segment["stake"][window][mask].tolist(),
+                    segment["payout"][window][mask].tolist()
+                )
+            ]
+
+
+def _write_export(path: str, daily_rows: list[list], bet_rows: Iterator[list[list]]) -> bool:
+    """
+    把導出內容邊生成邊壓縮寫入文件（在後台線程中調用；帶 BOM 以便 Excel 正確識別中文）
+    每寫完一塊檢查已寫入的壓縮後大小，超過 REPORT_EXPORT_MAX_BYTES 時停止，不再讀取後面的投注
+    :return: 是否在大小上限內寫完
+    """
+    with open(path, "wb") as raw_file, \
+            gzip.GzipFile(fileobj=raw_file, mode="wb") as gzip_file, \
+            io.TextIOWrapper(gzip_file, encoding="utf-8-sig", newline="") as export_file:
+        writer = csv.writer(export_file)
+        writer.writerow(REPORT_EXPORT_HEADER)
+        writer.writerows(daily_rows)
+        for chunk in bet_rows:
+            writer.writerows(chunk)
+            if raw_file.tell() > REPORT_EXPORT_MAX_BYTES:
+                return False
+    return os.path.getsize(path) <= REPORT_EXPORT_MAX_BYTES
+
+
+async def _export_report(bot: Bot, chat_id: int, user_id: int | None, start_date: str, end_date: str, game: str) -> None:
+    """
+    生成並發送導出文件（後台任務）
+    :param user_id: 導出該用戶的報表，None 表示導出全平台報表
+    """
+    rollup_id = PLATFORM_ROLLUP_ID if user_id is None else user_id
+    start_ms = int(datetime.strptime(start_date, "%Y-%m-%d").timestamp() * 1000)
+    end_ms = int((datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).timestamp() * 1000)
+    game_id = None if game == REPORT_TOTAL else GAME_BUTTONS.index(game)
+
+    prefix = "operator_report" if user_id is None else "report"
+    fd, path = tempfile.mkstemp(prefix=f"{prefix}_", suffix=".csv.gz")
+    os.close(fd)
+    try:
+        # 先把緩衝區中的投注寫盤，導出內容包含最近開獎的投注
+        await flush_bet_log()
+        daily_rows = await asyncio.to_thread(_collect_daily_rows, rollup_id, start_date, end_date, game)
+        bet_rows = _iter_bet_rows(user_id, start_ms, end_ms, game_id)
+        if not await asyncio.to_thread(_write_export, path, daily_rows, bet_rows):
+            logger.warning(f"報表導出文件超過 {REPORT_EXPORT_MAX_BYTES} 字節，已停止寫入，未發送：{start_date} ~ {end_date}")
+            await bot.send_message(chat_id=chat_id, text=get_report_export_failed_message())
+            return
+        size = os.path.getsize(path)
+        with open(path, "rb") as export_file:
+            await bot.send_document(
+                chat_id=chat_id,
+                document=export_file,
+                filename=f"{prefix}_{start_date}_{end_date}.csv.gz",
+                caption=get_report_export_caption(start_date, end_date, game)
+            )
+        logger.info(f"報表導出完成：{start_date} ~ {end_date}，遊戲：{game}，{size} 字節")
+    except Exception as e:
+        logger.error(f"導出報表時發生錯誤: {e}", exc_info=True)
+        await bot.send_message(chat_id=chat_id, text=get_report_export_failed_message())
+    finally:
+        os.remove(path)
+
+
+async def start_report_export(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int | None, args: list[str]) -> None:
+    """
+    解析日期範圍並在後台開始導出
+    :param user_id: 導出該用戶的報表，None 表示導出全平台報表
+    :param args: 日期範圍參數（同 /range_report）
+    """
+    parsed = parse_range_report_args(args, datetime.now())
+    if parsed is None:
+        await update.message.reply_text(get_report_export_usage_message(REPORT_DAILY_RETENTION_DAYS))
+        return
+
+    start_date, end_date, game = parsed
+    await update.message.reply_text(get_report_export_started_message(start_date, end_date))
+    spawn_task(
+        "report_export",
+        _export_report(context.bot, update.effective_chat.id, user_id, start_date, end_date, game),
+        name=f"report-export-{update.effective_user.id}"
+    )
+    logger.info(f"用戶 {update.effective_user.id} 導出報表：{start_date} ~ {end_date}，遊戲：{game}，範圍：{'全平台' if user_id is None else '個人'}")
+
+
+async def export_report_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    處理 /export_report 指令：導出個人的每日匯總和投注明細
+    /export_report [天數 | 開始日期 結束日期] [遊戲名稱]
+    """
+    await start_report_export(update, context, update.effective_user.id, context.args or [])
+
+
+async def operator_export_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    處理 /operator_export 指令：導出全平台的每日匯總和所有用戶的投注明細（僅限 OPERATOR_IDS）
+    /operator_export [天數 | 開始日期 結束日期] [遊戲名稱]
+    """
+    user_id = update.effective_user.id
+    if user_id not in OPERATOR_IDS:
+        await update.message.reply_text(get_operator_only_message())
+        logger.warning(f"用戶 {user_id} 嘗試導出營運報表，已拒絕")
+        return
+    await start_report_export(update, context, None, context.args or [])
+
+
+async def bet_log_stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    處理 /bet_log_stats 指令：按投注日誌統計一個日期範圍的注數、金額和 RTP，用於核對（僅限 OPERATOR_IDS）
+    只統計已寫盤的投注，掃描在後台線程中進行；同時顯示尚未寫盤的注數
+    /bet_log_stats [天數 | 開始日期 結束日期] [遊戲名稱]
+    """
+    user_id = update.effective_user.id
+    if user_id not in OPERATOR_IDS:
+        await update.message.reply_text(get_operator_only_message())
+        logger.warning(f"用戶 {user_id} 嘗試查看投注日誌統計，已拒絕")
+        return
+
+    parsed = parse_range_report_args(context.args or [], datetime.now())
+    if parsed is None:
+        await update.message.reply_text(get_bet_log_stats_usage_message(REPORT_DAILY_RETENTION_DAYS))
+        return
+
+    start_date, end_date, game = parsed
+    start_ms = int(datetime.strptime(start_date, "%Y-%m-%d").timestamp() * 1000)
+    end_ms = int((datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).timestamp() * 1000)
+    game_id = None if game == REPORT_TOTAL else GAME_BUTTONS.index(game)
+    summary = await asyncio.to_thread(summarize_bet_log, start_ms, end_ms, game_id)
+    figures = {
+        "bets": str(summary["bets"]),
+        "stake": f"{from_micros(summary['stake']):.2f}",
+        "payout": f"{from_micros(summary['payout']):.2f}",
+        "rtp": f"{summary['rtp'] * 100:.2f}"
+    }
+    await update.message.reply_text(
+        get_bet_log_stats_message(start_date, end_date, game, figures, str(get_pending_bet_count()))
+    )
+    logger.info(f"營運人員 {user_id} 查看投注日誌統計：{start_date} ~ {end_date}，遊戲：{game}")
+
+
+__all__ = [
+    'REPORT_EXPORT_CHUNK_ROWS',
+    'REPORT_EXPORT_MAX_BYTES',
+    'REPORT_EXPORT_HEADER',
+    'start_report_export',
+    'export_report_command',
+    'operator_export_command',
+    'bet_log_stats_command'
+]
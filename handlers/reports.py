@@ -7,87 +7,189 @@ import logging
 from datetime import datetime, timedelta
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
+from telegram.error import BadRequest
 
 from messages import (
     get_daily_report_message,
-    get_monthly_report_message
+    get_monthly_report_message,
+    get_range_report_message,
+    get_range_report_usage_message,
+    get_operator_report_message,
+    get_operator_report_usage_message,
+    get_operator_only_message
 )
 from state import (
     get_user_report_date,
     set_user_report_date,
     get_user_report_game,
     set_user_report_game,
+    get_user_report_message_id,
     set_user_report_message_id,
     get_user_monthly_report_month,
     set_user_monthly_report_month,
     get_user_monthly_report_game,
     set_user_monthly_report_game,
+    get_user_monthly_report_message_id,
     set_user_monthly_report_message_id,
-    set_user_state
+    set_user_state,
+    from_micros,
+    get_daily_rollup,
+    get_monthly_rollup,
+    get_range_rollup,
+    REPORT_TOTAL,
+    REPORT_DAILY_RETENTION_DAYS,
+    PLATFORM_ROLLUP_ID,
+    ACTIVE_SKETCH_ERROR,
+    estimate_active_users,
+    METRIC_BET_AMOUNT,
+    METRIC_BET_COUNT,
+    METRIC_PAYOUT,
+    METRIC_DEPOSIT,
+    METRIC_WITHDRAW,
+    METRIC_TRANSFER_COUNT
 )
+from callback_codec import encode_callback
+from keyboards import register_keyboard, get_keyboard
+from handlers.constants import GAME_BUTTONS
 from handlers.utils import _create_game_buttons
+from handlers.report_cache import get_cached_report, prefetch_report
+from handlers.callback_router import callback_route
+
+# 可以查看營運報表的用戶ID，可在 config.py 中覆蓋（默認沒有人可以查看）
+try:
+    from config import OPERATOR_IDS
+except ImportError:
+    OPERATOR_IDS = ()
 
 logger = logging.getLogger(__name__)
 
 
-async def handle_daily_report_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str):
+def _build_report_keyboard(unit_text: str, prev_action: str, next_action: str, game_action: str) -> InlineKeyboardMarkup:
+    """
+    構建報表的 Inline 鍵盤（日統計和月統計布局相同）
+    :param unit_text: 翻頁單位（"日" 或 "月"）
+    :param prev_action: 「上一日/月」的回調動作
+    :param next_action: 「下一日/月」的回調動作
+    :param game_action: 遊戲類型按鈕的回調動作
+    :return: 鍵盤
+    """
+    prev_button = InlineKeyboardButton(text=f"上一{unit_text}", callback_data=encode_callback(prev_action))
+    next_button = InlineKeyboardButton(text=f"下一{unit_text}", callback_data=encode_callback(next_action))
+    total_button = InlineKeyboardButton(text="总计", callback_data=encode_callback(game_action, game_name="总计"))
+    game_buttons = _create_game_buttons(game_action)
+
+    return InlineKeyboardMarkup([
+        [prev_button, total_button, next_button],  # 第一行：上一日/月、总计、下一日/月
+        [game_buttons[0], game_buttons[1]],  # 第二行：哈希转盘、哈希大小
+        [game_buttons[2], game_buttons[3]],  # 第三行：哈希单双、幸运哈希
+        [game_buttons[4], game_buttons[5]],  # 第四行：幸运庄闲、平倍牛牛
+        [game_buttons[6], game_buttons[7]]   # 第五行：十倍牛牛、百家乐
+    ])
+
+
+# 報表鍵盤不隨日期/月份變化，導入時構建一次
+register_keyboard("daily_report", _build_report_keyboard(
+    "日", "daily_report_prev_day", "daily_report_next_day", "daily_report_game"
+))
+register_keyboard("monthly_report", _build_report_keyboard(
+    "月", "monthly_report_prev_month", "monthly_report_next_month", "monthly_report_game"
+))
+
+
+def _format_report_figures(stats) -> dict[str, str]:
+    """
+    把報表指標格式化為報表訊息的數字
+    - 投注盈亏 = 派奖金额 - 投注金额（用戶視角）
+    - 充提输赢 = 提款总额 - 充值总额（用戶視角）
+    :param stats: 指標數組（見 state/report_rollup.py）
+    :return: 報表數字（見 messages.report.get_daily_report_message）
+    """
+    bet_amount = int(stats[METRIC_BET_AMOUNT])
+    payout_amount = int(stats[METRIC_PAYOUT])
+    deposit_amount = int(stats[METRIC_DEPOSIT])
+    withdraw_amount = int(stats[METRIC_WITHDRAW])
+    transfer_count = int(stats[METRIC_TRANSFER_COUNT])
+    active = stats[METRIC_BET_COUNT] > 0 or transfer_count > 0
+    return {
+        "active_accounts": "1" if active else "0",
+        "bet_amount": f"{from_micros(bet_amount):.2f}",
+        "payout_amount": f"{from_micros(payout_amount):.2f}",
+        "bet_profit": f"{from_micros(payout_amount - bet_amount):.2f}",
+        "deposit_amount": f"{from_micros(deposit_amount):.2f}",
+        "withdraw_amount": f"{from_micros(withdraw_amount):.2f}",
+        "transfer_net": f"{from_micros(withdraw_amount - deposit_amount):.2f}",
+        "transfer_count": str(transfer_count)
+    }
+
+
+def _daily_report_entry(user_id: int, date: str, game: str):
+    """日統計報表的 (緩存鍵, 日期是否已結束, 生成函數)"""
+    def render() -> str:
+        return get_daily_report_message(date, game, _format_report_figures(get_daily_rollup(user_id, date, game)))
+    return ("daily", user_id, date, game), date < datetime.now().strftime("%Y-%m-%d"), render
+
+
+def _monthly_report_entry(user_id: int, month: str, game: str):
+    """月統計報表的 (緩存鍵, 月份是否已結束, 生成函數)"""
+    def render() -> str:
+        return get_monthly_report_message(month, game, _format_report_figures(get_monthly_rollup(user_id, month, game)))
+    return ("monthly", user_id, month, game), month < datetime.now().strftime("%Y-%m"), render
+
+
+def _render_daily_report(user_id: int, date: str, game: str) -> str:
+    """
+    獲取用戶某一天、某個遊戲（或「总计」）的日統計報表內容（經過報表緩存），
+    並在後台預取前一天，連續點擊「上一日」時直接命中緩存
+    """
+    text = get_cached_report(user_id, *_daily_report_entry(user_id, date, game))
+    previous_date = (datetime.strptime(date, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+    prefetch_report(user_id, *_daily_report_entry(user_id, previous_date, game))
+    return text
+
+
+def _render_monthly_report(user_id: int, month: str, game: str) -> str:
+    """
+    獲取用戶某個月、某個遊戲（或「总计」）的月統計報表內容（經過報表緩存），並在後台預取上一個月
+    """
+    text = get_cached_report(user_id, *_monthly_report_entry(user_id, month, game))
+    year, month_num = map(int, month.split("-"))
+    previous_month = f"{year - 1}-12" if month_num == 1 else f"{year}-{month_num - 1:02d}"
+    prefetch_report(user_id, *_monthly_report_entry(user_id, previous_month, game))
+    return text
+
+
+async def refresh_report_message(update: Update, message_id: int | None, text: str, reply_markup: str) -> int:
     """
-    處理日統計報表的 Inline 按鈕點擊
+    把報表訊息原地編輯為新內容（翻頁、切換遊戲類型時調用）
+    - 內容與點擊的訊息相同時不調用 API
+    - 編輯失敗（訊息已被刪除、過舊等）時才刪除並重新發送
+    :param update: 回調的 Update
+    :param message_id: 保存的報表消息ID（沒有時使用被點擊的訊息）
+    :param text: 報表內容
+    :param reply_markup: 報表鍵盤（get_keyboard() 返回的預序列化 JSON，PTB 對字符串原樣發送）
+    :return: 報表當前的消息ID
     """
     query = update.callback_query
-    user_id = update.effective_user.id
+    if message_id is None:
+        message_id = query.message.message_id
     
-    current_date = get_user_report_date(user_id)
-    current_game = get_user_report_game(user_id)
+    # Telegram 會去掉訊息首尾的空白，比較前同樣處理
+    if message_id == query.message.message_id and query.message.text == text.strip():
+        logger.debug(f"報表內容未變化，跳過編輯：消息 {message_id}")
+        return message_id
     
-    # 處理「上一日」
-    if callback_data == "daily_report_prev_day":
-        # 日期減一天
-        date_obj = datetime.strptime(current_date, "%Y-%m-%d")
-        new_date = (date_obj - timedelta(days=1)).strftime("%Y-%m-%d")
-        set_user_report_date(user_id, new_date)
-        current_date = new_date
-        logger.info(f"用戶 {user_id} 切換到上一日：{new_date}")
-    
-    # 處理「下一日」
-    elif callback_data == "daily_report_next_day":
-        # 日期加一天
-        date_obj = datetime.strptime(current_date, "%Y-%m-%d")
-        new_date = (date_obj + timedelta(days=1)).strftime("%Y-%m-%d")
-        set_user_report_date(user_id, new_date)
-        current_date = new_date
-        logger.info(f"用戶 {user_id} 切換到下一日：{new_date}")
-    
-    # 處理遊戲類型按鈕
-    elif callback_data.startswith("daily_report_game_"):
-        game_name = callback_data.replace("daily_report_game_", "")
-        set_user_report_game(user_id, game_name)
-        current_game = game_name
-        logger.info(f"用戶 {user_id} 切換遊戲類型：{game_name}")
-    
-    # 創建 Inline 按鈕（與之前相同）
-    prev_day_button = InlineKeyboardButton(
-        text="上一日",
-        callback_data="daily_report_prev_day"
-    )
-    next_day_button = InlineKeyboardButton(
-        text="下一日",
-        callback_data="daily_report_next_day"
-    )
-    total_button = InlineKeyboardButton(
-        text="总计",
-        callback_data="daily_report_game_总计"
-    )
-    
-    game_buttons = _create_game_buttons("daily_report_game_")
-    
-    inline_keyboard = InlineKeyboardMarkup([
-        [prev_day_button, total_button, next_day_button],  # 下一日和总计互换位置
-        [game_buttons[0], game_buttons[1]],
-        [game_buttons[2], game_buttons[3]],
-        [game_buttons[4], game_buttons[5]],
-        [game_buttons[6], game_buttons[7]]
-    ])
+    try:
+        await query.get_bot().edit_message_text(
+            chat_id=query.message.chat_id,
+            message_id=message_id,
+            text=text,
+            reply_markup=reply_markup
+        )
+        return message_id
+    except BadRequest as e:
+        if "message is not modified" in str(e).lower():
+            return message_id
+        logger.warning(f"編輯報表消息 {message_id} 失敗，改為重新發送: {e}")
     
     # 刪除原消息並重新發送
     try:
@@ -95,14 +197,58 @@ async def handle_daily_report_buttons(update: Update, context: ContextTypes.DEFA
     except Exception as e:
         logger.warning(f"刪除消息失敗（可忽略）: {e}")
     
-    # 重新發送更新後的報表訊息
-    sent_message = await query.message.chat.send_message(
-        get_daily_report_message(current_date, current_game),
-        reply_markup=inline_keyboard
-    )
+    sent_message = await query.message.chat.send_message(text, reply_markup=reply_markup)
+    return sent_message.message_id
+
+
+@callback_route("daily_report_prev_day", action="daily_report_prev_day")
+async def _daily_report_prev_day(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """處理日統計報表的「上一日」"""
+    user_id = update.effective_user.id
+    # 日期減一天
+    date_obj = datetime.strptime(get_user_report_date(user_id), "%Y-%m-%d")
+    new_date = (date_obj - timedelta(days=1)).strftime("%Y-%m-%d")
+    set_user_report_date(user_id, new_date)
+    logger.info(f"用戶 {user_id} 切換到上一日：{new_date}")
+    await _refresh_daily_report(update)
+
+
+@callback_route("daily_report_next_day", action="daily_report_next_day")
+async def _daily_report_next_day(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """處理日統計報表的「下一日」"""
+    user_id = update.effective_user.id
+    # 日期加一天
+    date_obj = datetime.strptime(get_user_report_date(user_id), "%Y-%m-%d")
+    new_date = (date_obj + timedelta(days=1)).strftime("%Y-%m-%d")
+    set_user_report_date(user_id, new_date)
+    logger.info(f"用戶 {user_id} 切換到下一日：{new_date}")
+    await _refresh_daily_report(update)
+
+
+@callback_route("daily_report_game_{game_name:rest}", action="daily_report_game")
+async def _daily_report_game(update: Update, context: ContextTypes.DEFAULT_TYPE, game_name: str) -> None:
+    """處理日統計報表的遊戲類型按鈕"""
+    user_id = update.effective_user.id
+    set_user_report_game(user_id, game_name)
+    logger.info(f"用戶 {user_id} 切換遊戲類型：{game_name}")
+    await _refresh_daily_report(update)
+
+
+async def _refresh_daily_report(update: Update) -> None:
+    """
+    按用戶當前的日期和遊戲類型刷新日統計報表（Inline 按鈕點擊後調用）
+    """
+    user_id = update.effective_user.id
+    current_date = get_user_report_date(user_id)
+    current_game = get_user_report_game(user_id)
     
-    # 更新消息ID
-    set_user_report_message_id(user_id, sent_message.message_id)
+    message_id = await refresh_report_message(
+        update,
+        get_user_report_message_id(user_id),
+        _render_daily_report(user_id, current_date, current_game),
+        get_keyboard("daily_report")
+    )
+    set_user_report_message_id(user_id, message_id)
 
 
 async def show_daily_report(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -113,45 +259,10 @@ async def show_daily_report(update: Update, context: ContextTypes.DEFAULT_TYPE):
     current_date = get_user_report_date(user_id)
     current_game = get_user_report_game(user_id)
     
-    # 創建日統計報表的 Inline 按鈕
-    prev_day_button = InlineKeyboardButton(
-        text="上一日",
-        callback_data="daily_report_prev_day"
-    )
-    next_day_button = InlineKeyboardButton(
-        text="下一日",
-        callback_data="daily_report_next_day"
-    )
-    total_button = InlineKeyboardButton(
-        text="总计",
-        callback_data="daily_report_game_总计"
-    )
-    
-    # 遊戲按鈕
-    game_buttons = [
-        InlineKeyboardButton(text="查看 哈希转盘", callback_data="daily_report_game_哈希转盘"),
-        InlineKeyboardButton(text="查看 哈希大小", callback_data="daily_report_game_哈希大小"),
-        InlineKeyboardButton(text="查看 哈希单双", callback_data="daily_report_game_哈希单双"),
-        InlineKeyboardButton(text="查看 幸运哈希", callback_data="daily_report_game_幸运哈希"),
-        InlineKeyboardButton(text="查看 幸运庄闲", callback_data="daily_report_game_幸运庄闲"),
-        InlineKeyboardButton(text="查看 平倍牛牛", callback_data="daily_report_game_平倍牛牛"),
-        InlineKeyboardButton(text="查看 十倍牛牛", callback_data="daily_report_game_十倍牛牛"),
-        InlineKeyboardButton(text="查看 百家乐", callback_data="daily_report_game_百家乐"),
-    ]
-    
-    # 組裝 Inline Keyboard（下一日和总计互换位置）
-    inline_keyboard = InlineKeyboardMarkup([
-        [prev_day_button, total_button, next_day_button],  # 第一行：上一日、总计、下一日
-        [game_buttons[0], game_buttons[1]],  # 第二行：哈希转盘、哈希大小
-        [game_buttons[2], game_buttons[3]],  # 第三行：哈希单双、幸运哈希
-        [game_buttons[4], game_buttons[5]],  # 第四行：幸运庄闲、平倍牛牛
-        [game_buttons[6], game_buttons[7]]   # 第五行：十倍牛牛、百家乐
-    ])
-    
     # 發送日統計報表訊息（帶 Inline 按鈕）
     sent_message = await update.message.reply_text(
-        get_daily_report_message(current_date, current_game),
-        reply_markup=inline_keyboard
+        _render_daily_report(user_id, current_date, current_game),
+        reply_markup=get_keyboard("daily_report")
     )
     
     # 保存消息ID
@@ -168,36 +279,10 @@ async def show_monthly_report(update: Update, context: ContextTypes.DEFAULT_TYPE
     current_month = get_user_monthly_report_month(user_id)
     current_game = get_user_monthly_report_game(user_id)
     
-    # 創建月統計報表的 Inline 按鈕
-    prev_month_button = InlineKeyboardButton(
-        text="上一月",
-        callback_data="monthly_report_prev_month"
-    )
-    next_month_button = InlineKeyboardButton(
-        text="下一月",
-        callback_data="monthly_report_next_month"
-    )
-    total_button = InlineKeyboardButton(
-        text="总计",
-        callback_data="monthly_report_game_总计"
-    )
-    
-    # 遊戲按鈕
-    game_buttons = _create_game_buttons("monthly_report_game_")
-    
-    # 組裝 Inline Keyboard（與日統計相同的布局）
-    inline_keyboard = InlineKeyboardMarkup([
-        [prev_month_button, total_button, next_month_button],  # 第一行：上一月、总计、下一月
-        [game_buttons[0], game_buttons[1]],  # 第二行：哈希转盘、哈希大小
-        [game_buttons[2], game_buttons[3]],  # 第三行：哈希单双、幸运哈希
-        [game_buttons[4], game_buttons[5]],  # 第四行：幸运庄闲、平倍牛牛
-        [game_buttons[6], game_buttons[7]]   # 第五行：十倍牛牛、百家乐
-    ])
-    
     # 發送月統計報表訊息（帶 Inline 按鈕）
     sent_message = await update.message.reply_text(
-        get_monthly_report_message(current_month, current_game),
-        reply_markup=inline_keyboard
+        _render_monthly_report(user_id, current_month, current_game),
+        reply_markup=get_keyboard("monthly_report")
     )
     
     # 保存消息ID
@@ -206,90 +291,141 @@ async def show_monthly_report(update: Update, context: ContextTypes.DEFAULT_TYPE
     logger.info(f"用戶 {user_id} 進入月統計報表，月份：{current_month}，遊戲：{current_game}")
 
 
-async def handle_monthly_report_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str):
-    """
-    處理月統計報表的 Inline 按鈕點擊
-    """
-    query = update.callback_query
+@callback_route("monthly_report_prev_month", action="monthly_report_prev_month")
+async def _monthly_report_prev_month(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """處理月統計報表的「上一月」"""
     user_id = update.effective_user.id
-    
-    # 獲取當前月份和遊戲類型
     current_month_str = get_user_monthly_report_month(user_id)
-    current_game = get_user_monthly_report_game(user_id)
-    
-    # 解析當前月份
     year, month_num = map(int, current_month_str.split("-"))
-    current_month = datetime(year, month_num, 1)
-    
-    # 處理「上一月」和「下一月」
-    if callback_data == "monthly_report_prev_month":
-        # 往前推一個月
-        if month_num == 1:
-            new_month = datetime(year - 1, 12, 1)
-        else:
-            new_month = datetime(year, month_num - 1, 1)
-        new_month_str = new_month.strftime("%Y-%m")
-        set_user_monthly_report_month(user_id, new_month_str)
-        logger.info(f"用戶 {user_id} 點擊「上一月」，月份從 {current_month_str} 變更為 {new_month_str}")
-    elif callback_data == "monthly_report_next_month":
-        # 往後推一個月
-        if month_num == 12:
-            new_month = datetime(year + 1, 1, 1)
-        else:
-            new_month = datetime(year, month_num + 1, 1)
-        new_month_str = new_month.strftime("%Y-%m")
-        set_user_monthly_report_month(user_id, new_month_str)
-        logger.info(f"用戶 {user_id} 點擊「下一月」，月份從 {current_month_str} 變更為 {new_month_str}")
-    elif callback_data.startswith("monthly_report_game_"):
-        # 處理遊戲類型切換
-        game_name = callback_data.replace("monthly_report_game_", "")
-        set_user_monthly_report_game(user_id, game_name)
-        current_game = game_name
-        logger.info(f"用戶 {user_id} 切換月統計遊戲類型為：{game_name}")
+    # 往前推一個月
+    if month_num == 1:
+        new_month = datetime(year - 1, 12, 1)
     else:
-        return
-    
-    # 獲取更新後的月份和遊戲類型
+        new_month = datetime(year, month_num - 1, 1)
+    new_month_str = new_month.strftime("%Y-%m")
+    set_user_monthly_report_month(user_id, new_month_str)
+    logger.info(f"用戶 {user_id} 點擊「上一月」，月份從 {current_month_str} 變更為 {new_month_str}")
+    await _refresh_monthly_report(update)
+
+
+@callback_route("monthly_report_next_month", action="monthly_report_next_month")
+async def _monthly_report_next_month(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """處理月統計報表的「下一月」"""
+    user_id = update.effective_user.id
+    current_month_str = get_user_monthly_report_month(user_id)
+    year, month_num = map(int, current_month_str.split("-"))
+    # 往後推一個月
+    if month_num == 12:
+        new_month = datetime(year + 1, 1, 1)
+    else:
+        new_month = datetime(year, month_num + 1, 1)
+    new_month_str = new_month.strftime("%Y-%m")
+    set_user_monthly_report_month(user_id, new_month_str)
+    logger.info(f"用戶 {user_id} 點擊「下一月」，月份從 {current_month_str} 變更為 {new_month_str}")
+    await _refresh_monthly_report(update)
+
+
+@callback_route("monthly_report_game_{game_name:rest}", action="monthly_report_game")
+async def _monthly_report_game(update: Update, context: ContextTypes.DEFAULT_TYPE, game_name: str) -> None:
+    """處理月統計報表的遊戲類型按鈕"""
+    user_id = update.effective_user.id
+    set_user_monthly_report_game(user_id, game_name)
+    logger.info(f"用戶 {user_id} 切換月統計遊戲類型為：{game_name}")
+    await _refresh_monthly_report(update)
+
+
+async def _refresh_monthly_report(update: Update) -> None:
+    """
+    按用戶當前的月份和遊戲類型刷新月統計報表（Inline 按鈕點擊後調用）
+    """
+    user_id = update.effective_user.id
     updated_month_str = get_user_monthly_report_month(user_id)
     updated_game = get_user_monthly_report_game(user_id)
     
-    # 重新構建 Inline 按鈕
-    prev_month_button = InlineKeyboardButton(
-        text="上一月",
-        callback_data="monthly_report_prev_month"
-    )
-    next_month_button = InlineKeyboardButton(
-        text="下一月",
-        callback_data="monthly_report_next_month"
-    )
-    total_button = InlineKeyboardButton(
-        text="总计",
-        callback_data="monthly_report_game_总计"
+    message_id = await refresh_report_message(
+        update,
+        get_user_monthly_report_message_id(user_id),
+        _render_monthly_report(user_id, updated_month_str, updated_game),
+        get_keyboard("monthly_report")
     )
+    set_user_monthly_report_message_id(user_id, message_id)
+
+
+# /range_report 不帶天數時的默認天數
+RANGE_REPORT_DEFAULT_DAYS = 7
+
+
+def parse_range_report_args(args: list[str], today: datetime) -> tuple[str, str, str] | None:
+    """
+    解析 /range_report 的參數：[天數 | 開始日期 結束日期] [遊戲名稱]
+    天數不能超過日報表的保留天數 REPORT_DAILY_RETENTION_DAYS
+    :return: (開始日期, 結束日期, 遊戲名稱)，參數無效時返回 None
+    """
+    args = list(args)
+    game = REPORT_TOTAL
+    if args and (args[-1] in GAME_BUTTONS or args[-1] == REPORT_TOTAL):
+        game = args.pop()
     
-    # 遊戲按鈕
-    game_buttons = _create_game_buttons("monthly_report_game_")
+    if not args:
+        days = RANGE_REPORT_DEFAULT_DAYS
+    elif len(args) == 1 and args[0].isdigit():
+        days = int(args[0])
+    elif len(args) == 2:
+        try:
+            start = datetime.strptime(args[0], "%Y-%m-%d")
+            end = datetime.strptime(args[1], "%Y-%m-%d")
+        except ValueError:
+            return None
+        if end < start:
+            return None
+        return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), game
+    else:
+        return None
     
-    # 組裝 Inline Keyboard（與日統計相同的布局）
-    inline_keyboard = InlineKeyboardMarkup([
-        [prev_month_button, total_button, next_month_button],  # 第一行：上一月、总计、下一月
-        [game_buttons[0], game_buttons[1]],  # 第二行：哈希转盘、哈希大小
-        [game_buttons[2], game_buttons[3]],  # 第三行：哈希单双、幸运哈希
-        [game_buttons[4], game_buttons[5]],  # 第四行：幸运庄闲、平倍牛牛
-        [game_buttons[6], game_buttons[7]]   # 第五行：十倍牛牛、百家乐
-    ])
+    if days <= 0 or days > REPORT_DAILY_RETENTION_DAYS:
+        return None
+    start = today - timedelta(days=days - 1)
+    return start.strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d"), game
+
+
+async def show_range_report(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    處理 /range_report 指令：顯示任意日期範圍的統計報表（基於按天累計的前綴數組，常數時間）
+    /range_report [天數 | 開始日期 結束日期] [遊戲名稱]
+    """
+    user_id = update.effective_user.id
+    parsed = parse_range_report_args(context.args or [], datetime.now())
+    if parsed is None:
+        await update.message.reply_text(get_range_report_usage_message(REPORT_DAILY_RETENTION_DAYS))
+        return
     
-    # 刪除原消息並重新發送
-    try:
-        await query.message.delete()
-    except Exception as e:
-        logger.warning(f"刪除消息失敗（可忽略）: {e}")
+    start_date, end_date, game = parsed
+    figures = _format_report_figures(get_range_rollup(user_id, start_date, end_date, game))
+    await update.message.reply_text(get_range_report_message(start_date, end_date, game, figures))
+    logger.info(f"用戶 {user_id} 查看範圍報表：{start_date} ~ {end_date}，遊戲：{game}")
+
+
+async def show_operator_report(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    處理 /operator_report 指令：顯示全平台的統計報表（僅限 OPERATOR_IDS）
+    金額來自全平台合計的前綴數組，活躍賬號由 HyperLogLog 草圖合併估算，都不需要掃描用戶
+    /operator_report [天數 | 開始日期 結束日期] [遊戲名稱]
+    """
+    user_id = update.effective_user.id
+    if user_id not in OPERATOR_IDS:
+        await update.message.reply_text(get_operator_only_message())
+        logger.warning(f"用戶 {user_id} 嘗試查看營運報表，已拒絕")
+        return
     
-    # 重新發送更新後的報表訊息
-    sent_message = await query.message.chat.send_message(
-        get_monthly_report_message(updated_month_str, updated_game),
-        reply_markup=inline_keyboard
-    )
+    parsed = parse_range_report_args(context.args or [], datetime.now())
+    if parsed is None:
+        await update.message.reply_text(get_operator_report_usage_message(REPORT_DAILY_RETENTION_DAYS))
+        return
     
-    # 更新消息ID
-    set_user_monthly_report_message_id(user_id, sent_message.message_id)
+    start_date, end_date, game = parsed
+    figures = _format_report_figures(get_range_rollup(PLATFORM_ROLLUP_ID, start_date, end_date, game))
+    figures["active_accounts"] = str(estimate_active_users(start_date, end_date, game))
+    await update.message.reply_text(
+        get_operator_report_message(start_date, end_date, game, figures, f"{ACTIVE_SKETCH_ERROR * 100:.1f}")
+    )
+    logger.info(f"營運人員 {user_id} 查看營運報表：{start_date} ~ {end_date}，遊戲：{game}")
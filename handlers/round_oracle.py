@@ -0,0 +1,106 @@
+"""
+哈希輪次結果模組
+每個哈希輪次從本地哈希鏈取一個交易哈希，只計算一次顯示格式、超鏈接和各遊戲的結果，
+同一輪次的所有投注共用這份結果，每注只需查字典
+"""
+
+import hashlib
+import logging
+import re
+from typing import Callable
+
+from messages import format_hash_link
+from state import next_round_seq, get_round_chain_head, set_round_chain_head
+from handlers.constants import GAME_BUTTONS
+
+# 本地哈希鏈的種子（沒有接入鏈上數據時使用），可在 config.py 中覆蓋
+try:
+    from config import ROUND_HASH_SEED
+except ImportError:
+    ROUND_HASH_SEED = "e540d19aa31f8770dec2064ac88e2864849cdc28340f4ba3c27e7b94654feb32"
+
+# 交易詳情頁 URL 模板
+TRANSACTION_URL_TEMPLATE = "https://tronscan.org/#/transaction/{tx_hash}"
+
+# 顯示哈希值的尾部長度，以及其中數字加粗的尾段長度
+_DISPLAY_TAIL_LENGTH = 17
+_BOLD_TAIL_LENGTH = 8
+
+logger = logging.getLogger(__name__)
+
+
+def next_chain_hash() -> str:
+    """
+    取本地哈希鏈（鏈上數據的替代品）的下一個哈希：從種子開始，每個輪次取上一個哈希的 SHA-256
+    結果可重現，適合本地運行和測試；鏈頭保存在 state/round_state.py 並寫入快照，重啟後從中斷處繼續
+    """
+    tx_hash = get_round_chain_head() or ROUND_HASH_SEED
+    set_round_chain_head(hashlib.sha256(tx_hash.encode("ascii")).hexdigest())
+    return tx_hash
+
+
+def format_display_hash(tx_hash: str) -> str:
+    """
+    生成顯示用的哈希值：只保留尾部，尾段中的數字用 ** 包圍表示粗體
+    如 ...3c27e7b94**654**feb**32**
+    :param tx_hash: 交易哈希
+    """
+    tail = tx_hash[-_DISPLAY_TAIL_LENGTH:]
+    head, bold_tail = tail[:-_BOLD_TAIL_LENGTH], tail[-_BOLD_TAIL_LENGTH:]
+    return "..." + head + re.sub(r"(\d+)", r"**\1**", bold_tail)
+
+
+def _tail_digit_result(tx_hash: str) -> str:
+    """哈希值最後一個數字"""
+    digits = re.findall(r"\d", tx_hash)
+    return f"尾数 {digits[-1]}" if digits else "未知"
+
+
+# 各遊戲的結果計算規則
+# key: 遊戲名稱, value: 由交易哈希計算結果文字的函數
+GAME_RESULT_RULES: dict[str, Callable[[str], str]] = {
+    "哈希转盘": _tail_digit_result,
+}
+
+
+class RoundResult:
+    """一個哈希輪次的結果（創建時一次性計算，之後只讀）"""
+
+    __slots__ = ("round_id", "tx_hash", "url", "display_hash", "hash_link", "game_results")
+
+    def __init__(self, round_id: int, tx_hash: str):
+        """
+        :param round_id: 輪次號
+        :param tx_hash: 本輪次的交易哈希
+        """
+        self.round_id = round_id
+        self.tx_hash = tx_hash
+        self.url = TRANSACTION_URL_TEMPLATE.format(tx_hash=tx_hash)
+        self.display_hash = format_display_hash(tx_hash)
+        self.hash_link = format_hash_link(self.display_hash, self.url)
+        self.game_results = {
+            game: GAME_RESULT_RULES.get(game, _tail_digit_result)(tx_hash)
+            for game in GAME_BUTTONS
+        }
+
+    def game_result(self, game_name: str) -> str:
+        """獲取指定遊戲在本輪次的結果"""
+        return self.game_results.get(game_name, "未知")
+
+
+def next_round_result() -> RoundResult:
+    """
+    開始一個新輪次：取下一個哈希並計算本輪次的結果（每個輪次調用一次）
+    :return: 輪次結果
+    """
+    return RoundResult(next_round_seq(), next_chain_hash())
+
+
+__all__ = [
+    'ROUND_HASH_SEED',
+    'RoundResult',
+    'GAME_RESULT_RULES',
+    'format_display_hash',
+    'next_chain_hash',
+    'next_round_result'
+]
@@ -0,0 +1,205 @@
+"""
+哈希輪次開獎模組
+所有用戶（單次下注和自動下注）在同一哈希輪次內下的注先記入當前輪次，
+輪次結束時用 NumPy 一次性算出全部開獎結果和彩金，批量入賬，並把所有結果通知一起提交發送
+開獎耗時基本不隨同時下注的人數增長
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable
+
+import numpy as np
+
+from state import (
+    MICROS_PER_USDT,
+    ledger_credit_many,
+    get_ledger_balances,
+    record_round_bets,
+    append_bets,
+    add_open_round_bet,
+    take_open_round_bets
+)
+from handlers.constants import GAME_BUTTONS
+from handlers.outbound import submit_send_batch
+from handlers.round_oracle import RoundResult, next_round_result
+
+# 每個哈希輪次的時長（秒），即從下注到開獎的最長等待時間，可在 config.py 中覆蓋
+try:
+    from config import ROUND_INTERVAL
+except ImportError:
+    ROUND_INTERVAL = 3
+
+# 輪次開獎對應的遊戲（報表按遊戲統計）
+ROUND_GAME = "哈希转盘"
+_ROUND_GAME_ID = GAME_BUTTONS.index(ROUND_GAME)
+
+# 中獎機率
+WIN_PROBABILITY = 0.5
+
+# 彩金範圍（分，0.05-100.00 USDT，均勻分佈）
+BONUS_MIN_CENTS = 5
+BONUS_MAX_CENTS = 10000
+
+_MICROS_PER_CENT = MICROS_PER_USDT // 100
+
+logger = logging.getLogger(__name__)
+
+# 開獎回調：(彩金（微 USDT，0 表示未中獎）, 派彩後餘額（微 USDT）, 開獎時間, 輪次結果) -> 需要發送的 (chat_id, send) 或 None
+SettleCallback = Callable[[int, int, datetime, RoundResult], "tuple[int, Callable[[], Awaitable]] | None"]
+
+# 輪次結束後的處理函數（如自動下注引擎推進會話），返回需要發送的 [(chat_id, send)]
+RoundHook = Callable[[], "list[tuple[int, Callable[[], Awaitable]]]"]
+
+_rng = np.random.default_rng()
+
+
+# 當前開放下注的輪次的開獎回調，與 state/round_state.py 中的投注（用戶ID、金額，寫入快照）按相同順序一一對應
+_open_callbacks: list[SettleCallback] = []
+
+# 輪次結束後依次調用的處理函數
+_round_hooks: list[RoundHook] = []
+
+# 關閉時設置：輪次循環在沒有待開獎的投注後退出
+_draining = False
+
+
+def place_round_bet(user_id: int, stake_micros: int, on_settled: SettleCallback) -> int:
+    """
+    把一注（已扣款）記入當前輪次，在輪次結束時開獎
+    :param user_id: 用戶ID
+    :param stake_micros: 投注金額（微 USDT）
+    :param on_settled: 開獎回調
+    :return: 當前輪次的投注數
+    """
+    add_open_round_bet(user_id, stake_micros)
+    _open_callbacks.append(on_settled)
+    return len(_open_callbacks)
+
+
+def get_open_round_size() -> int:
+    """當前輪次待開獎的投注數"""
+    return len(_open_callbacks)
+
+
+def register_round_hook(hook: RoundHook) -> None:
+    """
+    註冊輪次結束後的處理函數（在開獎之後、提交發送之前調用）
+    :param hook: 無參數函數，返回需要發送的 [(chat_id, send)]
+    """
+    _round_hooks.append(hook)
+
+
+def settle_round(rng: np.random.Generator | None = None, now: datetime | None = None) -> list[tuple[int, Callable[[], Awaitable]]]:
+    """
+    結束當前輪次並開獎：取本輪次的哈希結果（所有投注共用），向量化計算結果和彩金，批量派彩，逐注調用開獎回調
+    :param rng: 隨機數生成器，默認使用模組共享的生成器
+    :param now: 開獎時間，默認取當前時間
+    :return: 開獎回調返回的 [(chat_id, send)]
+    """
+    global _open_callbacks
+    callbacks = _open_callbacks
+    _open_callbacks = []
+    user_ids, stakes = take_open_round_bets()
+    count = len(callbacks)
+    if not count:
+        return []
+
+    rng = _rng if rng is None else rng
+    now = datetime.now() if now is None else now
+    round_result = next_round_result()
+
+    wins = rng.random(count) < WIN_PROBABILITY
+    bonus_cents = rng.integers(BONUS_MIN_CENTS, BONUS_MAX_CENTS + 1, size=count)
+    payouts = np.where(wins, bonus_cents * _MICROS_PER_CENT, 0)
+
+    # 批量派彩，然後一次取出本輪所有投注者的最新餘額
+    winner_count = ledger_credit_many(user_ids[wins], payouts[wins], "payout")
+    unique_ids, inverse = np.unique(user_ids, return_inverse=True)
+    balances = get_ledger_balances(unique_ids)[inverse]
+
+    sends = []
+    for callback, payout, balance in zip(callbacks, payouts.tolist(), balances.tolist()):
+        try:
+            send = callback(payout, balance, now, round_result)
+        except Exception as e:
+            logger.error(f"處理開獎回調時發生錯誤: {e}", exc_info=True)
+            continue
+        if send is not None:
+            sends.append(send)
+
+    # 記入報表和投注日誌（失敗不影響派彩和結果通知）
+    try:
+        record_round_bets(user_ids, stakes, payouts, ROUND_GAME, now)
+    except Exception as e:
+        logger.error(f"記錄輪次報表時發生錯誤: {e}", exc_info=True)
+    try:
+        append_bets(int(now.timestamp() * 1000), user_ids, _ROUND_GAME_ID, stakes, payouts, round_result.round_id)
+    except Exception as e:
+        logger.error(f"記錄投注日誌時發生錯誤: {e}", exc_info=True)
+
+    logger.info(
+        f"輪次 {round_result.round_id} 開獎完成: {count} 注，{winner_count} 注中獎，"
+        f"派彩 {int(payouts.sum()) / MICROS_PER_USDT:.2f} USDT"
+    )
+    return sends
+
+
+def refund_open_round() -> int:
+    """
+    退還當前輪次所有待開獎的投注（輪次循環在關閉時被取消時調用）
+    :return: 退還的投注數
+    """
+    global _open_callbacks
+    _open_callbacks = []
+    user_ids, stakes = take_open_round_bets()
+    if len(user_ids):
+        ledger_credit_many(user_ids, stakes, "bet_refund")
+        logger.warning(f"關閉時退還了 {len(user_ids)} 注未開獎的投注")
+    return len(user_ids)
+
+
+def request_round_drain() -> None:
+    """要求輪次循環在所有待開獎的投注開獎後退出（關閉 Bot 前調用）"""
+    global _draining
+    _draining = True
+
+
+async def run_round_loop(interval: float = ROUND_INTERVAL) -> None:
+    """
+    哈希輪次循環（整個 Bot 只運行一個，通過任務管理器啟動以便關閉時排空）
+    每個輪次：開獎、調用輪次處理函數、批量提交所有消息
+    :param interval: 輪次時長（秒）
+    """
+    try:
+        while not (_draining and not _open_callbacks):
+            await asyncio.sleep(interval)
+            sends = []
+            try:
+                sends.extend(settle_round())
+            except Exception as e:
+                logger.error(f"輪次開獎時發生錯誤: {e}", exc_info=True)
+            for hook in _round_hooks:
+                try:
+                    sends.extend(hook())
+                except Exception as e:
+                    logger.error(f"執行輪次處理函數時發生錯誤: {e}", exc_info=True)
+            submit_send_batch(sends)
+    except asyncio.CancelledError:
+        refund_open_round()
+        raise
+
+
+__all__ = [
+    'ROUND_INTERVAL',
+    'ROUND_GAME',
+    'WIN_PROBABILITY',
+    'place_round_bet',
+    'get_open_round_size',
+    'register_round_hook',
+    'settle_round',
+    'refund_open_round',
+    'request_round_drain',
+    'run_round_loop'
+]
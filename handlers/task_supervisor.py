@@ -0,0 +1,137 @@
+"""
+後台任務管理模組
+所有後台任務（投注、哈希輪次循環、充值到賬、消息發送、報表預取和導出）都通過 spawn_task 啟動：
+持有強引用防止任務在完成前被垃圾回收，記錄未處理的異常，按任務類型限制併發數，
+關閉時在期限內等待進行中的任務完成
+"""
+
+import asyncio
+import logging
+import time
+from typing import Coroutine
+
+# 每種任務同時運行的上限（None 表示不限制），可在 config.py 中覆蓋
+# 超出上限的任務會排隊等待，而不是被丟棄
+try:
+    from config import TASK_LIMITS
+except ImportError:
+    TASK_LIMITS = {
+        "bet": 1000,
+        "deposit": 1000,
+        "outbound": None,
+        "report_prefetch": 100,
+        "report_export": 4
+    }
+
+# 未在 TASK_LIMITS 中列出的任務類型的上限
+DEFAULT_TASK_LIMIT = 1000
+
+# 關閉時等待後台任務完成的最長時間（秒），超時後取消剩餘任務，可在 config.py 中覆蓋
+try:
+    from config import SHUTDOWN_DRAIN_TIMEOUT
+except ImportError:
+    SHUTDOWN_DRAIN_TIMEOUT = 15
+
+logger = logging.getLogger(__name__)
+
+# 進行中（含排隊）的任務
+# key: 任務類型, value: 任務集合
+_tasks: dict[str, set[asyncio.Task]] = {}
+
+# 每種任務的併發上限（在第一次啟動該類任務時創建，綁定到運行中的事件循環）
+_semaphores: dict[str, asyncio.Semaphore | None] = {}
+
+
+async def _run_limited(kind: str, coro: Coroutine) -> object:
+    """在該類任務的併發上限內運行協程"""
+    if kind not in _semaphores:
+        limit = TASK_LIMITS.get(kind, DEFAULT_TASK_LIMIT)
+        _semaphores[kind] = asyncio.Semaphore(limit) if limit else None
+    semaphore = _semaphores[kind]
+    if semaphore is None:
+        return await coro
+
+    try:
+        await semaphore.acquire()
+    except asyncio.CancelledError:
+        # 排隊時被取消，協程從未開始運行
+        coro.close()
+        raise
+    try:
+        return await coro
+    finally:
+        semaphore.release()
+
+
+def _on_task_done(kind: str, task: asyncio.Task) -> None:
+    """任務結束後釋放引用並記錄異常"""
+    tasks = _tasks.get(kind)
+    if tasks is not None:
+        tasks.discard(task)
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        logger.error(f"後台任務 {task.get_name()}（{kind}）發生未處理的異常: {error}", exc_info=error)
+
+
+def spawn_task(kind: str, coro: Coroutine, name: str | None = None) -> asyncio.Task:
+    """
+    啟動一個受管理的後台任務
+    :param kind: 任務類型（如 "bet"、"deposit"、"outbound"），用於併發上限和統計
+    :param coro: 要運行的協程
+    :param name: 任務名稱（用於日誌），默認為任務類型
+    :return: 任務
+    """
+    task = asyncio.create_task(_run_limited(kind, coro), name=name or kind)
+    _tasks.setdefault(kind, set()).add(task)
+    task.add_done_callback(lambda finished: _on_task_done(kind, finished))
+    return task
+
+
+def get_task_counts() -> dict[str, int]:
+    """
+    各類型進行中（含排隊）的任務數量
+    :return: {任務類型: 數量}
+    """
+    return {kind: len(tasks) for kind, tasks in _tasks.items() if tasks}
+
+
+def _all_tasks() -> set[asyncio.Task]:
+    return set().union(*_tasks.values())
+
+
+async def drain_tasks(timeout: float = SHUTDOWN_DRAIN_TIMEOUT) -> int:
+    """
+    等待所有後台任務完成（關閉時調用，調用前應停止接收新的更新）
+    進行中的任務在完成時可能啟動新任務（如投注結果的發送），這些任務也會被等待
+    :param timeout: 最長等待時間（秒），超時後取消剩餘任務
+    :return: 被取消的任務數量
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        pending = _all_tasks()
+        remaining = deadline - time.monotonic()
+        if not pending or remaining <= 0:
+            break
+        logger.info(f"等待後台任務完成: {get_task_counts()}")
+        await asyncio.wait(pending, timeout=remaining)
+
+    pending = _all_tasks()
+    if not pending:
+        return 0
+
+    logger.warning(f"後台任務未在 {timeout} 秒內完成，取消剩餘任務: {get_task_counts()}")
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    return len(pending)
+
+
+__all__ = [
+    'TASK_LIMITS',
+    'SHUTDOWN_DRAIN_TIMEOUT',
+    'spawn_task',
+    'get_task_counts',
+    'drain_tasks'
+]
@@ -8,7 +8,22 @@ from telegram import Update, InlineKeyboardButton
 from telegram.ext import ContextTypes
 from telegram.error import TimedOut, NetworkError
 
+from callback_codec import encode_callback
 from handlers.constants import GAME_BUTTONS
+from state import (
+    get_user_bank_card_binding_state,
+    set_user_bank_card_binding_state,
+    get_user_wallet_binding_state,
+    set_user_wallet_binding_state,
+    get_user_deposit_withdraw_state,
+    set_user_deposit_withdraw_state,
+    get_user_withdraw_state,
+    set_user_withdraw_state,
+    set_user_withdraw_method,
+    set_user_withdraw_amount,
+    get_user_withdrawal_password_state,
+    set_user_withdrawal_password_state
+)
 
 logger = logging.getLogger(__name__)
 
@@ -17,18 +32,53 @@ logger = logging.getLogger(__name__)
 cached_media_ids: dict[str, str] = {}
 
 
-def _create_game_buttons(prefix: str) -> list[InlineKeyboardButton]:
+def _create_game_buttons(action: str) -> list[InlineKeyboardButton]:
     """
     創建遊戲按鈕列表（用於報表功能）
-    :param prefix: 回調數據前綴（"daily_report_game_" 或 "monthly_report_game_"）
+    :param action: 回調動作（"daily_report_game" 或 "monthly_report_game"）
     :return: 按鈕列表
     """
     return [
-        InlineKeyboardButton(text=f"查看 {game}", callback_data=f"{prefix}{game}")
+        InlineKeyboardButton(text=f"查看 {game}", callback_data=encode_callback(action, game_name=game))
         for game in GAME_BUTTONS
     ]
 
 
+def clear_user_input_flows(user_id: int, source: str, include_withdrawal_password: bool = True) -> None:
+    """
+    清除用戶所有進行中的輸入流程狀態（用戶點擊按鈕轉去做其他操作時調用）
+    :param user_id: 用戶ID
+    :param source: 觸發清除的按鈕類型（用於日誌，如 "菜單按鈕"、"Inline 按鈕"）
+    :param include_withdrawal_password: 是否同時清除提款密碼設置狀態（密碼鍵盤本身是 Inline 按鈕）
+    """
+    # 清除銀行卡綁定狀態
+    if get_user_bank_card_binding_state(user_id):
+        set_user_bank_card_binding_state(user_id, False)
+        logger.info(f"用戶 {user_id} 點擊{source}，清除銀行卡綁定狀態")
+    
+    # 清除錢包綁定狀態
+    if get_user_wallet_binding_state(user_id):
+        set_user_wallet_binding_state(user_id, None)
+        logger.info(f"用戶 {user_id} 點擊{source}，清除錢包綁定狀態")
+    
+    # 清除充值/提款狀態
+    if get_user_deposit_withdraw_state(user_id):
+        set_user_deposit_withdraw_state(user_id, None)
+        logger.info(f"用戶 {user_id} 點擊{source}，清除充值/提款狀態")
+    
+    # 清除提款流程狀態
+    if get_user_withdraw_state(user_id):
+        set_user_withdraw_state(user_id, None)
+        set_user_withdraw_method(user_id, None)
+        set_user_withdraw_amount(user_id, None)
+        logger.info(f"用戶 {user_id} 點擊{source}，清除提款流程狀態")
+    
+    # 清除提款密碼設置狀態
+    if include_withdrawal_password and get_user_withdrawal_password_state(user_id):
+        set_user_withdrawal_password_state(user_id, None)
+        logger.info(f"用戶 {user_id} 點擊{source}，清除提款密碼設置狀態")
+
+
 async def send_photo_with_cache(
     update: Update,
     context: ContextTypes.DEFAULT_TYPE,
@@ -97,4 +147,4 @@ async def send_photo_with_cache(
 
 
 # 導出工具函數供其他模組使用
-__all__ = ['send_photo_with_cache', '_create_game_buttons', 'cached_media_ids']
+__all__ = ['send_photo_with_cache', '_create_game_buttons', 'clear_user_input_flows', 'cached_media_ids']
@@ -1,14 +1,21 @@
 """
 鍵盤布局模組
-存放所有鍵盤生成函數
+存放所有鍵盤的布局，導入時構建一次並預先序列化為 JSON，組成只讀的鍵盤表
+Bot API 的 reply_markup 本身就是 JSON 字符串，python-telegram-bot 對字符串參數原樣發送，
+因此 get_*_keyboard() 直接返回預序列化的 JSON，每次發送不再創建按鈕對象、也不再重新序列化
 """
 
+import json
+from types import MappingProxyType
+
 from telegram import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup
 
+from callback_codec import encode_callback
+
 
-def get_home_keyboard() -> ReplyKeyboardMarkup:
+def _build_home_keyboard() -> ReplyKeyboardMarkup:
     """
-    獲取首頁底部常駐菜單
+    構建首頁底部常駐菜單
     """
     start_game_button = KeyboardButton(text="开始游戏")
     profile_button = KeyboardButton(text="个人中心")
@@ -25,9 +32,9 @@ def get_home_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
-def get_game_level1_keyboard() -> ReplyKeyboardMarkup:
+def _build_game_level1_keyboard() -> ReplyKeyboardMarkup:
     """
-    獲取第一層遊戲菜單（哈希转盘那一层）
+    構建第一層遊戲菜單（哈希转盘那一层）
     """
     hash_wheel_button = KeyboardButton(text="哈希转盘")
     flat_cow_button = KeyboardButton(text="平倍牛牛")
@@ -47,9 +54,9 @@ def get_game_level1_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
-def get_game_level2_keyboard() -> ReplyKeyboardMarkup:
+def _build_game_level2_keyboard() -> ReplyKeyboardMarkup:
     """
-    獲取第二層遊戲菜單（更多游戏那一层）
+    構建第二層遊戲菜單（更多游戏那一层）
     """
     lucky_hash_button = KeyboardButton(text="幸运哈希")
     hash_odd_even_button = KeyboardButton(text="哈希单双")
@@ -68,9 +75,9 @@ def get_game_level2_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
-def get_profile_keyboard() -> ReplyKeyboardMarkup:
+def _build_profile_keyboard() -> ReplyKeyboardMarkup:
     """
-    獲取個人中心底部菜單
+    構建個人中心底部菜單
     """
     report_center_button = KeyboardButton(text="报表中心")
     security_center_button = KeyboardButton(text="安全中心")
@@ -86,9 +93,9 @@ def get_profile_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
-def get_security_center_keyboard() -> ReplyKeyboardMarkup:
+def _build_security_center_keyboard() -> ReplyKeyboardMarkup:
     """
-    獲取安全中心底部菜單
+    構建安全中心底部菜單
     """
     withdrawal_password_button = KeyboardButton(text="提款密码")
     usdt_trc20_button = KeyboardButton(text="USDT-TRC20绑定")
@@ -105,24 +112,24 @@ def get_security_center_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
-def get_password_input_keyboard() -> InlineKeyboardMarkup:
+def _build_password_input_keyboard() -> InlineKeyboardMarkup:
     """
-    獲取提款密碼輸入數字鍵盤（Inline 按鈕）
+    構建提款密碼輸入數字鍵盤（Inline 按鈕）
     """
     from telegram import InlineKeyboardButton
     
-    button_1 = InlineKeyboardButton(text="1", callback_data="pwd_1")
-    button_2 = InlineKeyboardButton(text="2", callback_data="pwd_2")
-    button_3 = InlineKeyboardButton(text="3", callback_data="pwd_3")
-    button_4 = InlineKeyboardButton(text="4", callback_data="pwd_4")
-    button_5 = InlineKeyboardButton(text="5", callback_data="pwd_5")
-    button_6 = InlineKeyboardButton(text="6", callback_data="pwd_6")
-    button_7 = InlineKeyboardButton(text="7", callback_data="pwd_7")
-    button_8 = InlineKeyboardButton(text="8", callback_data="pwd_8")
-    button_9 = InlineKeyboardButton(text="9", callback_data="pwd_9")
-    button_cancel = InlineKeyboardButton(text="取消", callback_data="pwd_cancel")
-    button_0 = InlineKeyboardButton(text="0", callback_data="pwd_0")
-    button_delete = InlineKeyboardButton(text="删除", callback_data="pwd_delete")
+    button_1 = InlineKeyboardButton(text="1", callback_data=encode_callback("pwd", key="1"))
+    button_2 = InlineKeyboardButton(text="2", callback_data=encode_callback("pwd", key="2"))
+    button_3 = InlineKeyboardButton(text="3", callback_data=encode_callback("pwd", key="3"))
+    button_4 = InlineKeyboardButton(text="4", callback_data=encode_callback("pwd", key="4"))
+    button_5 = InlineKeyboardButton(text="5", callback_data=encode_callback("pwd", key="5"))
+    button_6 = InlineKeyboardButton(text="6", callback_data=encode_callback("pwd", key="6"))
+    button_7 = InlineKeyboardButton(text="7", callback_data=encode_callback("pwd", key="7"))
+    button_8 = InlineKeyboardButton(text="8", callback_data=encode_callback("pwd", key="8"))
+    button_9 = InlineKeyboardButton(text="9", callback_data=encode_callback("pwd", key="9"))
+    button_cancel = InlineKeyboardButton(text="取消", callback_data=encode_callback("pwd", key="cancel"))
+    button_0 = InlineKeyboardButton(text="0", callback_data=encode_callback("pwd", key="0"))
+    button_delete = InlineKeyboardButton(text="删除", callback_data=encode_callback("pwd", key="delete"))
     
     return InlineKeyboardMarkup(
         [
@@ -134,11 +141,9 @@ def get_password_input_keyboard() -> InlineKeyboardMarkup:
     )
 
 
-
-
-def get_beginner_room_betting_keyboard() -> ReplyKeyboardMarkup:
+def _build_beginner_room_betting_keyboard() -> ReplyKeyboardMarkup:
     """
-    獲取初級房投注金額選擇底部菜單
+    構建初級房投注金額選擇底部菜單
     """
     bet_2_button = KeyboardButton(text="2元")
     bet_5_button = KeyboardButton(text="5元")
@@ -159,9 +164,9 @@ def get_beginner_room_betting_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
-def get_hash_wheel_betting_keyboard() -> ReplyKeyboardMarkup:
+def _build_hash_wheel_betting_keyboard() -> ReplyKeyboardMarkup:
     """
-    獲取哈希轉盤投注金額選擇底部菜單（移除確認當前房型，返回房型選單改為返回上頁）
+    構建哈希轉盤投注金額選擇底部菜單（移除確認當前房型，返回房型選單改為返回上頁）
     """
     bet_2_button = KeyboardButton(text="2元")
     bet_5_button = KeyboardButton(text="5元")
@@ -187,28 +192,31 @@ def get_hash_wheel_betting_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
-def get_personal_report_keyboard() -> ReplyKeyboardMarkup:
+def _build_personal_report_keyboard() -> ReplyKeyboardMarkup:
     """
-    獲取個人報表底部菜單
+    構建個人報表底部菜單
     """
     daily_stats_button = KeyboardButton(text="日统计")
     monthly_stats_button = KeyboardButton(text="月统计")
+    leaderboard_button = KeyboardButton(text="排行榜")
+    export_button = KeyboardButton(text="导出报表")
     
     back_prev_button = KeyboardButton(text="返回上页")
     
     return ReplyKeyboardMarkup(
         [
             [daily_stats_button, monthly_stats_button],  # 第一行
-            [back_prev_button]  # 第二行
+            [leaderboard_button, export_button],  # 第二行
+            [back_prev_button]  # 第三行
         ],
         resize_keyboard=True,
         one_time_keyboard=False
     )
 
 
-def get_auto_bet_amount_keyboard() -> ReplyKeyboardMarkup:
+def _build_auto_bet_amount_keyboard() -> ReplyKeyboardMarkup:
     """
-    獲取自動下注金額選擇底部菜單
+    構建自動下注金額選擇底部菜單
     """
     bet_2_button = KeyboardButton(text="2元")
     bet_5_button = KeyboardButton(text="5元")
@@ -233,9 +241,9 @@ def get_auto_bet_amount_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
-def get_auto_bet_count_keyboard() -> ReplyKeyboardMarkup:
+def _build_auto_bet_count_keyboard() -> ReplyKeyboardMarkup:
     """
-    獲取自動下注次數選擇底部菜單
+    構建自動下注次數選擇底部菜單
     """
     count_10_button = KeyboardButton(text="10次")
     count_20_button = KeyboardButton(text="20次")
@@ -261,9 +269,9 @@ def get_auto_bet_count_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
-def get_stop_betting_keyboard() -> ReplyKeyboardMarkup:
+def _build_stop_betting_keyboard() -> ReplyKeyboardMarkup:
     """
-    獲取停止下注底部菜單
+    構建停止下注底部菜單
     """
     stop_betting_button = KeyboardButton(text="停止下注")
     
@@ -276,4 +284,138 @@ def get_stop_betting_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
+def _build_empty_inline_keyboard() -> InlineKeyboardMarkup:
+    """
+    構建空的 Inline 鍵盤（用於移除訊息上的 Inline 按鈕）
+    """
+    return InlineKeyboardMarkup([])
+
+
+class PrebuiltKeyboard:
+    """預先構建的鍵盤：markup 對象和它序列化後的 JSON"""
+
+    __slots__ = ("name", "markup", "json")
+
+    def __init__(self, name: str, markup: ReplyKeyboardMarkup | InlineKeyboardMarkup):
+        self.name = name
+        self.markup = markup
+        # 不轉義中文、不加空格，減少每次請求的字節數
+        self.json = json.dumps(markup.to_dict(), ensure_ascii=False, separators=(",", ":"))
+
+
+# 鍵盤表
+# key: 鍵盤名稱, value: PrebuiltKeyboard
+_keyboards: dict[str, PrebuiltKeyboard] = {}
+
+# 鍵盤表的只讀視圖
+KEYBOARDS = MappingProxyType(_keyboards)
+
+
+def register_keyboard(name: str, markup: ReplyKeyboardMarkup | InlineKeyboardMarkup) -> PrebuiltKeyboard:
+    """
+    註冊一個鍵盤（在模組導入時調用，註冊後不再修改）
+    :param name: 鍵盤名稱
+    :param markup: 鍵盤
+    :return: 預先構建的鍵盤
+    :raises ValueError: 名稱重複註冊
+    """
+    if name in _keyboards:
+        raise ValueError(f"鍵盤重複註冊: {name}")
+    keyboard = PrebuiltKeyboard(name, markup)
+    _keyboards[name] = keyboard
+    return keyboard
+
+
+def get_keyboard(name: str) -> str:
+    """
+    獲取已註冊鍵盤在導入時預先序列化的 JSON 字符串（不重新構建，也不重新序列化）
+    可直接作為 reply_markup 傳入：python-telegram-bot 對字符串形式的 reply_markup 原樣發送，
+    因此接收它的參數註解為 str，不需要（也不應）改回 ReplyKeyboardMarkup/InlineKeyboardMarkup
+    :param name: 鍵盤名稱
+    :raises KeyError: 鍵盤未註冊
+    """
+    return _keyboards[name].json
+
+
+for _name, _builder in (
+    ("home", _build_home_keyboard),
+    ("game_level1", _build_game_level1_keyboard),
+    ("game_level2", _build_game_level2_keyboard),
+    ("profile", _build_profile_keyboard),
+    ("security_center", _build_security_center_keyboard),
+    ("password_input", _build_password_input_keyboard),
+    ("beginner_room_betting", _build_beginner_room_betting_keyboard),
+    ("hash_wheel_betting", _build_hash_wheel_betting_keyboard),
+    ("personal_report", _build_personal_report_keyboard),
+    ("auto_bet_amount", _build_auto_bet_amount_keyboard),
+    ("auto_bet_count", _build_auto_bet_count_keyboard),
+    ("stop_betting", _build_stop_betting_keyboard),
+    ("empty_inline", _build_empty_inline_keyboard),
+):
+    register_keyboard(_name, _builder())
+del _name, _builder
+
+
+def get_home_keyboard() -> str:
+    """獲取首頁底部常駐菜單"""
+    return _keyboards["home"].json
+
+
+def get_game_level1_keyboard() -> str:
+    """獲取第一層遊戲菜單（哈希转盘那一层）"""
+    return _keyboards["game_level1"].json
+
+
+def get_game_level2_keyboard() -> str:
+    """獲取第二層遊戲菜單（更多游戏那一层）"""
+    return _keyboards["game_level2"].json
+
+
+def get_profile_keyboard() -> str:
+    """獲取個人中心底部菜單"""
+    return _keyboards["profile"].json
+
+
+def get_security_center_keyboard() -> str:
+    """獲取安全中心底部菜單"""
+    return _keyboards["security_center"].json
+
+
+def get_password_input_keyboard() -> str:
+    """獲取提款密碼輸入數字鍵盤（Inline 按鈕）"""
+    return _keyboards["password_input"].json
+
+
+def get_beginner_room_betting_keyboard() -> str:
+    """獲取初級房投注金額選擇底部菜單"""
+    return _keyboards["beginner_room_betting"].json
+
+
+def get_hash_wheel_betting_keyboard() -> str:
+    """獲取哈希轉盤投注金額選擇底部菜單"""
+    return _keyboards["hash_wheel_betting"].json
+
+
+def get_personal_report_keyboard() -> str:
+    """獲取個人報表底部菜單"""
+    return _keyboards["personal_report"].json
+
+
+def get_auto_bet_amount_keyboard() -> str:
+    """獲取自動下注金額選擇底部菜單"""
+    return _keyboards["auto_bet_amount"].json
+
+
+def get_auto_bet_count_keyboard() -> str:
+    """獲取自動下注次數選擇底部菜單"""
+    return _keyboards["auto_bet_count"].json
+
+
+def get_stop_betting_keyboard() -> str:
+    """獲取停止下注底部菜單"""
+    return _keyboards["stop_betting"].json
+
 
+def get_empty_inline_keyboard() -> str:
+    """獲取空的 Inline 鍵盤（用於移除訊息上的 Inline 按鈕）"""
+    return _keyboards["empty_inline"].json
@@ -14,11 +14,24 @@ from messages.game import (
 )
 from messages.report import (
     get_daily_report_message,
-    get_monthly_report_message
+    get_monthly_report_message,
+    get_range_report_message,
+    get_range_report_usage_message,
+    get_operator_report_message,
+    get_operator_report_usage_message,
+    get_operator_only_message,
+    get_report_export_started_message,
+    get_report_export_caption,
+    get_report_export_usage_message,
+    get_report_export_failed_message,
+    get_bet_log_stats_message,
+    get_bet_log_stats_usage_message,
+    get_leaderboard_message
 )
 from messages.account import (
     get_account_info_message,
-    get_user_check_message
+    get_user_check_message,
+    get_platform_unavailable_message
 )
 from messages.deposit_withdraw import (
     get_deposit_amount_prompt,
@@ -48,6 +61,8 @@ from messages.betting import (
     get_bet_success_message,
     get_waiting_hash_message,
     get_hash_result_message,
+    format_hash_link,
+    get_hash_result_message_from_link,
     get_auto_bet_amount_prompt,
     get_bet_confirmation_message,
     get_bet_timeout_message,
@@ -58,6 +73,11 @@ from messages.betting import (
     get_auto_bet_stop_bet_message,
     get_win_caption_message
 )
+from messages.referral import get_referral_message
+from messages.rebate import (
+    get_rebate_dry_run_message,
+    get_rebate_dry_run_usage_message
+)
 
 __all__ = [
     'get_profile_message',
@@ -68,8 +88,21 @@ __all__ = [
     'get_beginner_room_bet_selection_message',
     'get_daily_report_message',
     'get_monthly_report_message',
+    'get_range_report_message',
+    'get_range_report_usage_message',
+    'get_operator_report_message',
+    'get_operator_report_usage_message',
+    'get_operator_only_message',
+    'get_report_export_started_message',
+    'get_report_export_caption',
+    'get_report_export_usage_message',
+    'get_report_export_failed_message',
+    'get_bet_log_stats_message',
+    'get_bet_log_stats_usage_message',
+    'get_leaderboard_message',
     'get_account_info_message',
     'get_user_check_message',
+    'get_platform_unavailable_message',
     'get_deposit_amount_prompt',
     'get_withdraw_amount_prompt',
     'get_withdraw_method_selection_message',
@@ -93,6 +126,8 @@ __all__ = [
     'get_bet_success_message',
     'get_waiting_hash_message',
     'get_hash_result_message',
+    'format_hash_link',
+    'get_hash_result_message_from_link',
     'get_auto_bet_amount_prompt',
     'get_bet_confirmation_message',
     'get_bet_timeout_message',
@@ -101,5 +136,8 @@ __all__ = [
     'get_auto_bet_start_message',
     'get_auto_bet_stop_confirmation_message',
     'get_auto_bet_stop_bet_message',
-    'get_win_caption_message'
+    'get_win_caption_message',
+    'get_rebate_dry_run_message',
+    'get_rebate_dry_run_usage_message',
+    'get_referral_message'
 ]
@@ -53,4 +53,11 @@ def get_user_check_message(user_exists: bool, user_logged_in: bool = False) -> s
         else:
             message += "若用户无登入，帮用户登入，带入第二则讯息，但是无显示密码"
     
-    return message
\ No newline at end of file
+    return message
+
+
+def get_platform_unavailable_message() -> str:
+    """
+    獲取網投平台暫時無法連接的提示訊息
+    """
+    return "平台连接繁忙，请稍后再试"
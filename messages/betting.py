@@ -18,24 +18,24 @@ def get_waiting_hash_message() -> str:
     """
     return "请稍等哈希结果！"
 
-def get_hash_result_message(bonus: str, hash_value: str, hash_url: str, final_balance: str = "") -> str:
+def format_hash_link(hash_value: str, hash_url: str) -> str:
     """
-    獲取哈希結果訊息
-    :param bonus: 彩金金額
-    :param hash_value: 哈希值（完整）
+    生成帶超鏈接的哈希值 HTML（每個輪次只需生成一次）
+    :param hash_value: 顯示用的哈希值，數字部分用 ** 包圍表示粗體（如 ...3c27e7b94**654**feb**32**）
     :param hash_url: 哈希值超鏈接URL
-    :param final_balance: 最終餘額（中獎後，如果為空則不顯示）
     """
-    # 提取哈希值中的數字部分（654 和 32）並設置為粗體
-    # 哈希值格式：...3c27e7b94**654**feb**32**
-    # 需要將 **654** 和 **32** 轉換為 <b>654</b> 和 <b>32</b>
-    import re
     # 將 **數字** 替換為 <b>數字</b>
     formatted_hash = re.sub(r'\*\*(\d+)\*\*', r'<b>\1</b>', hash_value)
-    
-    # 構建帶超鏈接的哈希值
-    hash_link = f'<a href="{hash_url}">{formatted_hash}</a>'
-    
+    return f'<a href="{hash_url}">{formatted_hash}</a>'
+
+
+def get_hash_result_message_from_link(bonus: str, hash_link: str, final_balance: str = "") -> str:
+    """
+    使用已生成的哈希值超鏈接獲取哈希結果訊息
+    :param bonus: 彩金金額
+    :param hash_link: format_hash_link() 生成的超鏈接 HTML
+    :param final_balance: 最終餘額（中獎後，如果為空則不顯示）
+    """
     # 判斷是否中獎
     bonus_float = float(bonus)
     if bonus_float > 0:
@@ -50,6 +50,17 @@ def get_hash_result_message(bonus: str, hash_value: str, hash_url: str, final_ba
         return f"未中奖\n\n哈希值：{hash_link}"
 
 
+def get_hash_result_message(bonus: str, hash_value: str, hash_url: str, final_balance: str = "") -> str:
+    """
+    獲取哈希結果訊息
+    :param bonus: 彩金金額
+    :param hash_value: 哈希值（完整）
+    :param hash_url: 哈希值超鏈接URL
+    :param final_balance: 最終餘額（中獎後，如果為空則不顯示）
+    """
+    return get_hash_result_message_from_link(bonus, format_hash_link(hash_value, hash_url), final_balance)
+
+
 def get_auto_bet_amount_prompt(usdt_balance: str = "0") -> str:
     """
     獲取自動下注金額選擇提示訊息
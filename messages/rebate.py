@@ -0,0 +1,46 @@
+"""
+訊息內容模組 - rebate
+"""
+
+
+def get_rebate_dry_run_message(
+    date: str,
+    user_count: str,
+    bet_amount: str,
+    rebate_amount: str,
+    tiers: list[tuple[str, str, str, str]],
+    progress: str | None = None
+) -> str:
+    """
+    獲取返水試算結果訊息內容
+    :param date: 結算日期，格式：YYYY-MM-DD
+    :param user_count: 可獲得返水的用戶數
+    :param bet_amount: 這些用戶的投注金額合計（USDT）
+    :param rebate_amount: 返水合計（USDT）
+    :param tiers: 各階梯的 (投注下限, 返水比例, 条目数, 返水合計)
+    :param progress: 已入賬進度（如 "10000/25000"），未結算時為 None
+    """
+    lines = [
+        f"返水试算：{date}",
+        "------------------------------------",
+        f"返水人数：{user_count}",
+        f"投注金额：{bet_amount} USDT",
+        f"返水总额：{rebate_amount} USDT",
+        "------------------------------------",
+    ]
+    for floor, rate, count, amount in tiers:
+        lines.append(f"≥ {floor} USDT（{rate}）：{count} 笔，{amount} USDT")
+    lines.append("------------------------------------")
+    lines.append(f"结算状态：{'未结算' if progress is None else f'已入账 {progress}'}")
+    return "\n".join(lines)
+
+
+def get_rebate_dry_run_usage_message() -> str:
+    """
+    獲取返水試算指令的用法說明
+    """
+    return (
+        "用法：\n"
+        "/rebate_dry_run — 试算昨天的返水\n"
+        "/rebate_dry_run 2026-01-01 — 试算指定日期的返水"
+    )
@@ -0,0 +1,23 @@
+"""
+訊息內容模組 - referral
+"""
+
+
+def get_referral_message(link: str, direct_count: str, downline_count: str, downline_volume: str, has_referrer: bool) -> str:
+    """
+    獲取推廣信息訊息內容
+    :param link: 推廣鏈接
+    :param direct_count: 直屬下級人數
+    :param downline_count: 團隊人數（所有下級）
+    :param downline_volume: 團隊投注金額（USDT）
+    :param has_referrer: 是否已有上級
+    """
+    return (
+        "推广链接（好友通过链接加入后成为您的下级）：\n"
+        f"{link}\n"
+        "------------------------------------\n"
+        f"直属下级：{direct_count}\n"
+        f"团队人数：{downline_count}\n"
+        f"团队投注：{downline_volume} USDT\n"
+        f"我的上级：{'已绑定' if has_referrer else '无'}"
+    )
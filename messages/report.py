@@ -4,31 +4,45 @@
 from config import VERIFICATION_ADDRESS, VERIFICATION_AMOUNT
 
 
-def get_daily_report_message(date: str, game: str = "总计") -> str:
+def _get_report_figures(figures: dict[str, str]) -> str:
+    """
+    報表的數字部分（日統計和月統計相同）
+    :param figures: 報表數字（見 get_daily_report_message）
+    """
+    return (
+        "------------------------------------\n"
+        f"投注金额：{figures.get('bet_amount', '0')} USDT\n"
+        f"派奖金额：{figures.get('payout_amount', '0')} USDT\n"
+        f"投注盈亏：{figures.get('bet_profit', '0')} USDT\n"
+        f"充值总额：{figures.get('deposit_amount', '0')} USDT\n"
+        f"提款总额：{figures.get('withdraw_amount', '0')} USDT\n"
+        f"充提输赢：{figures.get('transfer_net', '0')} USDT\n"
+        f"转账笔数：{figures.get('transfer_count', '0')}\n"
+    )
+
+
+def get_daily_report_message(date: str, game: str = "总计", figures: dict[str, str] | None = None) -> str:
     """
     獲取日統計報表訊息內容
     :param date: 日期字符串，格式：YYYY-MM-DD
     :param game: 遊戲類型，默認為「总计」
+    :param figures: 報表數字（已格式化的字符串）：active_accounts, bet_amount, payout_amount, bet_profit,
+                    deposit_amount, withdraw_amount, transfer_net, transfer_count；缺少的項顯示為 0
     """
+    figures = figures or {}
     return (
         f"报表类型：{game}\n"
         f"时间：{date}\n"
-        "活跃账号：0\n"
-        "------------------------------------\n"
-        "投注金额：0 USDT\n"
-        "派奖金额：0 USDT\n"
-        "投注盈亏：0 USDT\n"
-        "充值总额：0 USDT\n"
-        "提款总额：0 USDT\n"
-        "充提输赢：0 USDT\n"
-        "转账笔数：0\n"
+        f"活跃账号：{figures.get('active_accounts', '0')}\n"
+        + _get_report_figures(figures)
     )
 
-def get_monthly_report_message(month: str, game: str = "总计") -> str:
+def get_monthly_report_message(month: str, game: str = "总计", figures: dict[str, str] | None = None) -> str:
     """
     獲取月統計報表訊息內容
     :param month: 月份字符串，格式：YYYY-MM（例如："2026-01"）
     :param game: 遊戲類型，默認為「总计」
+    :param figures: 報表數字（同 get_daily_report_message）
     """
     from datetime import datetime
     from calendar import monthrange
@@ -44,16 +58,175 @@ def get_monthly_report_message(month: str, game: str = "总计") -> str:
     # 生成日期範圍字符串
     date_range = f"{start_date.strftime('%Y-%m-%d')} ~ {end_date.strftime('%Y-%m-%d')}"
     
+    figures = figures or {}
     return (
         f"报表类型：{game}\n"
         f"时间：{date_range}\n"
-        "活跃帐号：0\n"
+        f"活跃帐号：{figures.get('active_accounts', '0')}\n"
+        + _get_report_figures(figures)
+    )
+
+def get_range_report_message(start_date: str, end_date: str, game: str = "总计", figures: dict[str, str] | None = None) -> str:
+    """
+    獲取日期範圍統計報表訊息內容
+    :param start_date: 開始日期，格式：YYYY-MM-DD
+    :param end_date: 結束日期，格式：YYYY-MM-DD
+    :param game: 遊戲類型，默認為「总计」
+    :param figures: 報表數字（同 get_daily_report_message）
+    """
+    figures = figures or {}
+    return (
+        f"报表类型：{game}\n"
+        f"时间：{start_date} ~ {end_date}\n"
+        f"活跃账号：{figures.get('active_accounts', '0')}\n"
+        + _get_report_figures(figures)
+    )
+
+
+def get_range_report_usage_message(max_days: int = 400) -> str:
+    """
+    獲取日期範圍統計報表指令的用法說明
+    :param max_days: 天數的上限
+    """
+    return (
+        "用法：\n"
+        "/range_report — 最近 7 天\n"
+        f"/range_report 30 — 最近 30 天（最多 {max_days} 天）\n"
+        "/range_report 2026-01-01 2026-01-31 — 指定日期范围\n"
+        "可在最后加上游戏名称，例如：/range_report 7 哈希转盘"
+    )
+
+
+def get_operator_report_message(start_date: str, end_date: str, game: str = "总计", figures: dict[str, str] | None = None, error_percent: str = "1.6") -> str:
+    """
+    獲取營運報表（全平台合計）訊息內容
+    :param start_date: 開始日期，格式：YYYY-MM-DD
+    :param end_date: 結束日期，格式：YYYY-MM-DD
+    :param game: 遊戲類型，默認為「总计」
+    :param figures: 報表數字（同 get_daily_report_message，active_accounts 為估算值）
+    :param error_percent: 活躍賬號估算的相對標準誤差（百分比）
+    """
+    figures = figures or {}
+    return (
+        f"平台报表：{game}\n"
+        f"时间：{start_date} ~ {end_date}\n"
+        f"活跃账号：约 {figures.get('active_accounts', '0')}（误差约 ±{error_percent}%）\n"
+        + _get_report_figures(figures)
+    )
+
+
+def get_operator_report_usage_message(max_days: int = 400) -> str:
+    """
+    獲取營運報表指令的用法說明
+    :param max_days: 天數的上限
+    """
+    return (
+        "用法：\n"
+        "/operator_report — 最近 7 天\n"
+        f"/operator_report 30 — 最近 30 天（最多 {max_days} 天）\n"
+        "/operator_report 2026-01-01 2026-01-31 — 指定日期范围\n"
+        "可在最后加上游戏名称，例如：/operator_report 7 哈希转盘"
+    )
+
+
+def get_operator_only_message() -> str:
+    """
+    獲取非營運人員使用營運指令時的提示
+    """
+    return "该指令仅限运营人员使用"
+
+
+def get_report_export_started_message(start_date: str, end_date: str) -> str:
+    """
+    獲取開始導出報表的提示
+    :param start_date: 開始日期，格式：YYYY-MM-DD
+    :param end_date: 結束日期，格式：YYYY-MM-DD
+    """
+    return f"正在导出 {start_date} ~ {end_date} 的报表，完成后将以文件发送"
+
+
+def get_report_export_caption(start_date: str, end_date: str, game: str = "总计") -> str:
+    """
+    獲取導出報表文件的說明文字
+    :param start_date: 開始日期，格式：YYYY-MM-DD
+    :param end_date: 結束日期，格式：YYYY-MM-DD
+    :param game: 遊戲類型，默認為「总计」
+    """
+    return f"报表类型：{game}\n时间：{start_date} ~ {end_date}"
+
+
+def get_report_export_usage_message(max_days: int = 400) -> str:
+    """
+    獲取導出報表指令的用法說明
+    :param max_days: 天數的上限
+    """
+    return (
+        "用法：\n"
+        "/export_report — 最近 7 天\n"
+        f"/export_report 30 — 最近 30 天（最多 {max_days} 天）\n"
+        "/export_report 2026-01-01 2026-01-31 — 指定日期范围\n"
+        "可在最后加上游戏名称，例如：/export_report 7 哈希转盘"
+    )
+
+
+def get_report_export_failed_message() -> str:
+    """
+    獲取導出報表失敗的提示
+    """
+    return "报表导出失败，请缩小日期范围后重试"
+
+
+def get_bet_log_stats_message(start_date: str, end_date: str, game: str, figures: dict[str, str], pending: str) -> str:
+    """
+    獲取投注日誌統計（RTP 核對）訊息內容
+    :param start_date: 開始日期，格式：YYYY-MM-DD
+    :param end_date: 結束日期，格式：YYYY-MM-DD
+    :param game: 遊戲類型
+    :param figures: 統計數字（bets 注數、stake 投注總額、payout 彩金總額、rtp 返還率），均為已格式化的字符串
+    :param pending: 尚未寫盤（未計入統計）的注數
+    """
+    return (
+        f"投注日志统计：{game}\n"
+        f"时间：{start_date} ~ {end_date}\n"
+        "------------------------------------\n"
+        f"注数：{figures.get('bets', '0')}\n"
+        f"投注总额：{figures.get('stake', '0.00')} USDT\n"
+        f"彩金总额：{figures.get('payout', '0.00')} USDT\n"
+        f"返还率（RTP）：{figures.get('rtp', '0.00')}%\n"
         "------------------------------------\n"
-        "投注金额：0 USDT\n"
-        "派奖金额：0 USDT\n"
-        "投注盈亏：0 USDT\n"
-        "充值总额：0 USDT\n"
-        "提款总额：0 USDT\n"
-        "充提输赢：0 USDT\n"
-        "转账笔数：0\n"
-    )
\ No newline at end of file
+        f"待写入日志：{pending} 注（未计入统计）"
+    )
+
+
+def get_bet_log_stats_usage_message(max_days: int = 400) -> str:
+    """
+    獲取投注日誌統計指令的用法說明
+    :param max_days: 天數的上限
+    """
+    return (
+        "用法：\n"
+        "/bet_log_stats — 最近 7 天\n"
+        f"/bet_log_stats 30 — 最近 30 天（最多 {max_days} 天）\n"
+        "/bet_log_stats 2026-01-01 2026-01-31 — 指定日期范围\n"
+        "可在最后加上游戏名称，例如：/bet_log_stats 7 哈希转盘"
+    )
+
+
+def get_leaderboard_message(period: str, start_date: str, end_date: str, metric: str, game: str, entries: list[tuple[str, str]]) -> str:
+    """
+    獲取排行榜訊息內容
+    :param period: 週期（"day" 或 "week"）
+    :param start_date: 週期開始日期，格式：YYYY-MM-DD
+    :param end_date: 週期結束日期，格式：YYYY-MM-DD
+    :param metric: 指標（"volume" 投注榜 或 "payout" 中奖榜）
+    :param game: 遊戲類型
+    :param entries: 按名次排序的 [(賬號, 金額)]，均為已格式化的字符串
+    """
+    period_text = f"今日（{start_date}）" if period == "day" else f"本周（{start_date} ~ {end_date}）"
+    metric_text = "投注榜" if metric == "volume" else "中奖榜"
+    lines = [f"🏆 {period_text}{metric_text}：{game}", "------------------------------------"]
+    if not entries:
+        lines.append("暂无数据")
+    for rank, (account, amount) in enumerate(entries, start=1):
+        lines.append(f"{rank}. {account}  {amount} USDT")
+    return "\n".join(lines)
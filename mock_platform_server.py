@@ -0,0 +1,75 @@
+"""
+模擬網投平台服務
+在內存中實現 platform_client.py 使用的平台接口，用於本地測試和壓測（不保存任何數據）：
+    uvicorn mock_platform_server:app --port 8001
+可通過環境變量模擬延遲和故障：
+- MOCK_PLATFORM_LATENCY：每個請求的延遲（秒），默認 0
+- MOCK_PLATFORM_FAILURE_RATE：返回 503 的比例（0～1），默認 0
+"""
+
+import asyncio
+import os
+import random
+import string
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+LATENCY = float(os.environ.get("MOCK_PLATFORM_LATENCY", "0"))
+FAILURE_RATE = float(os.environ.get("MOCK_PLATFORM_FAILURE_RATE", "0"))
+
+app = FastAPI(title="Mock Platform")
+
+# 用戶
+# key: telegram_id, value: {"username": 用戶名, "password": 密碼, "logged_in": 是否已登入}
+_users: dict[int, dict] = {}
+
+
+class RegisterRequest(BaseModel):
+    telegram_id: int
+    username: str
+
+
+async def _simulate() -> None:
+    """模擬延遲和故障"""
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+    if FAILURE_RATE and random.random() < FAILURE_RATE:
+        raise HTTPException(status_code=503, detail="mock failure")
+
+
+@app.get("/api/users/{telegram_id}")
+async def get_user(telegram_id: int) -> dict:
+    await _simulate()
+    user = _users.get(telegram_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="user not found")
+    return {"telegram_id": telegram_id, "username": user["username"], "logged_in": user["logged_in"]}
+
+
+@app.post("/api/users", status_code=201)
+async def register_user(request: RegisterRequest) -> dict:
+    await _simulate()
+    user = _users.get(request.telegram_id)
+    if user is None:
+        # 密碼：8 碼隨機小寫英文 + 數字
+        password = "".join(random.choice(string.ascii_lowercase + string.digits) for _ in range(8))
+        user = _users[request.telegram_id] = {"username": request.username, "password": password, "logged_in": False}
+    # 重複註冊（例如重試）返回同一個賬號
+    return {"telegram_id": request.telegram_id, "username": user["username"], "password": user["password"]}
+
+
+@app.post("/api/users/{telegram_id}/login")
+async def login_user(telegram_id: int) -> dict:
+    await _simulate()
+    user = _users.get(telegram_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="user not found")
+    user["logged_in"] = True
+    return {"telegram_id": telegram_id, "logged_in": True}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="127.0.0.1", port=int(os.environ.get("MOCK_PLATFORM_PORT", "8001")))
@@ -0,0 +1,247 @@
+"""
+網投平台異步客戶端模組
+所有平台請求共用一個 httpx.AsyncClient（連接池 + keep-alive），不阻塞事件循環：
+- 每個請求有自己的超時
+- 連接失敗、超時、429 和 5xx 會重試（指數退避），重試次數同時受單次請求的上限和全局重試預算限制，
+  平台故障時不會因為大量重試把流量放大
+- 平台返回的賬號信息同步寫入本地狀態（與 Mock 模式相同），已知用戶的存在檢查不需要請求平台
+
+未設置 PLATFORM_API_BASE_URL 時使用 Mock 模式（platform_api.py 的本地實現），不發出任何請求
+本地測試和壓測可以用 mock_platform_server.py 啟動一個模擬平台：
+    uvicorn mock_platform_server:app --port 8001
+並在 config.py 中設置 PLATFORM_API_BASE_URL = "http://127.0.0.1:8001"
+"""
+
+import asyncio
+import logging
+import random
+
+import httpx
+
+import platform_api
+from state import get_user_account, set_user_account, set_user_password, set_user_login_status
+
+# 網投平台 API 地址，None 表示使用 Mock 模式，可在 config.py 中覆蓋
+try:
+    from config import PLATFORM_API_BASE_URL
+except ImportError:
+    PLATFORM_API_BASE_URL = None
+
+# 單次請求的超時（秒），可在 config.py 中覆蓋
+try:
+    from config import PLATFORM_API_TIMEOUT
+except ImportError:
+    PLATFORM_API_TIMEOUT = 5.0
+
+# 單次調用最多嘗試的次數（含第一次），可在 config.py 中覆蓋
+try:
+    from config import PLATFORM_API_MAX_ATTEMPTS
+except ImportError:
+    PLATFORM_API_MAX_ATTEMPTS = 3
+
+# 重試預算：每個請求存入的重試額度，即重試請求最多佔正常請求的比例，可在 config.py 中覆蓋
+try:
+    from config import PLATFORM_API_RETRY_RATIO
+except ImportError:
+    PLATFORM_API_RETRY_RATIO = 0.2
+
+# 連接池上限，可在 config.py 中覆蓋
+try:
+    from config import PLATFORM_API_MAX_CONNECTIONS
+except ImportError:
+    PLATFORM_API_MAX_CONNECTIONS = 100
+
+# 第一次重試前的等待時間（秒），之後每次翻倍並加入隨機抖動
+_RETRY_BACKOFF = 0.1
+
+# 重試預算的最大額度（空閒一段時間後最多可以連續重試的次數）
+_RETRY_BUDGET_MAX = 20.0
+
+# 需要重試的 HTTP 狀態碼
+_RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+logger = logging.getLogger(__name__)
+
+
+class PlatformAPIError(Exception):
+    """平台請求失敗（重試後仍失敗，或返回了無法處理的響應）"""
+
+
+class _RetryBudget:
+    """全局重試預算：每個請求存入 ratio 個額度，每次重試取出一個，額度不足時不重試"""
+
+    __slots__ = ("ratio", "maximum", "tokens")
+
+    def __init__(self, ratio: float, maximum: float = _RETRY_BUDGET_MAX):
+        self.ratio = ratio
+        self.maximum = maximum
+        self.tokens = maximum
+
+    def deposit(self) -> None:
+        self.tokens = min(self.maximum, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class AsyncPlatformClient:
+    """網投平台異步客戶端"""
+
+    def __init__(
+        self,
+        base_url: str | None = PLATFORM_API_BASE_URL,
+        timeout: float = PLATFORM_API_TIMEOUT,
+        max_attempts: int = PLATFORM_API_MAX_ATTEMPTS,
+        retry_ratio: float = PLATFORM_API_RETRY_RATIO,
+        max_connections: int = PLATFORM_API_MAX_CONNECTIONS,
+        transport: httpx.AsyncBaseTransport | None = None
+    ):
+        """
+        :param base_url: 平台 API 地址，None 表示 Mock 模式
+        :param timeout: 默認的單次請求超時（秒）
+        :param max_attempts: 單次調用最多嘗試的次數
+        :param retry_ratio: 重試預算比例
+        :param max_connections: 連接池上限
+        :param transport: 自定義傳輸層（測試時使用）
+        """
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self._budget = _RetryBudget(retry_ratio)
+        self._http: httpx.AsyncClient | None = None
+        if base_url is not None:
+            self._http = httpx.AsyncClient(
+                base_url=base_url,
+                timeout=timeout,
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+                transport=transport
+            )
+
+    @property
+    def is_mock(self) -> bool:
+        """是否為 Mock 模式"""
+        return self._http is None
+
+    async def _request(self, method: str, path: str, timeout: float | None = None, **kwargs) -> httpx.Response:
+        """
+        發送請求，可重試的失敗在次數和重試預算允許時重試
+        :param timeout: 本次請求的超時（秒），默認使用客戶端的超時
+        :return: 響應（狀態碼不在重試範圍內）
+        :raises PlatformAPIError: 重試後仍失敗
+        """
+        self._budget.deposit()
+        attempt = 1
+        while True:
+            try:
+                response = await self._http.request(method, path, timeout=timeout or self.timeout, **kwargs)
+                if response.status_code not in _RETRYABLE_STATUS:
+                    return response
+                error = f"HTTP {response.status_code}"
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+
+            if attempt >= self.max_attempts or not self._budget.withdraw():
+                raise PlatformAPIError(f"{method} {path} 失敗（已嘗試 {attempt} 次）: {error}")
+            delay = _RETRY_BACKOFF * (2 ** (attempt - 1)) * (0.5 + random.random())
+            logger.warning(f"平台請求 {method} {path} 失敗，{delay:.2f} 秒後重試（第 {attempt} 次）: {error}")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def user_exists(self, telegram_id: int, timeout: float | None = None) -> bool:
+        """
+        檢查TG ID用戶是否存在於網投平台（本地已有賬號時不請求平台）
+        :param telegram_id: Telegram ID
+        :param timeout: 本次請求的超時（秒）
+        """
+        if self.is_mock or get_user_account(telegram_id) is not None:
+            return platform_api.check_user_exists(telegram_id)
+        response = await self._request("GET", f"/api/users/{telegram_id}", timeout=timeout)
+        if response.status_code == 404:
+            return False
+        if response.status_code != 200:
+            raise PlatformAPIError(f"查詢用戶 {telegram_id} 失敗: HTTP {response.status_code}")
+        set_user_account(telegram_id, response.json()["username"])
+        return True
+
+    async def register_user(self, telegram_user, timeout: float | None = None) -> tuple[str, str]:
+        """
+        在網投平台註冊新用戶
+        :param telegram_user: Telegram User 對象
+        :param timeout: 本次請求的超時（秒）
+        :return: (username, password) 元組
+        """
+        if self.is_mock:
+            return platform_api.register_user(telegram_user)
+        response = await self._request(
+            "POST",
+            "/api/users",
+            timeout=timeout,
+            json={"telegram_id": telegram_user.id, "username": platform_api.generate_username(telegram_user)}
+        )
+        if response.status_code not in (200, 201):
+            raise PlatformAPIError(f"註冊用戶 {telegram_user.id} 失敗: HTTP {response.status_code}")
+        data = response.json()
+        set_user_account(telegram_user.id, data["username"])
+        set_user_password(telegram_user.id, data["password"])
+        set_user_login_status(telegram_user.id, False)  # 剛註冊，未登入
+        logger.info(f"註冊新用戶: TG ID={telegram_user.id}, 用戶名={data['username']}")
+        return data["username"], data["password"]
+
+    async def login_user(self, telegram_id: int, timeout: float | None = None) -> bool:
+        """
+        幫用戶登入網投平台
+        :param telegram_id: Telegram ID
+        :param timeout: 本次請求的超時（秒）
+        :return: 登入是否成功
+        """
+        if self.is_mock:
+            return platform_api.login_user(telegram_id)
+        response = await self._request("POST", f"/api/users/{telegram_id}/login", timeout=timeout)
+        if response.status_code == 404:
+            logger.warning(f"嘗試登入不存在的用戶: TG ID={telegram_id}")
+            return False
+        if response.status_code != 200:
+            raise PlatformAPIError(f"用戶 {telegram_id} 登入失敗: HTTP {response.status_code}")
+        set_user_login_status(telegram_id, True)
+        return True
+
+    async def aclose(self) -> None:
+        """關閉連接池"""
+        if self._http is not None:
+            await self._http.aclose()
+
+
+# 共用的客戶端（第一次使用時創建）
+_client: AsyncPlatformClient | None = None
+
+
+def get_platform_client() -> AsyncPlatformClient:
+    """獲取共用的平台客戶端"""
+    global _client
+    if _client is None:
+        _client = AsyncPlatformClient()
+    return _client
+
+
+async def close_platform_client() -> None:
+    """關閉共用的平台客戶端（關閉 Bot 時調用）"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+__all__ = [
+    'PLATFORM_API_BASE_URL',
+    'PLATFORM_API_TIMEOUT',
+    'PLATFORM_API_MAX_ATTEMPTS',
+    'PLATFORM_API_RETRY_RATIO',
+    'PLATFORM_API_MAX_CONNECTIONS',
+    'PlatformAPIError',
+    'AsyncPlatformClient',
+    'get_platform_client',
+    'close_platform_client'
+]
@@ -5,8 +5,21 @@
 
 # 導出所有狀態函數
 from state.menu_state import *
+from state.input_state import *
 from state.report_state import *
 from state.user_data import *
 from state.binding_state import *
 from state.withdraw_state import *
+from state.user_index import *
+from state.balance_table import *
+from state.ledger import *
 from state.betting_state import *
+from state.active_users import *
+from state.leaderboard import *
+from state.referral import *
+from state.report_rollup import *
+from state.rebate_state import *
+from state.bet_log import *
+from state.round_state import *
+from state.expiry import *
+from state.snapshot import *
@@ -0,0 +1,140 @@
+"""
+狀態管理模組 - active_users
+活躍賬號的近似去重計數（HyperLogLog）：每個 (日期, 遊戲) 一個固定大小的草圖，
+投注、充值、提款記入報表時（state/report_rollup.py）把用戶ID加入當天對應遊戲和「总计」的草圖
+任意月份、日期範圍、遊戲的活躍賬號數由多個日草圖逐寄存器取最大值合併後估算，不需要保存用戶集合
+
+精度：2^ACTIVE_SKETCH_PRECISION 個寄存器（默認 4096 個，每個草圖 4 KB），
+估算的相對標準誤差約為 1.04 / sqrt(寄存器數)，默認約 1.6%；人數較少時用線性計數修正，基本準確
+只在事件循環上讀寫，不加鎖
+"""
+
+from datetime import date as date_type, datetime, timedelta
+
+import numpy as np
+
+# 寄存器數的對數（4 - 16），可在 config.py 中覆蓋；修改後舊快照中的草圖會被丟棄
+try:
+    from config import ACTIVE_SKETCH_PRECISION
+except ImportError:
+    ACTIVE_SKETCH_PRECISION = 12
+
+_REGISTERS = 1 << ACTIVE_SKETCH_PRECISION
+_INDEX_SHIFT = np.uint64(64 - ACTIVE_SKETCH_PRECISION)
+_RANK_BITS = 64 - ACTIVE_SKETCH_PRECISION
+_ALPHA = 0.7213 / (1 + 1.079 / _REGISTERS)
+
+# 估算的相對標準誤差
+ACTIVE_SKETCH_ERROR = 1.04 / _REGISTERS ** 0.5
+
+# 日草圖
+# key: ("YYYY-MM-DD", 遊戲名稱或 "总计"), value: uint8 寄存器數組
+_sketches: dict[tuple[str, str], np.ndarray] = {}
+
+
+def _hash_user_ids(user_ids: np.ndarray) -> np.ndarray:
+    """把用戶ID打散為均勻分佈的 64 位哈希（splitmix64 的混合函數）"""
+    h = np.asarray(user_ids, dtype=np.int64).astype(np.uint64)
+    h = h + np.uint64(0x9E3779B97F4A7C15)
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+
+def _register_updates(user_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    計算每個用戶ID落入的寄存器和對應的值
+    :return: (寄存器下標, 值)；值為哈希低位部分最低位的 1 的位置（從 1 開始），全零時為 _RANK_BITS + 1
+    """
+    h = _hash_user_ids(user_ids)
+    index = (h >> _INDEX_SHIFT).astype(np.intp)
+    rest = h & np.uint64((1 << _RANK_BITS) - 1)
+    # rest & -rest 只保留最低位的 1，是 2 的冪，轉為浮點數後取對數是精確的
+    lowest = rest & (~rest + np.uint64(1))
+    rank = np.where(rest == 0, _RANK_BITS + 1, np.log2(np.maximum(lowest, 1).astype(np.float64)) + 1)
+    return index, rank.astype(np.uint8)
+
+
+def _add_to_sketch(day: str, game: str, index: np.ndarray, rank: np.ndarray) -> None:
+    sketch = _sketches.get((day, game))
+    if sketch is None:
+        sketch = _sketches[(day, game)] = np.zeros(_REGISTERS, dtype=np.uint8)
+    np.maximum.at(sketch, index, rank)
+
+
+def record_active_users(user_ids: np.ndarray, games: tuple[str, ...], when: datetime) -> None:
+    """
+    把一批活躍用戶加入當天各遊戲的草圖
+    :param user_ids: 用戶ID數組（可以重複）
+    :param games: 遊戲名稱或「总计」（投注記入遊戲和「总计」，充值提款只記入「总计」）
+    :param when: 事件時間
+    """
+    if not len(user_ids):
+        return
+    index, rank = _register_updates(user_ids)
+    day = when.strftime("%Y-%m-%d")
+    for game in games:
+        _add_to_sketch(day, game, index, rank)
+
+
+def _estimate(registers: np.ndarray) -> int:
+    """由（合併後的）寄存器估算去重人數"""
+    estimate = _ALPHA * _REGISTERS * _REGISTERS / float(np.sum(np.ldexp(1.0, -registers.astype(np.int32))))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * _REGISTERS and zeros:
+        # 人數較少時改用線性計數
+        estimate = _REGISTERS * np.log(_REGISTERS / zeros)
+    return int(round(estimate))
+
+
+def estimate_active_users(start_date: str, end_date: str, game: str) -> int:
+    """
+    估算一個日期範圍（含首尾）內的活躍賬號數，合併範圍內的日草圖
+    :param start_date: 開始日期（YYYY-MM-DD）
+    :param end_date: 結束日期（YYYY-MM-DD）
+    :param game: 遊戲名稱或「总计」
+    :return: 估算的活躍賬號數（相對誤差見 ACTIVE_SKETCH_ERROR）
+    :raises ValueError: 日期格式錯誤
+    """
+    start = date_type.fromisoformat(start_date)
+    end = date_type.fromisoformat(end_date)
+    merged = np.zeros(_REGISTERS, dtype=np.uint8)
+    found = False
+    day = start
+    while day <= end:
+        sketch = _sketches.get((day.isoformat(), game))
+        if sketch is not None:
+            np.maximum(merged, sketch, out=merged)
+            found = True
+        day += timedelta(days=1)
+    return _estimate(merged) if found else 0
+
+
+def dump_active_users() -> dict:
+    """取得日草圖的數據副本（用於快照，按列存放）"""
+    keys = list(_sketches)
+    return {
+        "precision": ACTIVE_SKETCH_PRECISION,
+        "dates": [day for day, _ in keys],
+        "games": [game for _, game in keys],
+        "registers": np.array([_sketches[key] for key in keys], dtype=np.uint8).reshape(-1, _REGISTERS)
+    }
+
+
+def load_active_users(data: dict) -> None:
+    """用快照數據覆蓋日草圖（精度不同的快照無法合併，直接丟棄）"""
+    _sketches.clear()
+    if data.get("precision") != ACTIVE_SKETCH_PRECISION:
+        return
+    for day, game, registers in zip(data["dates"], data["games"], data["registers"]):
+        _sketches[(day, game)] = registers.copy()
+
+
+__all__ = [
+    'ACTIVE_SKETCH_PRECISION',
+    'ACTIVE_SKETCH_ERROR',
+    'record_active_users',
+    'estimate_active_users',
+    'dump_active_users',
+    'load_active_users'
+]
@@ -0,0 +1,138 @@
+"""
+狀態管理模組 - balance_table
+按行號存放的整數餘額表：連續的 int64 數組（容量不足時翻倍），每個用戶 9 字節（餘額 + 開戶標記），
+支持向量化的批量入賬/扣款，以及供報表和快照使用的零拷貝視圖
+行號由 state/user_index.py 分配
+"""
+
+import numpy as np
+
+# 單行餘額的上限：遠低於 int64 的最大值，批量入賬用浮點數預先檢查合計時不會因為誤差越過 int64
+MAX_BALANCE = 2 ** 62
+
+
+class BalanceTable:
+    """
+    整數餘額表
+    - 單行讀寫 O(1)
+    - 批量入賬/扣款為一次 NumPy 向量運算
+    - 本類不加鎖，並發保護由調用方（賬本）負責
+    - 入賬後超過 MAX_BALANCE 的操作會被拒絕（拋出 OverflowError 且不做任何變動），不會發生 int64 溢出
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        """
+        :param initial_capacity: 初始容量（行數）
+        """
+        self._values = np.zeros(initial_capacity, dtype=np.int64)
+        # 該行是否已開戶（區分「餘額為 0」和「尚未開戶」）
+        self._present = np.zeros(initial_capacity, dtype=np.bool_)
+        # 已使用的行數（最大行號 + 1）
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """表佔用的內存（字節，含未使用的容量）"""
+        return self._values.nbytes + self._present.nbytes
+
+    def _ensure_capacity(self, rows: int) -> None:
+        """保證至少有 rows 行的容量（翻倍擴容）"""
+        capacity = len(self._values)
+        if rows <= capacity:
+            if rows > self._size:
+                self._size = rows
+            return
+        while capacity < rows:
+            capacity *= 2
+        values = np.zeros(capacity, dtype=np.int64)
+        values[:self._size] = self._values[:self._size]
+        present = np.zeros(capacity, dtype=np.bool_)
+        present[:self._size] = self._present[:self._size]
+        self._values = values
+        self._present = present
+        self._size = rows
+
+    def has(self, index: int) -> bool:
+        """該行是否已開戶"""
+        return index < self._size and bool(self._present[index])
+
+    def get(self, index: int) -> int:
+        """讀取一行的餘額（未開戶的行為 0）"""
+        if index >= self._size:
+            return 0
+        return int(self._values[index])
+
+    def set(self, index: int, value: int) -> None:
+        """
+        設置一行的餘額（同時標記為已開戶）
+        :raises OverflowError: value 超過 MAX_BALANCE
+        """
+        if value > MAX_BALANCE:
+            raise OverflowError(f"餘額超過上限: {value}")
+        self._ensure_capacity(index + 1)
+        self._values[index] = value
+        self._present[index] = True
+
+    def add(self, index: int, delta: int) -> int:
+        """
+        一行的餘額加上 delta
+        :return: 變動後餘額
+        :raises OverflowError: 變動後餘額超過 MAX_BALANCE
+        """
+        if self.get(index) + delta > MAX_BALANCE:
+            raise OverflowError(f"第 {index} 行入賬後餘額超過上限: {self.get(index)} + {delta}")
+        self._ensure_capacity(index + 1)
+        self._values[index] += delta
+        self._present[index] = True
+        return int(self._values[index])
+
+    def bulk_credit(self, indexes: np.ndarray, amounts: np.ndarray) -> None:
+        """
+        批量入賬（同一行可以出現多次，金額累加）
+        :param indexes: 行號數組
+        :param amounts: 與 indexes 一一對應的金額數組（不能為負）
+        :raises OverflowError: 任何一行入賬後的餘額超過 MAX_BALANCE（整批不入賬）
+        """
+        if not len(indexes):
+            return
+        self._ensure_capacity(int(indexes.max()) + 1)
+        # 先用浮點數計算每行入賬後的餘額：整數相加可能已經溢出，浮點數只有很小的相對誤差
+        rows, inverse = np.unique(indexes, return_inverse=True)
+        totals = np.bincount(inverse, weights=amounts, minlength=len(rows)) + self._values[rows]
+        if (totals > MAX_BALANCE).any():
+            raise OverflowError(f"批量入賬後有 {int((totals > MAX_BALANCE).sum())} 行餘額超過上限")
+        np.add.at(self._values, indexes, amounts)
+        self._present[indexes] = True
+
+    def take(self, indexes: np.ndarray) -> np.ndarray:
+        """批量讀取餘額（返回副本）"""
+        if len(indexes):
+            self._ensure_capacity(int(indexes.max()) + 1)
+        return self._values[indexes]
+
+    def view(self) -> np.ndarray:
+        """
+        按行號排列的餘額只讀視圖（零拷貝；擴容後舊視圖不再更新，用完即棄）
+        :return: 長度為 len(self) 的 int64 數組
+        """
+        view = self._values[:self._size]
+        view.flags.writeable = False
+        return view
+
+    def present_view(self) -> np.ndarray:
+        """已開戶標記的只讀視圖（零拷貝）"""
+        view = self._present[:self._size]
+        view.flags.writeable = False
+        return view
+
+    def clear(self) -> None:
+        """清空所有行（保留容量）"""
+        self._values[:self._size] = 0
+        self._present[:self._size] = False
+        self._size = 0
+
+
+__all__ = ['MAX_BALANCE', 'BalanceTable']
@@ -0,0 +1,343 @@
+"""
+狀態管理模組 - bet_log
+只追加的列式投注日誌：每一注已開獎的投注按列寫入定長類型的二進制文件，
+按段（每段最多 BET_LOG_SEGMENT_ROWS 行）分目錄存放：
+
+    data/betlog/seg-000000/ts_ms.bin、user_id.bin、game.bin、stake.bin、payout.bin、round_id.bin
+
+每個文件就是一個小端序的定長數組，可以直接用 np.memmap 映射後做向量運算，不需要解析
+開獎時只把本輪的數組追加到內存緩衝區，由後台任務定期在線程中批量寫盤
+"""
+
+import asyncio
+import logging
+import os
+from typing import Iterator
+
+import numpy as np
+
+# 投注日誌目錄，可在 config.py 中覆蓋
+try:
+    from config import BET_LOG_DIR
+except ImportError:
+    BET_LOG_DIR = "data/betlog"
+
+# 每段的最大行數，可在 config.py 中覆蓋
+try:
+    from config import BET_LOG_SEGMENT_ROWS
+except ImportError:
+    BET_LOG_SEGMENT_ROWS = 1 << 22
+
+# 寫盤間隔（秒），可在 config.py 中覆蓋
+try:
+    from config import BET_LOG_FLUSH_INTERVAL
+except ImportError:
+    BET_LOG_FLUSH_INTERVAL = 5
+
+# 列定義
+# key: 列名（即文件名）, value: 數據類型
+BET_LOG_COLUMNS: dict[str, np.dtype] = {
+    # 開獎時間（Unix 毫秒）
+    "ts_ms": np.dtype("<i8"),
+    # 用戶ID（用戶行號不寫入快照，重啟後會變化，所以日誌保存用戶ID）
+    "user_id": np.dtype("<i8"),
+    # 遊戲（handlers/constants.py 中 GAME_BUTTONS 的下標）
+    "game": np.dtype("u1"),
+    # 投注金額（微 USDT）
+    "stake": np.dtype("<i8"),
+    # 彩金（微 USDT，未中獎為 0）
+    "payout": np.dtype("<i8"),
+    # 輪次號
+    "round_id": np.dtype("<i8"),
+}
+
+logger = logging.getLogger(__name__)
+
+# 尚未寫盤的批次（事件循環上追加，寫盤時整體交換）
+_pending: list[dict[str, np.ndarray]] = []
+
+# 防止兩次寫盤重疊
+_flush_lock = asyncio.Lock()
+
+# 當前寫入的段：(段號, 已有行數)，第一次寫盤時從磁盤讀取
+_tail: tuple[int, int] | None = None
+
+# 各段的時間範圍緩存，按時間範圍讀取時據此跳過整段
+# key: 段目錄, value: (已統計的行數, 最早開獎時間, 最晚開獎時間)（Unix 毫秒）
+_segment_ts_bounds: dict[str, tuple[int, int, int]] = {}
+
+
+def append_bets(ts_ms: int, user_ids: np.ndarray, game: int, stakes: np.ndarray, payouts: np.ndarray, round_id: int) -> None:
+    """
+    追加一個輪次的投注到寫盤緩衝區（同一輪次的時間、遊戲和輪次號相同）
+    :param ts_ms: 開獎時間（Unix 毫秒）
+    :param user_ids: 用戶ID數組
+    :param game: 遊戲下標
+    :param stakes: 投注金額數組（微 USDT）
+    :param payouts: 彩金數組（微 USDT）
+    :param round_id: 輪次號
+    """
+    count = len(user_ids)
+    if not count:
+        return
+    _pending.append({
+        "ts_ms": np.full(count, ts_ms, dtype=BET_LOG_COLUMNS["ts_ms"]),
+        "user_id": np.asarray(user_ids, dtype=BET_LOG_COLUMNS["user_id"]),
+        "game": np.full(count, game, dtype=BET_LOG_COLUMNS["game"]),
+        "stake": np.asarray(stakes, dtype=BET_LOG_COLUMNS["stake"]),
+        "payout": np.asarray(payouts, dtype=BET_LOG_COLUMNS["payout"]),
+        "round_id": np.full(count, round_id, dtype=BET_LOG_COLUMNS["round_id"]),
+    })
+
+
+def get_pending_bet_count() -> int:
+    """尚未寫盤的投注數"""
+    return sum(len(batch["stake"]) for batch in _pending)
+
+
+def _segment_path(directory: str, segment: int) -> str:
+    return os.path.join(directory, f"seg-{segment:06d}")
+
+
+def _segment_rows(path: str) -> int:
+    """段的有效行數（各列行數的最小值；寫到一半崩潰時較長的列多出的部分無效）"""
+    rows = None
+    for name, dtype in BET_LOG_COLUMNS.items():
+        column_path = os.path.join(path, f"{name}.bin")
+        column_rows = os.path.getsize(column_path) // dtype.itemsize if os.path.exists(column_path) else 0
+        rows = column_rows if rows is None else min(rows, column_rows)
+    return rows or 0
+
+
+def list_bet_log_segments(directory: str = BET_LOG_DIR) -> list[str]:
+    """按順序列出所有段的目錄"""
+    if not os.path.isdir(directory):
+        return []
+    return [
+        os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if name.startswith("seg-")
+    ]
+
+
+def _open_tail(directory: str) -> tuple[int, int]:
+    """找到最後一段，把各列截斷到相同行數（修復寫到一半崩潰的段）"""
+    segments = list_bet_log_segments(directory)
+    if not segments:
+        return 0, 0
+    path = segments[-1]
+    segment = int(os.path.basename(path)[4:])
+    rows = _segment_rows(path)
+    for name, dtype in BET_LOG_COLUMNS.items():
+        column_path = os.path.join(path, f"{name}.bin")
+        if os.path.exists(column_path) and os.path.getsize(column_path) != rows * dtype.itemsize:
+            with open(column_path, "r+b") as column_file:
+                column_file.truncate(rows * dtype.itemsize)
+            logger.warning(f"投注日誌段 {path} 的列 {name} 長度不一致，已截斷到 {rows} 行")
+    return segment, rows
+
+
+def _truncate_segment(path: str, rows: int) -> None:
+    """把段的各列截斷到 rows 行"""
+    for name, dtype in BET_LOG_COLUMNS.items():
+        column_path = os.path.join(path, f"{name}.bin")
+        if os.path.exists(column_path) and os.path.getsize(column_path) > rows * dtype.itemsize:
+            with open(column_path, "r+b") as column_file:
+                column_file.truncate(rows * dtype.itemsize)
+
+
+def _write_columns(columns: dict[str, np.ndarray], directory: str, progress: list[int]) -> int:
+    """
+    把各列追加到段文件，段滿後開始新段（在後台線程中調用）
+    :param columns: {列名: 數組}
+    :param directory: 日誌目錄
+    :param progress: progress[0] 記錄已完整寫入的行數（寫盤失敗時調用方據此只重試未寫入的部分）
+    :return: 寫入的行數
+    """
+    global _tail
+    total = len(columns["stake"])
+    if _tail is None:
+        _tail = _open_tail(directory)
+    segment, rows = _tail
+
+    written = 0
+    while written < total:
+        if rows >= BET_LOG_SEGMENT_ROWS:
+            segment, rows = segment + 1, 0
+        take = min(total - written, BET_LOG_SEGMENT_ROWS - rows)
+        path = _segment_path(directory, segment)
+        try:
+            os.makedirs(path, exist_ok=True)
+            for name, values in columns.items():
+                with open(os.path.join(path, f"{name}.bin"), "ab") as column_file:
+                    column_file.write(values[written:written + take].tobytes())
+        except BaseException:
+            # 回滾這一塊已寫入的部分列，下次寫盤時重新讀取段尾
+            _tail = None
+            try:
+                _truncate_segment(path, rows)
+            except OSError as e:
+                logger.error(f"回滾投注日誌段 {path} 失敗: {e}")
+            raise
+        rows += take
+        written += take
+        _tail = (segment, rows)
+        progress[0] = written
+    return total
+
+
+async def flush_bet_log(directory: str = BET_LOG_DIR) -> int:
+    """
+    把緩衝區中的投注寫盤：在事件循環上交換緩衝區，磁盤 IO 在後台線程完成
+    寫盤失敗時未寫入的部分放回緩衝區，下次重試
+    :return: 寫入的行數
+    """
+    global _pending
+    async with _flush_lock:
+        if not _pending:
+            return 0
+        batches, _pending = _pending, []
+        columns = {name: np.concatenate([batch[name] for batch in batches]) for name in BET_LOG_COLUMNS}
+        progress = [0]
+        write = asyncio.ensure_future(asyncio.to_thread(_write_columns, columns, directory, progress))
+        try:
+            await asyncio.wait([write])
+        except asyncio.CancelledError:
+            # 線程無法中斷：等它寫完再退出，避免下一次寫盤與它交錯
+            await asyncio.wait([write])
+            raise
+        finally:
+            if write.done() and write.exception() is not None:
+                done = progress[0]
+                _pending.insert(0, {name: values[done:] for name, values in columns.items()})
+        return write.result()
+
+
+async def run_bet_log_flusher(interval: float = BET_LOG_FLUSH_INTERVAL) -> None:
+    """
+    定期寫盤的後台任務
+    :param interval: 寫盤間隔（秒）
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await flush_bet_log()
+        except Exception as e:
+            logger.error(f"寫入投注日誌時發生錯誤: {e}", exc_info=True)
+
+
+def open_bet_log_segment(path: str, columns: tuple[str, ...] | None = None) -> dict[str, np.ndarray]:
+    """
+    以只讀 memmap 打開一段
+    :param path: 段目錄
+    :param columns: 需要的列（默認全部）
+    :return: {列名: 數組}，各列長度相同；空段返回長度為 0 的數組
+    """
+    rows = _segment_rows(path)
+    opened = {}
+    for name in columns or tuple(BET_LOG_COLUMNS):
+        dtype = BET_LOG_COLUMNS[name]
+        if rows:
+            opened[name] = np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode="r", shape=(rows,))
+        else:
+            opened[name] = np.zeros(0, dtype=dtype)
+    return opened
+
+
+def get_segment_ts_bounds(path: str) -> tuple[int, int] | None:
+    """
+    段的時間範圍（只讀取 ts_ms 列；已統計過的段只讀取之後追加的行）
+    :param path: 段目錄
+    :return: (最早開獎時間, 最晚開獎時間)（Unix 毫秒），空段返回 None
+    """
+    rows = _segment_rows(path)
+    if not rows:
+        return None
+    cached = _segment_ts_bounds.get(path)
+    if cached is not None and cached[0] == rows:
+        return cached[1], cached[2]
+
+    ts_ms = np.memmap(os.path.join(path, "ts_ms.bin"), dtype=BET_LOG_COLUMNS["ts_ms"], mode="r", shape=(rows,))
+    if cached is not None and cached[0] < rows:
+        # 段尾有新追加的行：只統計新增部分
+        added = ts_ms[cached[0]:]
+        low, high = min(cached[1], int(added.min())), max(cached[2], int(added.max()))
+    else:
+        low, high = int(ts_ms.min()), int(ts_ms.max())
+    _segment_ts_bounds[path] = (rows, low, high)
+    return low, high
+
+
+def scan_bet_log(
+    columns: tuple[str, ...] | None = None,
+    directory: str = BET_LOG_DIR,
+    start_ms: int | None = None,
+    end_ms: int | None = None
+) -> Iterator[dict[str, np.ndarray]]:
+    """
+    按段依次返回 memmap 映射的列（只包含已寫盤的投注）
+    指定時間範圍時跳過沒有任何投注落在範圍內的段（段內的行仍需調用方按時間篩選）
+    :param columns: 需要的列（默認全部）
+    :param directory: 日誌目錄
+    :param start_ms: 開始時間（Unix 毫秒，含），None 表示不限
+    :param end_ms: 結束時間（Unix 毫秒，不含），None 表示不限
+    """
+    for path in list_bet_log_segments(directory):
+        if start_ms is not None or end_ms is not None:
+            bounds = get_segment_ts_bounds(path)
+            if bounds is None:
+                continue
+            if (start_ms is not None and bounds[1] < start_ms) or (end_ms is not None and bounds[0] >= end_ms):
+                continue
+        yield open_bet_log_segment(path, columns)
+
+
+def summarize_bet_log(
+    start_ms: int | None = None,
+    end_ms: int | None = None,
+    game: int | None = None,
+    directory: str = BET_LOG_DIR
+) -> dict[str, int | float]:
+    """
+    統計一段時間內的投注（每段一次向量運算，用於 RTP 核對等）
+    :param start_ms: 開始時間（Unix 毫秒，含），None 表示不限
+    :param end_ms: 結束時間（Unix 毫秒，不含），None 表示不限
+    :param game: 遊戲下標，None 表示全部
+    :param directory: 日誌目錄
+    :return: {"bets": 注數, "stake": 投注總額, "payout": 彩金總額（微 USDT）, "rtp": 返還率}
+    """
+    bets = stake = payout = 0
+    for segment in scan_bet_log(("ts_ms", "game", "stake", "payout"), directory, start_ms, end_ms):
+        mask = np.ones(len(segment["stake"]), dtype=np.bool_)
+        if start_ms is not None:
+            mask &= segment["ts_ms"] >= start_ms
+        if end_ms is not None:
+            mask &= segment["ts_ms"] < end_ms
+        if game is not None:
+            mask &= segment["game"] == game
+        bets += int(np.count_nonzero(mask))
+        stake += int(segment["stake"][mask].sum())
+        payout += int(segment["payout"][mask].sum())
+    return {
+        "bets": bets,
+        "stake": stake,
+        "payout": payout,
+        "rtp": payout / stake if stake else 0.0
+    }
+
+
+__all__ = [
+    'BET_LOG_DIR',
+    'BET_LOG_SEGMENT_ROWS',
+    'BET_LOG_FLUSH_INTERVAL',
+    'BET_LOG_COLUMNS',
+    'append_bets',
+    'get_pending_bet_count',
+    'flush_bet_log',
+    'run_bet_log_flusher',
+    'list_bet_log_segments',
+    'open_bet_log_segment',
+    'get_segment_ts_bounds',
+    'scan_bet_log',
+    'summarize_bet_log'
+]
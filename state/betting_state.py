@@ -2,6 +2,17 @@
 狀態管理模組 - betting_state
 """
 
+from state.ledger import (
+    INITIAL_BALANCE_MICROS,
+    to_micros,
+    from_micros,
+    get_ledger_balance,
+    ledger_debit_if_sufficient,
+    ledger_credit,
+    ledger_set_balance
+)
+from state.confirmation_store import ConfirmationStore
+
 # 用於存儲用戶選擇的自動下注金額
 # key: user_id, value: 下注金額字符串（如："2", "5", "10", "30", "50"）
 user_auto_bet_amount: dict[int, str] = {}
@@ -59,12 +70,11 @@ def set_user_auto_bet_continuous(user_id: int, is_continuous: bool) -> None:
             del user_auto_bet_continuous[user_id]
 
 
-# 用於存儲用戶的USDT餘額
-# key: user_id, value: 餘額（浮點數）
-user_usdt_balance: dict[int, float] = {}
+# 用戶的USDT餘額由賬本（state/ledger.py）以整數微 USDT 記賬
+# 以下函數保留浮點 USDT 介面供處理器使用
 
 # 初始餘額
-INITIAL_BALANCE = 500.0
+INITIAL_BALANCE = from_micros(INITIAL_BALANCE_MICROS)
 
 
 def get_user_usdt_balance(user_id: int) -> float:
@@ -73,9 +83,7 @@ def get_user_usdt_balance(user_id: int) -> float:
     :param user_id: 用戶ID
     :return: USDT餘額
     """
-    if user_id not in user_usdt_balance:
-        user_usdt_balance[user_id] = INITIAL_BALANCE
-    return user_usdt_balance[user_id]
+    return from_micros(get_ledger_balance(user_id))
 
 
 def set_user_usdt_balance(user_id: int, balance: float) -> None:
@@ -83,32 +91,30 @@ def set_user_usdt_balance(user_id: int, balance: float) -> None:
     設置用戶的USDT餘額
     :param user_id: 用戶ID
     :param balance: 餘額
+    :raises ValueError: 餘額為負數或超出範圍
     """
-    user_usdt_balance[user_id] = balance
+    ledger_set_balance(user_id, to_micros(balance))
 
 
-def deduct_user_balance(user_id: int, amount: float) -> bool:
+def deduct_user_balance(user_id: int, amount: float, reason: str = "bet") -> bool:
     """
-    扣除用戶餘額
+    扣除用戶餘額（原子操作：餘額足夠才扣款）
     :param user_id: 用戶ID
     :param amount: 扣除金額
+    :param reason: 流水原因
     :return: 如果扣除成功返回True，餘額不足返回False
     """
-    current_balance = get_user_usdt_balance(user_id)
-    if current_balance < amount:
-        return False
-    user_usdt_balance[user_id] = current_balance - amount
-    return True
+    return ledger_debit_if_sufficient(user_id, to_micros(amount), reason) is not None
 
 
-def add_user_balance(user_id: int, amount: float) -> None:
+def add_user_balance(user_id: int, amount: float, reason: str = "payout") -> None:
     """
     增加用戶餘額（派獎）
     :param user_id: 用戶ID
     :param amount: 增加金額
+    :param reason: 流水原因
     """
-    current_balance = get_user_usdt_balance(user_id)
-    user_usdt_balance[user_id] = current_balance + amount
+    ledger_credit(user_id, to_micros(amount), reason)
 
 
 # 用於追蹤用戶進入投注選擇的來源（用於區分哈希轉盤和初級房）
@@ -138,9 +144,12 @@ def set_user_betting_source(user_id: int, source: str | None) -> None:
         user_betting_source[user_id] = source
 
 
+# 投注確認的有效期（秒）
+BET_CONFIRMATION_TIMEOUT = 30
+
 # 用於追蹤用戶的投注確認狀態（支持多個確認消息）
-# key: user_id, value: list[{"amount": str, "timestamp": float, "message_id": int, "chat_id": int}]
-user_bet_confirmation: dict[int, list] = {}
+# key: (user_id, message_id), value: {"amount": str, "timestamp": float, "message_id": int, "chat_id": int}
+user_bet_confirmation = ConfirmationStore(BET_CONFIRMATION_TIMEOUT)
 
 
 def get_user_bet_confirmation(user_id: int) -> list:
@@ -149,7 +158,7 @@ def get_user_bet_confirmation(user_id: int) -> list:
     :param user_id: 用戶ID
     :return: 確認狀態列表
     """
-    return user_bet_confirmation.get(user_id, [])
+    return user_bet_confirmation.list_for_user(user_id)
 
 
 def get_user_bet_confirmation_by_message_id(user_id: int, message_id: int) -> dict | None:
@@ -159,11 +168,7 @@ def get_user_bet_confirmation_by_message_id(user_id: int, message_id: int) -> di
     :param message_id: 消息ID
     :return: 確認狀態或None
     """
-    confirmations = get_user_bet_confirmation(user_id)
-    for conf in confirmations:
-        if conf.get("message_id") == message_id:
-            return conf
-    return None
+    return user_bet_confirmation.get(user_id, message_id)
 
 
 def set_user_bet_confirmation(user_id: int, amount: str, message_id: int, chat_id: int, timestamp: float) -> None:
@@ -175,10 +180,7 @@ def set_user_bet_confirmation(user_id: int, amount: str, message_id: int, chat_i
     :param chat_id: 聊天ID
     :param timestamp: 時間戳
     """
-    if user_id not in user_bet_confirmation:
-        user_bet_confirmation[user_id] = []
-    
-    user_bet_confirmation[user_id].append({
+    user_bet_confirmation.add(user_id, message_id, {
         "amount": amount,
         "timestamp": timestamp,
         "message_id": message_id,
@@ -192,25 +194,24 @@ def clear_user_bet_confirmation(user_id: int, message_id: int | None = None) ->
     :param user_id: 用戶ID
     :param message_id: 如果提供，只清除該消息ID的確認狀態；否則清除所有
     """
-    if user_id not in user_bet_confirmation:
-        return
-    
     if message_id is None:
-        # 清除所有
-        del user_bet_confirmation[user_id]
+        user_bet_confirmation.clear_user(user_id)
     else:
-        # 只清除指定的消息ID
-        user_bet_confirmation[user_id] = [
-            conf for conf in user_bet_confirmation[user_id]
-            if conf.get("message_id") != message_id
-        ]
-        if not user_bet_confirmation[user_id]:
-            del user_bet_confirmation[user_id]
+        user_bet_confirmation.remove(user_id, message_id)
+
+
+def pop_expired_bet_confirmations(now: float | None = None) -> list[tuple[int, int, dict]]:
+    """
+    取出並清除所有已超時的投注確認
+    :param now: 當前時間（time.time()），默認取當前時間
+    :return: [(user_id, message_id, 確認狀態)]
+    """
+    return user_bet_confirmation.pop_expired(now)
 
 
 # 用於追蹤用戶的自動下注確認狀態（支持多個確認消息）
-# key: user_id, value: list[{"amount": str, "count": int, "timestamp": float, "message_id": int, "chat_id": int}]
-user_auto_bet_confirmation: dict[int, list] = {}
+# key: (user_id, message_id), value: {"amount": str, "count": int, "timestamp": float, "message_id": int, "chat_id": int}
+user_auto_bet_confirmation = ConfirmationStore(BET_CONFIRMATION_TIMEOUT)
 
 
 def get_user_auto_bet_confirmation(user_id: int) -> list:
@@ -219,7 +220,7 @@ def get_user_auto_bet_confirmation(user_id: int) -> list:
     :param user_id: 用戶ID
     :return: 確認狀態列表
     """
-    return user_auto_bet_confirmation.get(user_id, [])
+    return user_auto_bet_confirmation.list_for_user(user_id)
 
 
 def get_user_auto_bet_confirmation_by_message_id(user_id: int, message_id: int) -> dict | None:
@@ -229,11 +230,7 @@ def get_user_auto_bet_confirmation_by_message_id(user_id: int, message_id: int)
     :param message_id: 消息ID
     :return: 確認狀態或None
     """
-    confirmations = get_user_auto_bet_confirmation(user_id)
-    for conf in confirmations:
-        if conf.get("message_id") == message_id:
-            return conf
-    return None
+    return user_auto_bet_confirmation.get(user_id, message_id)
 
 
 def set_user_auto_bet_confirmation(user_id: int, amount: str, count: int, message_id: int, chat_id: int, timestamp: float) -> None:
@@ -246,10 +243,7 @@ def set_user_auto_bet_confirmation(user_id: int, amount: str, count: int, messag
     :param chat_id: 聊天ID
     :param timestamp: 時間戳
     """
-    if user_id not in user_auto_bet_confirmation:
-        user_auto_bet_confirmation[user_id] = []
-    
-    user_auto_bet_confirmation[user_id].append({
+    user_auto_bet_confirmation.add(user_id, message_id, {
         "amount": amount,
         "count": count,
         "timestamp": timestamp,
@@ -264,18 +258,16 @@ def clear_user_auto_bet_confirmation(user_id: int, message_id: int | None = None
     :param user_id: 用戶ID
     :param message_id: 如果提供，只清除該消息ID的確認狀態；否則清除所有
     """
-    if user_id not in user_auto_bet_confirmation:
-        return
-    
     if message_id is None:
-        # 清除所有
-        del user_auto_bet_confirmation[user_id]
+        user_auto_bet_confirmation.clear_user(user_id)
     else:
-        # 只清除指定的消息ID
-        user_auto_bet_confirmation[user_id] = [
-            conf for conf in user_auto_bet_confirmation[user_id]
-            if conf.get("message_id") != message_id
-        ]
-        if not user_auto_bet_confirmation[user_id]:
-            del user_auto_bet_confirmation[user_id]
+        user_auto_bet_confirmation.remove(user_id, message_id)
+
 
+def pop_expired_auto_bet_confirmations(now: float | None = None) -> list[tuple[int, int, dict]]:
+    """
+    取出並清除所有已超時的自動下注確認
+    :param now: 當前時間（time.time()），默認取當前時間
+    :return: [(user_id, message_id, 確認狀態)]
+    """
+    return user_auto_bet_confirmation.pop_expired(now)
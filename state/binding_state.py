@@ -2,6 +2,8 @@
 狀態管理模組 - binding_state
 """
 
+from state.input_state import set_user_pending_input, clear_user_pending_input
+
 # 用於追蹤用戶是否在輸入銀行卡資料
 # key: user_id, value: True/False
 user_bank_card_binding_state: dict[int, bool] = {}
@@ -16,9 +18,11 @@ def set_user_bank_card_binding_state(user_id: int, is_binding: bool) -> None:
     """設置用戶是否在輸入銀行卡資料狀態"""
     if is_binding:
         user_bank_card_binding_state[user_id] = True
+        set_user_pending_input(user_id, "bank_card")
     else:
         if user_id in user_bank_card_binding_state:
             del user_bank_card_binding_state[user_id]
+        clear_user_pending_input(user_id, "bank_card")
 
 
 # 用於追蹤用戶是否在輸入錢包資料
@@ -36,8 +40,10 @@ def set_user_wallet_binding_state(user_id: int, wallet_type: str | None) -> None
     if wallet_type is None:
         if user_id in user_wallet_binding_state:
             del user_wallet_binding_state[user_id]
+        clear_user_pending_input(user_id, "wallet")
     else:
         user_wallet_binding_state[user_id] = wallet_type
+        set_user_pending_input(user_id, "wallet")
 
 
 # 用於追蹤用戶是否在設置提款密碼
@@ -0,0 +1,99 @@
+"""
+狀態管理模組 - confirmation_store
+待確認投注的存儲：按 (user_id, message_id) 直接索引，並用共享的最小堆追蹤過期時間
+"""
+
+import heapq
+import time
+
+
+class ConfirmationStore:
+    """
+    待確認投注容器
+    - 按 (user_id, message_id) 查找、刪除均為 O(1)
+    - 每個用戶的確認按創建順序保留，用於按用戶列出或清除
+    - 過期時間存放在最小堆中，清理過期條目為每條 O(log n)；
+      已被確認或清除的條目在堆頂時惰性跳過
+    """
+
+    def __init__(self, timeout: float):
+        """
+        :param timeout: 確認有效期（秒）
+        """
+        self.timeout = timeout
+        # key: (user_id, message_id), value: 確認狀態字典（含 "timestamp"）
+        self._entries: dict[tuple[int, int], dict] = {}
+        # key: user_id, value: 該用戶的 message_id（以字典保持插入順序，值無意義）
+        self._by_user: dict[int, dict[int, None]] = {}
+        # (過期時間, user_id, message_id)
+        self._expiry_heap: list[tuple[float, int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, user_id: int, message_id: int, entry: dict) -> None:
+        """
+        添加確認狀態
+        :param user_id: 用戶ID
+        :param message_id: 確認消息的ID
+        :param entry: 確認狀態字典，必須包含 "timestamp"（time.time()）
+        """
+        self._entries[(user_id, message_id)] = entry
+        self._by_user.setdefault(user_id, {})[message_id] = None
+        heapq.heappush(self._expiry_heap, (entry["timestamp"] + self.timeout, user_id, message_id))
+
+    def get(self, user_id: int, message_id: int) -> dict | None:
+        """根據消息ID獲取確認狀態"""
+        return self._entries.get((user_id, message_id))
+
+    def list_for_user(self, user_id: int) -> list[dict]:
+        """按創建順序列出用戶的所有確認狀態"""
+        message_ids = self._by_user.get(user_id)
+        if not message_ids:
+            return []
+        return [self._entries[(user_id, message_id)] for message_id in message_ids]
+
+    def remove(self, user_id: int, message_id: int) -> dict | None:
+        """
+        刪除指定消息的確認狀態（堆中的記錄留待過期時惰性跳過）
+        :return: 被刪除的確認狀態，不存在時返回 None
+        """
+        entry = self._entries.pop((user_id, message_id), None)
+        if entry is None:
+            return None
+        message_ids = self._by_user[user_id]
+        del message_ids[message_id]
+        if not message_ids:
+            del self._by_user[user_id]
+        return entry
+
+    def clear_user(self, user_id: int) -> None:
+        """刪除用戶的所有確認狀態"""
+        for message_id in self._by_user.pop(user_id, {}):
+            del self._entries[(user_id, message_id)]
+
+    def next_expiry(self) -> float | None:
+        """
+        最早的過期時間（可能屬於已刪除的條目，僅用於決定下次檢查時間）
+        :return: 過期時間（time.time()），沒有待處理條目時返回 None
+        """
+        return self._expiry_heap[0][0] if self._expiry_heap else None
+
+    def pop_expired(self, now: float | None = None) -> list[tuple[int, int, dict]]:
+        """
+        取出並刪除所有已過期的確認狀態（每個條目只會被取出一次）
+        :param now: 當前時間（time.time()），默認取當前時間
+        :return: [(user_id, message_id, 確認狀態)]，按過期時間排序
+        """
+        now = time.time() if now is None else now
+        expired = []
+        heap = self._expiry_heap
+        while heap and heap[0][0] < now:
+            expires_at, user_id, message_id = heapq.heappop(heap)
+            entry = self._entries.get((user_id, message_id))
+            # 已確認/已清除，或同一消息被重新登記（過期時間不同）的舊記錄
+            if entry is None or entry["timestamp"] + self.timeout != expires_at:
+                continue
+            self.remove(user_id, message_id)
+            expired.append((user_id, message_id, entry))
+        return expired
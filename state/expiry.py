@@ -0,0 +1,154 @@
+"""
+狀態管理模組 - expiry
+按用戶閒置時間淘汰臨時 UI 狀態（報表游標、上一頁、投注來源、密碼鍵盤緩衝等）
+賬號、餘額、綁定資料等持久數據不在此列，永不過期
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from state.menu_state import user_previous_state
+from state.input_state import user_pending_input
+from state.report_state import (
+    user_report_date,
+    user_report_game,
+    user_report_message_id,
+    user_monthly_report_month,
+    user_monthly_report_message_id,
+    user_monthly_report_game
+)
+from state.betting_state import (
+    user_betting_source,
+    user_auto_bet_amount,
+    user_auto_bet_count,
+    user_auto_bet_continuous
+)
+from state.binding_state import (
+    user_bank_card_binding_state,
+    user_wallet_binding_state,
+    user_withdrawal_password_state,
+    user_withdrawal_password_input,
+    user_withdrawal_password_confirm,
+    user_withdrawal_password_message_id
+)
+from state.user_data import user_deposit_withdraw_state
+from state.withdraw_state import (
+    user_withdraw_state,
+    user_withdraw_method,
+    user_withdraw_amount
+)
+
+# 閒置多久（秒）後淘汰臨時狀態，可在 config.py 中覆蓋
+try:
+    from config import USER_STATE_IDLE_TTL
+except ImportError:
+    USER_STATE_IDLE_TTL = 30 * 60
+
+# 清理器的執行間隔（秒），可在 config.py 中覆蓋
+try:
+    from config import USER_STATE_SWEEP_INTERVAL
+except ImportError:
+    USER_STATE_SWEEP_INTERVAL = 60
+
+logger = logging.getLogger(__name__)
+
+# 用戶最後活動時間（time.monotonic()），按活動先後排序
+# 最久未活動的用戶在最前面，清理時只需從頭部彈出，成本與過期用戶數成正比
+# key: user_id, value: 最後活動時間
+user_last_active: OrderedDict[int, float] = OrderedDict()
+
+# 需要隨閒置淘汰的臨時狀態字典
+TRANSIENT_USER_STATE: tuple[dict, ...] = (
+    user_previous_state,
+    user_pending_input,
+    user_report_date,
+    user_report_game,
+    user_report_message_id,
+    user_monthly_report_month,
+    user_monthly_report_message_id,
+    user_monthly_report_game,
+    user_betting_source,
+    user_auto_bet_amount,
+    user_bank_card_binding_state,
+    user_wallet_binding_state,
+    user_withdrawal_password_state,
+    user_withdrawal_password_input,
+    user_withdrawal_password_confirm,
+    user_withdrawal_password_message_id,
+    user_deposit_withdraw_state,
+    user_withdraw_state,
+    user_withdraw_method,
+    user_withdraw_amount,
+)
+
+
+def touch_user_activity(user_id: int, now: float | None = None) -> None:
+    """
+    記錄用戶活動（每個 Update 調用一次）
+    :param user_id: 用戶ID
+    :param now: 當前時間（time.monotonic()），默認取當前時間
+    """
+    user_last_active[user_id] = time.monotonic() if now is None else now
+    user_last_active.move_to_end(user_id)
+
+
+def _has_running_auto_bet(user_id: int) -> bool:
+    """自動下注進行中的用戶即使沒有操作也不能淘汰其狀態"""
+    return user_id in user_auto_bet_count or user_id in user_auto_bet_continuous
+
+
+def sweep_idle_user_state(now: float | None = None, ttl: float | None = None) -> int:
+    """
+    淘汰閒置超過 ttl 的用戶的臨時狀態
+    :param now: 當前時間（time.monotonic()），默認取當前時間
+    :param ttl: 閒置時間（秒），默認為 USER_STATE_IDLE_TTL
+    :return: 被淘汰的用戶數
+    """
+    now = time.monotonic() if now is None else now
+    deadline = now - (USER_STATE_IDLE_TTL if ttl is None else ttl)
+    evicted = 0
+
+    while user_last_active:
+        user_id, last_active = next(iter(user_last_active.items()))
+        if last_active > deadline:
+            break
+
+        if _has_running_auto_bet(user_id):
+            # 自動下注仍在進行，視為活躍，移到隊尾
+            touch_user_activity(user_id, now)
+            continue
+
+        del user_last_active[user_id]
+        for store in TRANSIENT_USER_STATE:
+            store.pop(user_id, None)
+        evicted += 1
+
+    return evicted
+
+
+async def run_idle_state_sweeper(interval: float = USER_STATE_SWEEP_INTERVAL) -> None:
+    """
+    定期清理閒置用戶臨時狀態的後台任務（整個 Bot 只運行一個）
+    :param interval: 執行間隔（秒）
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            evicted = sweep_idle_user_state()
+            if evicted:
+                logger.info(f"已淘汰 {evicted} 位閒置用戶的臨時狀態，活躍用戶數: {len(user_last_active)}")
+        except Exception as e:
+            logger.error(f"清理閒置用戶狀態時發生錯誤: {e}", exc_info=True)
+
+
+__all__ = [
+    'USER_STATE_IDLE_TTL',
+    'USER_STATE_SWEEP_INTERVAL',
+    'user_last_active',
+    'TRANSIENT_USER_STATE',
+    'touch_user_activity',
+    'sweep_idle_user_state',
+    'run_idle_state_sweeper'
+]
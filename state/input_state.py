@@ -0,0 +1,33 @@
+"""
+狀態管理模組 - input_state
+記錄用戶當前等待的自由文本輸入（銀行卡資料、錢包資料、充值金額、提款金額/密碼）
+每個用戶最多一個，由各流程狀態的 set 函數自動維護，處理文字訊息時只需查一次字典
+"""
+
+# 用戶當前等待的自由文本輸入
+# key: user_id, value: "bank_card" | "wallet" | "deposit_withdraw" | "withdraw"
+user_pending_input: dict[int, str] = {}
+
+
+def get_user_pending_input(user_id: int) -> str | None:
+    """獲取用戶當前等待的自由文本輸入類型，None 表示沒有"""
+    return user_pending_input.get(user_id)
+
+
+def set_user_pending_input(user_id: int, kind: str) -> None:
+    """設置用戶當前等待的自由文本輸入類型（覆蓋之前的類型，最近開始的流程優先）"""
+    user_pending_input[user_id] = kind
+
+
+def clear_user_pending_input(user_id: int, kind: str) -> None:
+    """如果用戶當前等待的是 kind 類型的輸入，清除之（其他流程開始後不受影響）"""
+    if user_pending_input.get(user_id) == kind:
+        del user_pending_input[user_id]
+
+
+__all__ = [
+    'user_pending_input',
+    'get_user_pending_input',
+    'set_user_pending_input',
+    'clear_user_pending_input'
+]
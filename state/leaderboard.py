@@ -0,0 +1,224 @@
+"""
+狀態管理模組 - leaderboard
+排行榜：按 (週期, 遊戲, 指標) 維護榜單，投注開獎記入報表時（state/report_rollup.py）增量更新
+- 週期：當天（"YYYY-MM-DD"）和當週（ISO 週，"YYYY-Www"）
+- 指標：投注金額（投注榜）和派獎金額（中獎榜），只增不減
+每個榜單按列保存本週期所有用戶的累計值（寫入快照只需複製數組），另外維護前 LEADERBOARD_SIZE 名：
+分數只增不減，所以不在前列的用戶只有超過當前最後一名時才需要換入，每次更新最多 O(k)，
+讀取榜單只需排序這 k 個用戶，與用戶總數無關
+超過 LEADERBOARD_KEEP_DAYS 天的週期會被清理
+只在事件循環上讀寫，不加鎖
+"""
+
+from datetime import date as date_type, datetime, timedelta
+
+import numpy as np
+
+# 榜單名次數，可在 config.py 中覆蓋
+try:
+    from config import LEADERBOARD_SIZE
+except ImportError:
+    LEADERBOARD_SIZE = 10
+
+# 週期結束後保留的天數，可在 config.py 中覆蓋
+try:
+    from config import LEADERBOARD_KEEP_DAYS
+except ImportError:
+    LEADERBOARD_KEEP_DAYS = 14
+
+# 榜單週期
+LEADERBOARD_PERIODS = ("day", "week")
+
+# 榜單指標：投注金額、派獎金額（微 USDT）
+LEADERBOARD_METRICS = ("volume", "payout")
+
+
+class _Board:
+    """一個榜單：所有用戶的累計值（按列存放）和前 LEADERBOARD_SIZE 名"""
+
+    __slots__ = ("last_day", "positions", "user_ids", "scores", "size", "top", "floor")
+
+    def __init__(self, last_day: int):
+        """
+        :param last_day: 週期最後一天（date.toordinal()），用於清理過期榜單
+        """
+        self.last_day = last_day
+        # key: user_id, value: 在 user_ids/scores 中的位置
+        self.positions: dict[int, int] = {}
+        # 前 size 個位置有效，容量不足時翻倍
+        self.user_ids = np.zeros(64, dtype=np.int64)
+        self.scores = np.zeros(64, dtype=np.int64)
+        self.size = 0
+        # 前 LEADERBOARD_SIZE 名，key: user_id, value: 累計值
+        self.top: dict[int, int] = {}
+        # 前列已滿時的最後一名分數，不超過它的用戶不需要檢查
+        self.floor = -1
+
+    def _positions(self, user_ids: list[int]) -> np.ndarray:
+        """用戶在數組中的位置（新用戶追加到末尾）"""
+        positions = self.positions
+        missing = [user_id for user_id in user_ids if user_id not in positions]
+        if missing:
+            size = self.size + len(missing)
+            if size > len(self.scores):
+                capacity = len(self.scores)
+                while capacity < size:
+                    capacity *= 2
+                for name in ("user_ids", "scores"):
+                    grown = np.zeros(capacity, dtype=np.int64)
+                    grown[:self.size] = getattr(self, name)[:self.size]
+                    setattr(self, name, grown)
+            self.user_ids[self.size:size] = missing
+            positions.update(zip(missing, range(self.size, size)))
+            self.size = size
+        return np.fromiter((positions[user_id] for user_id in user_ids), dtype=np.int64, count=len(user_ids))
+
+    def _update_top(self, user_id: int, score: int) -> None:
+        """用一個用戶的最新分數更新前列"""
+        if user_id in self.top:
+            self.top[user_id] = score
+        elif len(self.top) < LEADERBOARD_SIZE:
+            self.top[user_id] = score
+        elif score > self.floor:
+            del self.top[min(self.top, key=self.top.__getitem__)]
+            self.top[user_id] = score
+        else:
+            return
+        if len(self.top) >= LEADERBOARD_SIZE:
+            self.floor = min(self.top.values())
+
+    def add_many(self, user_ids: np.ndarray, amounts: np.ndarray) -> None:
+        """累加一批用戶的分數（用戶不重複，amount 不能為負）"""
+        positions = self._positions(user_ids.tolist())
+        self.scores[positions] += amounts
+        scores = self.scores[positions]
+        # 分數只增不減：前列已滿時只有超過最後一名的用戶需要檢查
+        candidates = np.flatnonzero(scores > self.floor)
+        for user_id, score in zip(user_ids[candidates].tolist(), scores[candidates].tolist()):
+            self._update_top(user_id, score)
+
+    def load(self, user_ids: np.ndarray, scores: np.ndarray) -> None:
+        """用快照數據覆蓋累計值，並重新計算前列"""
+        self.size = 0
+        self.positions.clear()
+        self._positions(user_ids.tolist())
+        self.scores[:self.size] = scores
+        self.top.clear()
+        self.floor = -1
+        top = np.argsort(-scores, kind="stable")[:LEADERBOARD_SIZE]
+        for user_id, score in zip(user_ids[top].tolist(), scores[top].tolist()):
+            self._update_top(user_id, score)
+
+    def ranking(self) -> list[tuple[int, int]]:
+        """前列按分數從高到低排序（同分按用戶ID）"""
+        return sorted(self.top.items(), key=lambda item: (-item[1], item[0]))
+
+
+# 榜單
+# key: (週期, 遊戲名稱或 "总计", 指標), value: _Board
+_boards: dict[tuple[str, str, str], _Board] = {}
+
+# 最近一次清理時的日期（date.toordinal()）
+_pruned_day = 0
+
+
+def _period_keys(when: date_type) -> tuple[tuple[str, int], tuple[str, int]]:
+    """某一天所屬的 (當天週期, 最後一天) 和 (當週週期, 最後一天)"""
+    year, week, weekday = when.isocalendar()
+    ordinal = when.toordinal()
+    return (when.isoformat(), ordinal), (f"{year}-W{week:02d}", ordinal + 7 - weekday)
+
+
+def get_leaderboard_period(period: str, when: datetime | None = None) -> tuple[str, str, str]:
+    """
+    獲取某個時間所屬的榜單週期
+    :param period: "day" 或 "week"
+    :param when: 時間，默認取當前時間
+    :return: (週期鍵, 開始日期, 結束日期)，日期格式 YYYY-MM-DD
+    """
+    day = (when or datetime.now()).date()
+    (day_key, _), (week_key, week_end) = _period_keys(day)
+    if period == "day":
+        return day_key, day.isoformat(), day.isoformat()
+    end = date_type.fromordinal(week_end)
+    return week_key, (end - timedelta(days=6)).isoformat(), end.isoformat()
+
+
+def _prune(today: int) -> None:
+    """清理結束超過 LEADERBOARD_KEEP_DAYS 天的榜單（每天最多一次）"""
+    global _pruned_day
+    if today <= _pruned_day:
+        return
+    _pruned_day = today
+    for key in [key for key, board in _boards.items() if board.last_day < today - LEADERBOARD_KEEP_DAYS]:
+        del _boards[key]
+
+
+def record_leaderboard(user_ids: np.ndarray, volumes: np.ndarray, payouts: np.ndarray, games: tuple[str, ...], when: datetime) -> None:
+    """
+    把一個輪次的投注記入當天和當週的榜單
+    :param user_ids: 用戶ID數組（每個用戶只出現一次）
+    :param volumes: 各用戶的投注金額（微 USDT）
+    :param payouts: 各用戶的派獎金額（微 USDT）
+    :param games: 遊戲名稱和「总计」
+    :param when: 開獎時間
+    """
+    if not len(user_ids):
+        return
+    day = when.date()
+    _prune(day.toordinal())
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    for metric, amounts in (("volume", volumes), ("payout", payouts)):
+        amounts = np.asarray(amounts, dtype=np.int64)
+        nonzero = amounts != 0
+        if not nonzero.any():
+            continue
+        metric_ids, amounts = user_ids[nonzero], amounts[nonzero]
+        for period, last_day in _period_keys(day):
+            for game in games:
+                board = _boards.get((period, game, metric))
+                if board is None:
+                    board = _boards[(period, game, metric)] = _Board(last_day)
+                board.add_many(metric_ids, amounts)
+
+
+def get_leaderboard(period: str, metric: str, game: str, when: datetime | None = None) -> list[tuple[int, int]]:
+    """
+    獲取榜單，O(k)
+    :param period: "day" 或 "week"
+    :param metric: "volume" 或 "payout"
+    :param game: 遊戲名稱或「总计」
+    :param when: 時間，默認取當前時間
+    :return: [(user_id, 分數（微 USDT）)]，按名次排序
+    """
+    board = _boards.get((get_leaderboard_period(period, when)[0], game, metric))
+    return board.ranking() if board is not None else []
+
+
+def dump_leaderboard() -> dict:
+    """取得榜單的數據副本（用於快照，每個榜單保存全部用戶的累計值，均為數組複製）"""
+    return {
+        key: (board.last_day, board.user_ids[:board.size].copy(), board.scores[:board.size].copy())
+        for key, board in _boards.items()
+    }
+
+
+def load_leaderboard(data: dict) -> None:
+    """用快照數據覆蓋榜單，並重新計算前列"""
+    _boards.clear()
+    for key, (last_day, user_ids, scores) in data.items():
+        _boards[key] = _Board(last_day)
+        _boards[key].load(user_ids, scores)
+
+
+__all__ = [
+    'LEADERBOARD_SIZE',
+    'LEADERBOARD_KEEP_DAYS',
+    'LEADERBOARD_PERIODS',
+    'LEADERBOARD_METRICS',
+    'get_leaderboard_period',
+    'record_leaderboard',
+    'get_leaderboard',
+    'dump_leaderboard',
+    'load_leaderboard'
+]
@@ -0,0 +1,311 @@
+"""
+狀態管理模組 - ledger
+用戶餘額賬本：以整數微 USDT（1 USDT = 1,000,000）記賬，避免浮點累積誤差
+所有變動都是原子的「檢查並扣款」或「入賬」操作，並寫入只追加的流水
+餘額按用戶行號存放在連續的 int64 數組中（state/balance_table.py），批量派彩等操作為一次向量運算
+流水按列存放在固定容量的環形數組中，寫入快照時只需複製數組
+"""
+
+import threading
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+from state.balance_table import MAX_BALANCE, BalanceTable
+from state.user_index import intern_user, intern_users, user_ids_view
+
+# 1 USDT 對應的微 USDT 數
+MICROS_PER_USDT = 1_000_000
+
+# 新用戶的初始餘額（微 USDT）
+INITIAL_BALANCE_MICROS = 500 * MICROS_PER_USDT
+
+# 內存中保留的流水條數（超出後丟棄最舊的流水，完整餘額不受影響），可在 config.py 中覆蓋
+try:
+    from config import LEDGER_JOURNAL_MAX_ENTRIES
+except ImportError:
+    LEDGER_JOURNAL_MAX_ENTRIES = 200_000
+
+# 用戶餘額（按 state/user_index.py 分配的行號存放，微 USDT，整數）
+_table = BalanceTable()
+
+# 只追加的賬本流水（環形數組，序號為 seq 的流水存放在第 (seq - 1) % LEDGER_JOURNAL_MAX_ENTRIES 格）
+# 每條流水：時間戳、user_id、變動金額（微 USDT）、變動後餘額（微 USDT）、原因代碼
+_journal_times = np.zeros(LEDGER_JOURNAL_MAX_ENTRIES, dtype=np.float64)
+_journal_users = np.zeros(LEDGER_JOURNAL_MAX_ENTRIES, dtype=np.int64)
+_journal_deltas = np.zeros(LEDGER_JOURNAL_MAX_ENTRIES, dtype=np.int64)
+_journal_balances = np.zeros(LEDGER_JOURNAL_MAX_ENTRIES, dtype=np.int64)
+_journal_reasons = np.zeros(LEDGER_JOURNAL_MAX_ENTRIES, dtype=np.int16)
+# 最新一條流水的序號（從 1 開始）
+_journal_seq = 0
+
+# 流水原因：代碼 -> 名稱，名稱 -> 代碼
+_reason_names: list[str] = []
+_reason_codes: dict[str, int] = {}
+
+# 事件循環內的同步操作本身不會交錯；鎖用於保護在後台線程中調用賬本的情況
+_lock = threading.Lock()
+
+
+def to_micros(amount: float | str | int) -> int:
+    """
+    將 USDT 金額轉換為微 USDT（四捨五入）
+    :param amount: USDT 金額（如 2、"10.5"、0.05）
+    :return: 微 USDT 整數
+    :raises ValueError: 金額不是有限數字，或絕對值超過餘額上限（MAX_BALANCE）
+    """
+    value = Decimal(str(amount))
+    if not value.is_finite():
+        raise ValueError(f"無效的金額: {amount}")
+    # 先按 Decimal 比較範圍，避免「1e999999」之類的輸入轉成超大整數
+    if value.copy_abs() * MICROS_PER_USDT > MAX_BALANCE:
+        raise ValueError(f"金額超出範圍: {amount}")
+    return int((value * MICROS_PER_USDT).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def from_micros(micros: int) -> float:
+    """
+    將微 USDT 轉換為 USDT 浮點數（僅用於顯示）
+    :param micros: 微 USDT 整數
+    :return: USDT 金額
+    """
+    return micros / MICROS_PER_USDT
+
+
+def _reason_code(reason: str) -> int:
+    """流水原因的代碼（新原因依次分配）"""
+    code = _reason_codes.get(reason)
+    if code is None:
+        code = _reason_codes[reason] = len(_reason_names)
+        _reason_names.append(reason)
+    return code
+
+
+def _append_journal(user_id: int, delta: int, balance_after: int, reason: str) -> None:
+    """寫入一條流水（調用方必須持有 _lock）"""
+    global _journal_seq
+    slot = _journal_seq % LEDGER_JOURNAL_MAX_ENTRIES
+    _journal_seq += 1
+    _journal_times[slot] = time.time()
+    _journal_users[slot] = user_id
+    _journal_deltas[slot] = delta
+    _journal_balances[slot] = balance_after
+    _journal_reasons[slot] = _reason_code(reason)
+
+
+def _append_journal_many(user_ids: np.ndarray, deltas: np.ndarray, balances_after: np.ndarray, reason: str) -> None:
+    """批量寫入同一原因的流水（一次向量運算，調用方必須持有 _lock）"""
+    global _journal_seq
+    count = len(user_ids)
+    # 超出容量的部分寫入後也會被覆蓋，只寫最後一段
+    keep = min(count, LEDGER_JOURNAL_MAX_ENTRIES)
+    slots = np.arange(_journal_seq + count - keep, _journal_seq + count) % LEDGER_JOURNAL_MAX_ENTRIES
+    _journal_times[slots] = time.time()
+    _journal_users[slots] = user_ids[count - keep:]
+    _journal_deltas[slots] = deltas[count - keep:]
+    _journal_balances[slots] = balances_after[count - keep:]
+    _journal_reasons[slots] = _reason_code(reason)
+    _journal_seq += count
+
+
+def _journal_columns(since_seq: int) -> dict[str, np.ndarray]:
+    """序號大於 since_seq 且仍保留的流水，按序號排列的各列副本（調用方必須持有 _lock）"""
+    first = max(since_seq, _journal_seq - LEDGER_JOURNAL_MAX_ENTRIES, 0)
+    seqs = np.arange(first + 1, _journal_seq + 1, dtype=np.int64)
+    slots = (seqs - 1) % LEDGER_JOURNAL_MAX_ENTRIES
+    return {
+        "seqs": seqs,
+        "times": _journal_times[slots],
+        "user_ids": _journal_users[slots],
+        "deltas": _journal_deltas[slots],
+        "balances": _journal_balances[slots],
+        "reasons": _journal_reasons[slots]
+    }
+
+
+def _open_account(index: int, user_id: int) -> None:
+    """為新用戶開戶並給予初始餘額（調用方必須持有 _lock）"""
+    if not _table.has(index):
+        _table.set(index, INITIAL_BALANCE_MICROS)
+        _append_journal(user_id, INITIAL_BALANCE_MICROS, INITIAL_BALANCE_MICROS, "open")
+
+
+def get_ledger_balance(user_id: int) -> int:
+    """
+    獲取用戶餘額，O(1)；新用戶自動開戶並給予初始餘額
+    :param user_id: 用戶ID
+    :return: 餘額（微 USDT）
+    """
+    index = intern_user(user_id)
+    if _table.has(index):
+        return _table.get(index)
+    with _lock:
+        _open_account(index, user_id)
+        return _table.get(index)
+
+
+def ledger_debit_if_sufficient(user_id: int, micros: int, reason: str) -> int | None:
+    """
+    原子地檢查並扣款
+    :param user_id: 用戶ID
+    :param micros: 扣款金額（微 USDT，必須為正數）
+    :param reason: 流水原因（如 "bet"）
+    :return: 扣款後餘額；餘額不足時返回 None 且不做任何變動
+    """
+    if micros <= 0:
+        raise ValueError(f"扣款金額必須為正數: {micros}")
+    index = intern_user(user_id)
+    with _lock:
+        _open_account(index, user_id)
+        if _table.get(index) < micros:
+            return None
+        balance = _table.add(index, -micros)
+        _append_journal(user_id, -micros, balance, reason)
+        return balance
+
+
+def ledger_credit(user_id: int, micros: int, reason: str) -> int:
+    """
+    原子地入賬
+    :param user_id: 用戶ID
+    :param micros: 入賬金額（微 USDT，必須為正數）
+    :param reason: 流水原因（如 "payout"、"deposit"）
+    :return: 入賬後餘額
+    :raises OverflowError: 入賬後餘額超過 MAX_BALANCE（不做任何變動）
+    """
+    if micros <= 0:
+        raise ValueError(f"入賬金額必須為正數: {micros}")
+    index = intern_user(user_id)
+    with _lock:
+        _open_account(index, user_id)
+        balance = _table.add(index, micros)
+        _append_journal(user_id, micros, balance, reason)
+        return balance
+
+
+def ledger_credit_many(user_ids, micros, reason: str) -> int:
+    """
+    批量入賬（整批只加一次鎖，餘額更新為一次向量運算，用於開獎派彩等批量操作）
+    :param user_ids: 用戶ID序列（列表或 NumPy 數組，同一用戶可以出現多次）
+    :param micros: 與 user_ids 一一對應的入賬金額（微 USDT），非正數的條目會被跳過
+    :param reason: 流水原因
+    :return: 實際入賬的條目數
+    :raises OverflowError: 有用戶入賬後餘額超過 MAX_BALANCE（整批不入賬）
+    """
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    amounts = np.asarray(micros, dtype=np.int64)
+    keep = amounts > 0
+    user_ids, amounts = user_ids[keep], amounts[keep]
+    if not len(amounts):
+        return 0
+    indexes = intern_users(user_ids)
+
+    with _lock:
+        unique_indexes, first_positions = np.unique(indexes, return_index=True)
+        for index, position in zip(unique_indexes.tolist(), first_positions.tolist()):
+            _open_account(index, int(user_ids[position]))
+
+        # 每條流水的變動後餘額：入賬前餘額 + 同一用戶在本批中到該條為止的累計金額
+        order = np.argsort(indexes, kind="stable")
+        sorted_indexes, sorted_amounts = indexes[order], amounts[order]
+        running = np.cumsum(sorted_amounts)
+        group_start = np.flatnonzero(np.r_[True, sorted_indexes[1:] != sorted_indexes[:-1]])
+        group_offset = np.repeat(running[group_start] - sorted_amounts[group_start], np.diff(np.r_[group_start, len(order)]))
+        balance_after = np.empty_like(amounts)
+        balance_after[order] = _table.take(sorted_indexes) + running - group_offset
+
+        _table.bulk_credit(indexes, amounts)
+        _append_journal_many(user_ids, amounts, balance_after, reason)
+    return len(amounts)
+
+
+def get_ledger_balances(user_ids) -> np.ndarray:
+    """
+    批量獲取用戶餘額（新用戶自動開戶）
+    :param user_ids: 用戶ID序列（列表或 NumPy 數組）
+    :return: 與 user_ids 一一對應的餘額數組（微 USDT，int64）
+    """
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    indexes = intern_users(user_ids)
+    if len(indexes):
+        present = _table.present_view() if int(indexes.max()) < len(_table) else None
+        if present is None or not present[indexes].all():
+            with _lock:
+                for index, user_id in zip(indexes.tolist(), user_ids.tolist()):
+                    _open_account(index, user_id)
+    return _table.take(indexes)
+
+
+def ledger_set_balance(user_id: int, micros: int, reason: str = "adjust") -> None:
+    """
+    直接設置用戶餘額（人工調賬），差額記入流水
+    :param user_id: 用戶ID
+    :param micros: 新餘額（微 USDT）
+    :param reason: 流水原因
+    :raises ValueError: 新餘額為負數或超過 MAX_BALANCE（不做任何變動）
+    """
+    if not 0 <= micros <= MAX_BALANCE:
+        raise ValueError(f"餘額超出範圍: {micros}")
+    index = intern_user(user_id)
+    with _lock:
+        previous = _table.get(index)
+        _table.set(index, micros)
+        _append_journal(user_id, micros - previous, micros, reason)
+
+
+def dump_ledger() -> dict:
+    """取得賬本的數據副本（用於快照；餘額按用戶ID保存，行號不寫入快照，全部為數組複製）"""
+    with _lock:
+        size = len(_table)
+        present = _table.present_view()
+        return {
+            "user_ids": user_ids_view()[:size][present].copy(),
+            "balances": _table.view()[present].copy(),
+            "journal": _journal_columns(0),
+            "reason_names": list(_reason_names),
+            "seq": _journal_seq
+        }
+
+
+def _load_balances(user_ids, balances) -> None:
+    """用 (用戶ID, 餘額) 數組覆蓋餘額表（調用方必須持有 _lock）"""
+    _table.clear()
+    if len(user_ids):
+        _table.bulk_credit(intern_users(user_ids), np.asarray(balances, dtype=np.int64))
+
+
+def load_ledger(data: dict) -> None:
+    """用快照數據覆蓋賬本"""
+    global _journal_seq
+    with _lock:
+        _load_balances(data["user_ids"], data["balances"])
+        _reason_names[:] = data["reason_names"]
+        _reason_codes.clear()
+        _reason_codes.update((name, code) for code, name in enumerate(_reason_names))
+        # 只恢復容量內最新的流水（LEDGER_JOURNAL_MAX_ENTRIES 可能比寫入快照時小）
+        journal = data["journal"]
+        keep = journal["seqs"] > data["seq"] - LEDGER_JOURNAL_MAX_ENTRIES
+        slots = (journal["seqs"][keep] - 1) % LEDGER_JOURNAL_MAX_ENTRIES
+        _journal_times[slots] = journal["times"][keep]
+        _journal_users[slots] = journal["user_ids"][keep]
+        _journal_deltas[slots] = journal["deltas"][keep]
+        _journal_balances[slots] = journal["balances"][keep]
+        _journal_reasons[slots] = journal["reasons"][keep]
+        _journal_seq = data["seq"]
+
+
+__all__ = [
+    'MICROS_PER_USDT',
+    'INITIAL_BALANCE_MICROS',
+    'to_micros',
+    'from_micros',
+    'get_ledger_balance',
+    'ledger_debit_if_sufficient',
+    'ledger_credit',
+    'ledger_credit_many',
+    'get_ledger_balances',
+    'ledger_set_balance',
+    'dump_ledger',
+    'load_ledger'
+]
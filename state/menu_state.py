@@ -12,19 +12,6 @@ user_menu_state: dict[int, str] = {}
 user_previous_state: dict[int, str] = {}
 
 
-# 用於追蹤用戶的日統計報表日期（格式：YYYY-MM-DD）
-# key: user_id, value: 日期字符串
-user_report_date: dict[int, str] = {}
-
-# 用於追蹤用戶當前查看的遊戲類型（用於日統計報表）
-# key: user_id, value: 遊戲名稱或 "总计"
-user_report_game: dict[int, str] = {}
-
-# 用於追蹤用戶的日統計報表消息ID（用於編輯消息）
-# key: user_id, value: message_id
-user_report_message_id: dict[int, int] = {}
-
-
 def get_user_state(user_id: int) -> str:
     """獲取用戶當前狀態，默認為首頁"""
     return user_menu_state.get(user_id, "home")
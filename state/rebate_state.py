@@ -0,0 +1,60 @@
+"""
+狀態管理模組 - rebate_state
+返水結算進度：開始結算時保存整批待入賬的 (用戶ID, 返水) 數組，之後分批入賬，每批入賬後記錄已完成的條目數，
+與餘額一起寫入快照，重啟後按保存的數組從中斷處繼續（不重新計算），已入賬的返水不會重複發放，也不會漏發
+"""
+
+import numpy as np
+
+# 返水結算進度
+# key: 結算日期（"YYYY-MM-DD"）,
+# value: (已入賬的用戶數, 需要入賬的用戶數, 用戶ID數組, 返水數組（微 USDT）)，全部入賬後數組為 None
+rebate_progress: dict[str, tuple[int, int, np.ndarray | None, np.ndarray | None]] = {}
+
+
+def start_rebate_settlement(date: str, user_ids: np.ndarray, rebates: np.ndarray) -> None:
+    """記錄某一天開始結算返水，保存整批待入賬的用戶和金額"""
+    if not len(user_ids):
+        user_ids = rebates = None
+    rebate_progress[date] = (0, 0 if user_ids is None else len(user_ids), user_ids, rebates)
+
+
+def get_rebate_pending(date: str) -> tuple[int, np.ndarray, np.ndarray] | None:
+    """
+    獲取某一天未完成的返水結算
+    :return: (已入賬的用戶數, 用戶ID數組, 返水數組)，未開始或已全部入賬時返回 None
+    """
+    progress = rebate_progress.get(date)
+    if progress is None or progress[2] is None:
+        return None
+    return progress[0], progress[2], progress[3]
+
+
+def get_rebate_progress(date: str) -> tuple[int, int] | None:
+    """獲取某一天的返水結算進度 (已入賬的用戶數, 需要入賬的用戶數)，未開始時返回 None"""
+    progress = rebate_progress.get(date)
+    return None if progress is None else (progress[0], progress[1])
+
+
+def set_rebate_progress(date: str, credited: int) -> None:
+    """記錄某一天的返水已入賬用戶數（全部入賬後釋放保存的數組）"""
+    _, total, user_ids, rebates = rebate_progress[date]
+    if credited >= total:
+        user_ids = rebates = None
+    rebate_progress[date] = (credited, total, user_ids, rebates)
+
+
+def is_rebate_settled(date: str) -> bool:
+    """某一天的返水是否已全部入賬"""
+    progress = rebate_progress.get(date)
+    return progress is not None and progress[0] >= progress[1]
+
+
+__all__ = [
+    'rebate_progress',
+    'start_rebate_settlement',
+    'get_rebate_pending',
+    'get_rebate_progress',
+    'set_rebate_progress',
+    'is_rebate_settled'
+]
@@ -0,0 +1,182 @@
+"""
+狀態管理模組 - referral
+推廣關係：每個用戶最多一個上級，所有關係組成一片森林，按用戶行號（state/user_index.py）存放在數組中：
+- 上級行號（沒有上級為 -1）和層級（沒有上級為 0，即上級的層數）
+- 直屬下級數、團隊人數（所有下級）、團隊投注金額（所有下級的投注合計）
+綁定上級和投注開獎時沿上級鏈增量更新團隊統計（O(層數)，開獎時整批用戶按層同步向上一次向量運算），
+查詢任何用戶的上級、層級和團隊統計都是 O(1)，不需要遍歷下級
+行號不寫入快照：快照按用戶ID保存上級關係和團隊投注金額，恢復時重新計算其餘數組
+只在事件循環上讀寫，不加鎖
+"""
+
+import numpy as np
+
+from state.user_index import intern_user, intern_users, lookup_user_index, get_user_id_at, user_ids_view
+
+_NO_PARENT = -1
+
+# 按行號存放的數組（容量不足時翻倍，新行的上級為 -1、其他為 0）
+_parent = np.full(1024, _NO_PARENT, dtype=np.int64)
+_depth = np.zeros(1024, dtype=np.int32)
+_direct_count = np.zeros(1024, dtype=np.int64)
+_downline_count = np.zeros(1024, dtype=np.int64)
+_downline_volume = np.zeros(1024, dtype=np.int64)
+
+
+def _ensure_capacity(size: int) -> None:
+    """確保數組可以存放前 size 行"""
+    global _parent, _depth, _direct_count, _downline_count, _downline_volume
+    capacity = len(_parent)
+    if size <= capacity:
+        return
+    while capacity < size:
+        capacity *= 2
+
+    def grow(array: np.ndarray, fill: int) -> np.ndarray:
+        grown = np.full(capacity, fill, dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    _parent = grow(_parent, _NO_PARENT)
+    _depth = grow(_depth, 0)
+    _direct_count = grow(_direct_count, 0)
+    _downline_count = grow(_downline_count, 0)
+    _downline_volume = grow(_downline_volume, 0)
+
+
+def _ancestors(index: int):
+    """從上級開始依次返回上級鏈上的行號"""
+    current = int(_parent[index]) if index < len(_parent) else _NO_PARENT
+    while current != _NO_PARENT:
+        yield current
+        current = int(_parent[current])
+
+
+def _attach(index: int, parent_index: int) -> None:
+    """把一行掛到上級下面，並把它（及其團隊）計入整條上級鏈的團隊人數"""
+    _parent[index] = parent_index
+    _depth[index] = _depth[parent_index] + 1
+    _direct_count[parent_index] += 1
+    team = 1 + int(_downline_count[index])
+    for ancestor in _ancestors(index):
+        _downline_count[ancestor] += team
+
+
+def bind_referrer(user_id: int, referrer_id: int) -> bool:
+    """
+    綁定用戶的上級（每個用戶只能綁定一次）
+    :param user_id: 用戶ID
+    :param referrer_id: 上級的用戶ID
+    :return: 是否綁定成功（已有上級、綁定自己或會形成循環時返回 False）
+    """
+    if user_id == referrer_id:
+        return False
+    index = intern_user(user_id)
+    parent_index = intern_user(referrer_id)
+    _ensure_capacity(max(index, parent_index) + 1)
+    if _parent[index] != _NO_PARENT:
+        return False
+    if any(ancestor == index for ancestor in _ancestors(parent_index)):
+        return False
+    _attach(index, parent_index)
+    return True
+
+
+def record_referral_volume(user_ids: np.ndarray, volumes: np.ndarray) -> None:
+    """
+    把一批用戶的投注金額計入各自上級鏈上所有用戶的團隊投注（整批按層同步向上，每層一次向量運算）
+    :param user_ids: 用戶ID數組（每個用戶只出現一次）
+    :param volumes: 各用戶的投注金額（微 USDT）
+    """
+    if not len(user_ids):
+        return
+    indexes = intern_users(user_ids)
+    _ensure_capacity(int(indexes.max()) + 1)
+    volumes = np.asarray(volumes, dtype=np.int64)
+    current = _parent[indexes]
+    while True:
+        bound = current != _NO_PARENT
+        if not bound.any():
+            return
+        current, volumes = current[bound], volumes[bound]
+        np.add.at(_downline_volume, current, volumes)
+        current = _parent[current]
+
+
+def get_referrer(user_id: int) -> int | None:
+    """獲取用戶的上級ID，沒有上級時返回 None"""
+    index = lookup_user_index(user_id)
+    if index is None or index >= len(_parent) or _parent[index] == _NO_PARENT:
+        return None
+    return get_user_id_at(int(_parent[index]))
+
+
+def get_referral_stats(user_id: int) -> dict[str, int]:
+    """
+    獲取用戶的推廣統計，O(1)
+    :param user_id: 用戶ID
+    :return: {"depth": 上級層數, "direct_count": 直屬下級數, "downline_count": 團隊人數,
+              "downline_volume": 團隊投注金額（微 USDT）}
+    """
+    index = lookup_user_index(user_id)
+    if index is None or index >= len(_parent):
+        return {"depth": 0, "direct_count": 0, "downline_count": 0, "downline_volume": 0}
+    return {
+        "depth": int(_depth[index]),
+        "direct_count": int(_direct_count[index]),
+        "downline_count": int(_downline_count[index]),
+        "downline_volume": int(_downline_volume[index])
+    }
+
+
+def dump_referrals() -> dict:
+    """取得推廣關係的數據副本（用於快照，按用戶ID保存，行號到用戶ID的轉換為一次數組索引）"""
+    user_ids = user_ids_view()
+    bound = np.flatnonzero(_parent != _NO_PARENT)
+    with_volume = np.flatnonzero(_downline_volume)
+    return {
+        "user_ids": user_ids[bound],
+        "referrer_ids": user_ids[_parent[bound]],
+        "volume_user_ids": user_ids[with_volume],
+        "downline_volumes": _downline_volume[with_volume].copy()
+    }
+
+
+def load_referrals(data: dict) -> None:
+    """用快照數據覆蓋推廣關係，並重新計算層級和團隊人數"""
+    _parent.fill(_NO_PARENT)
+    _depth.fill(0)
+    _direct_count.fill(0)
+    _downline_count.fill(0)
+    _downline_volume.fill(0)
+    indexes = intern_users(data["user_ids"])
+    parent_indexes = intern_users(data["referrer_ids"])
+    volume_indexes = intern_users(data["volume_user_ids"])
+    _ensure_capacity(int(max(indexes.max(initial=0), parent_indexes.max(initial=0), volume_indexes.max(initial=0))) + 1)
+
+    # 先填入上級，再按層級從上到下計算層數，最後從下到上累加團隊人數
+    _parent[indexes] = parent_indexes
+    np.add.at(_direct_count, parent_indexes, 1)
+    pending = indexes
+    while len(pending):
+        parents = _parent[pending]
+        # 上級已經計算好（沒有上級，或上級的層數已確定）的行先計算
+        ready = (_parent[parents] == _NO_PARENT) | (_depth[parents] > 0)
+        if not ready.any():
+            break
+        _depth[pending[ready]] = _depth[parents[ready]] + 1
+        pending = pending[~ready]
+    order = indexes[np.argsort(-_depth[indexes], kind="stable")]
+    for index in order.tolist():
+        _downline_count[_parent[index]] += 1 + _downline_count[index]
+    _downline_volume[volume_indexes] = data["downline_volumes"]
+
+
+__all__ = [
+    'bind_referrer',
+    'record_referral_volume',
+    'get_referrer',
+    'get_referral_stats',
+    'dump_referrals',
+    'load_referrals'
+]
@@ -0,0 +1,479 @@
+"""
+狀態管理模組 - report_rollup
+報表的預聚合計數：投注、派彩、充值、提款事件發生時按 (用戶, 日期, 遊戲) 增量累加，
+每個桶是一個 int64 指標數組，「总计」桶隨每個事件同步累加
+日桶按列存放（每個 (用戶, 日期, 遊戲) 一行），寫入快照只需複製數組；超過保留天數的日桶由後台任務每天刪除
+月桶同樣增量累加，不隨日桶刪除，與日桶一起寫入快照
+另外為每個 (用戶, 遊戲) 維護有數據的日期的累計前綴（稀疏），任意日期範圍的合計是兩次二分查找和一次相減
+每個事件同時記入全平台的合計（PLATFORM_ROLLUP_ID）和活躍賬號草圖（state/active_users.py），供營運報表使用，
+投注另外記入排行榜（state/leaderboard.py）和上級鏈的團隊投注（state/referral.py）
+查看任意日/月/日期範圍、任意遊戲（包括「总计」）的報表都不需要掃描歷史
+只在事件循環上讀寫，不加鎖
+"""
+
+import asyncio
+import logging
+from datetime import date as date_type, datetime, timedelta
+
+import numpy as np
+
+from state.active_users import record_active_users
+from state.leaderboard import record_leaderboard
+from state.referral import record_referral_volume
+
+# 日桶和日期範圍報表的保留天數（含今天；更早的日桶被刪除，月桶不受影響），可在 config.py 中覆蓋
+try:
+    from config import REPORT_DAILY_RETENTION_DAYS
+except ImportError:
+    REPORT_DAILY_RETENTION_DAYS = 400
+
+logger = logging.getLogger(__name__)
+
+# 指標下標（金額為微 USDT）
+METRIC_BET_AMOUNT = 0
+METRIC_BET_COUNT = 1
+METRIC_PAYOUT = 2
+METRIC_DEPOSIT = 3
+METRIC_WITHDRAW = 4
+METRIC_TRANSFER_COUNT = 5
+METRIC_COUNT = 6
+
+# 「总计」桶的名稱（充值和提款不屬於任何遊戲，只記入「总计」）
+REPORT_TOTAL = "总计"
+
+# 全平台合計使用的用戶ID（不會是真實的 Telegram 用戶ID）
+PLATFORM_ROLLUP_ID = 0
+
+# 日桶的各列（前 _daily_count 行有效，容量不足時翻倍）：指標、用戶ID、日期（date.toordinal()）、遊戲代碼
+_daily_metrics = np.zeros((1024, METRIC_COUNT), dtype=np.int64)
+_daily_users = np.zeros(1024, dtype=np.int64)
+_daily_days = np.zeros(1024, dtype=np.int32)
+_daily_games = np.zeros(1024, dtype=np.int16)
+_daily_count = 0
+
+# 日桶索引
+# key: (user_id, "YYYY-MM-DD"), value: {遊戲名稱或 "总计": 行號}
+_daily: dict[tuple[int, str], dict[str, int]] = {}
+
+# 遊戲名稱（含「总计」）：代碼 -> 名稱，名稱 -> 代碼
+_game_names: list[str] = []
+_game_codes: dict[str, int] = {}
+
+# 月桶
+# key: (user_id, "YYYY-MM"), value: {遊戲名稱或 "总计": 指標數組}
+_monthly: dict[tuple[int, str], dict[str, np.ndarray]] = {}
+
+# 沒有數據時返回的全零指標
+_EMPTY = np.zeros(METRIC_COUNT, dtype=np.int64)
+_EMPTY.flags.writeable = False
+
+
+class _PrefixSeries:
+    """
+    一個 (用戶, 遊戲) 的累計指標，只在有數據的日期存一行（稀疏）：
+    days[i] 為第 i 個有數據的日期，rows[i] 為截至該日期（含）的合計；查詢任意日期時二分查找，O(log n)
+    按日期順序追加（通常是最後一天，O(1)），容量不足時翻倍
+    """
+
+    __slots__ = ("days", "rows", "length")
+
+    def __init__(self):
+        self.days = np.zeros(8, dtype=np.int32)
+        self.rows = np.zeros((8, METRIC_COUNT), dtype=np.int64)
+        self.length = 0
+
+    def add(self, day: int, metrics: np.ndarray) -> None:
+        """把某一天的指標累加進去（date.toordinal()；更早的日期需要更新其後所有行）"""
+        length = self.length
+        if length and self.days[length - 1] == day:
+            self.rows[length - 1] += metrics
+            return
+        position = length if not length or self.days[length - 1] < day else int(np.searchsorted(self.days[:length], day))
+        if position < length and self.days[position] == day:
+            self.rows[position:length] += metrics
+            return
+        if length >= len(self.days):
+            days = np.zeros(len(self.days) * 2, dtype=np.int32)
+            rows = np.zeros((len(self.days) * 2, METRIC_COUNT), dtype=np.int64)
+            days[:length] = self.days[:length]
+            rows[:length] = self.rows[:length]
+            self.days, self.rows = days, rows
+        # 插入新日期：累計值為前一行加上當天，其後所有行加上當天
+        self.days[position + 1:length + 1] = self.days[position:length]
+        self.rows[position + 1:length + 1] = self.rows[position:length] + metrics
+        self.days[position] = day
+        self.rows[position] = metrics if position == 0 else self.rows[position - 1] + metrics
+        self.length = length + 1
+
+    def cumulative(self, day: int) -> np.ndarray:
+        """截至某一天（含）的累計指標，O(log n)"""
+        position = int(np.searchsorted(self.days[:self.length], day, side="right")) - 1
+        if position < 0:
+            return _EMPTY
+        return self.rows[position]
+
+    def prune(self, before: int) -> None:
+        """刪除 before（date.toordinal()）之前的日期，之後的累計值改為從 before 起算"""
+        drop = int(np.searchsorted(self.days[:self.length], before))
+        if not drop:
+            return
+        keep = self.length - drop
+        self.rows[:keep] = self.rows[drop:self.length] - self.rows[drop - 1]
+        self.days[:keep] = self.days[drop:self.length]
+        self.length = keep
+
+
+# 按天累計的前綴數組
+# key: (user_id, 遊戲名稱或 "总计"), value: _PrefixSeries
+_prefix: dict[tuple[int, str], _PrefixSeries] = {}
+
+# 每天的日桶行號（按日期批量讀取時使用，如返水計算）
+# key: "YYYY-MM-DD", value: 行號列表
+_day_rows: dict[str, list[int]] = {}
+
+# 每個用戶的報表數據版本（每記錄一個事件加一，用於判斷已生成的報表是否過期）
+# key: user_id, value: 版本號
+_versions: dict[int, int] = {}
+
+
+def _game_code(game: str) -> int:
+    """遊戲名稱的代碼（新名稱依次分配）"""
+    code = _game_codes.get(game)
+    if code is None:
+        code = _game_codes[game] = len(_game_names)
+        _game_names.append(game)
+    return code
+
+
+def _new_daily_row(user_id: int, date: str, ordinal: int, game: str) -> int:
+    """為 (用戶, 日期, 遊戲) 分配一個全零的日桶行"""
+    global _daily_metrics, _daily_users, _daily_days, _daily_games, _daily_count
+    row = _daily_count
+    if row >= len(_daily_users):
+        capacity = len(_daily_users) * 2
+
+        def grow(array: np.ndarray) -> np.ndarray:
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:row] = array[:row]
+            return grown
+
+        _daily_metrics = grow(_daily_metrics)
+        _daily_users = grow(_daily_users)
+        _daily_days = grow(_daily_days)
+        _daily_games = grow(_daily_games)
+    _daily_users[row] = user_id
+    _daily_days[row] = ordinal
+    _daily_games[row] = _game_code(game)
+    _daily_count = row + 1
+    _day_rows.setdefault(date, []).append(row)
+    return row
+
+
+def _add_to_daily(user_id: int, date: str, ordinal: int, game: str, metrics: np.ndarray) -> None:
+    """把指標累加到日桶的遊戲行和「总计」行"""
+    games = _daily.get((user_id, date))
+    if games is None:
+        games = _daily[(user_id, date)] = {}
+    names = (REPORT_TOTAL,) if game == REPORT_TOTAL else (game, REPORT_TOTAL)
+    for name in names:
+        row = games.get(name)
+        if row is None:
+            row = games[name] = _new_daily_row(user_id, date, ordinal, name)
+        _daily_metrics[row] += metrics
+
+
+def _add_to_bucket(buckets: dict[tuple[int, str], dict[str, np.ndarray]], key: tuple[int, str], game: str, metrics: np.ndarray) -> None:
+    """把指標累加到一個月桶的遊戲行和「总计」行"""
+    games = buckets.get(key)
+    if games is None:
+        games = buckets[key] = {}
+    names = (REPORT_TOTAL,) if game == REPORT_TOTAL else (game, REPORT_TOTAL)
+    for name in names:
+        row = games.get(name)
+        if row is None:
+            games[name] = metrics.copy()
+        else:
+            row += metrics
+
+
+def _add_to_prefix(user_id: int, ordinal: int, game: str, metrics: np.ndarray) -> None:
+    """把指標累加到遊戲和「总计」的前綴數組"""
+    names = (REPORT_TOTAL,) if game == REPORT_TOTAL else (game, REPORT_TOTAL)
+    for name in names:
+        series = _prefix.get((user_id, name))
+        if series is None:
+            series = _prefix[(user_id, name)] = _PrefixSeries()
+        series.add(ordinal, metrics)
+
+
+def _record(user_id: int, when: datetime, game: str, metrics: np.ndarray) -> None:
+    """把一個事件的指標記入日桶、月桶和前綴數組"""
+    _versions[user_id] = _versions.get(user_id, 0) + 1
+    day = when.strftime("%Y-%m-%d")
+    ordinal = when.toordinal()
+    _add_to_daily(user_id, day, ordinal, game, metrics)
+    _add_to_bucket(_monthly, (user_id, day[:7]), game, metrics)
+    _add_to_prefix(user_id, ordinal, game, metrics)
+
+
+def record_round_bets(user_ids: np.ndarray, stakes: np.ndarray, payouts: np.ndarray, game: str, when: datetime) -> None:
+    """
+    記錄一個輪次已開獎的投注（同一用戶的多注先合併，每個用戶只更新一次）
+    :param user_ids: 用戶ID數組（同一用戶可以出現多次）
+    :param stakes: 投注金額數組（微 USDT）
+    :param payouts: 彩金數組（微 USDT，未中獎為 0）
+    :param game: 遊戲名稱
+    :param when: 開獎時間
+    """
+    if not len(user_ids):
+        return
+    unique_ids, inverse = np.unique(user_ids, return_inverse=True)
+    merged = np.zeros((len(unique_ids), METRIC_COUNT), dtype=np.int64)
+    np.add.at(merged[:, METRIC_BET_AMOUNT], inverse, stakes)
+    np.add.at(merged[:, METRIC_BET_COUNT], inverse, 1)
+    np.add.at(merged[:, METRIC_PAYOUT], inverse, payouts)
+    for user_id, metrics in zip(unique_ids.tolist(), merged):
+        _record(user_id, when, game, metrics)
+    _record(PLATFORM_ROLLUP_ID, when, game, merged.sum(axis=0))
+    record_active_users(unique_ids, (game, REPORT_TOTAL), when)
+    record_leaderboard(unique_ids, merged[:, METRIC_BET_AMOUNT], merged[:, METRIC_PAYOUT], (game, REPORT_TOTAL), when)
+    record_referral_volume(unique_ids, merged[:, METRIC_BET_AMOUNT])
+
+
+def _record_transfer(user_id: int, when: datetime, metrics: np.ndarray) -> None:
+    """記錄一筆充值或提款（只記入「总计」）"""
+    _record(user_id, when, REPORT_TOTAL, metrics)
+    _record(PLATFORM_ROLLUP_ID, when, REPORT_TOTAL, metrics)
+    record_active_users(np.array([user_id], dtype=np.int64), (REPORT_TOTAL,), when)
+
+
+def record_deposit(user_id: int, micros: int, when: datetime | None = None) -> None:
+    """
+    記錄一筆到賬的充值
+    :param user_id: 用戶ID
+    :param micros: 充值金額（微 USDT）
+    :param when: 到賬時間，默認取當前時間
+    """
+    metrics = np.zeros(METRIC_COUNT, dtype=np.int64)
+    metrics[METRIC_DEPOSIT] = micros
+    metrics[METRIC_TRANSFER_COUNT] = 1
+    _record_transfer(user_id, when or datetime.now(), metrics)
+
+
+def record_withdrawal(user_id: int, micros: int, when: datetime | None = None) -> None:
+    """
+    記錄一筆已送出的提款
+    :param user_id: 用戶ID
+    :param micros: 提款金額（微 USDT）
+    :param when: 提款時間，默認取當前時間
+    """
+    metrics = np.zeros(METRIC_COUNT, dtype=np.int64)
+    metrics[METRIC_WITHDRAW] = micros
+    metrics[METRIC_TRANSFER_COUNT] = 1
+    _record_transfer(user_id, when or datetime.now(), metrics)
+
+
+def get_rollup_version(user_id: int) -> int:
+    """用戶的報表數據版本（數據有變化時遞增）"""
+    return _versions.get(user_id, 0)
+
+
+def get_daily_rollup(user_id: int, date: str, game: str = REPORT_TOTAL) -> np.ndarray:
+    """
+    獲取用戶一天的報表指標，O(1)（超出保留天數的日期沒有數據）
+    :param user_id: 用戶ID
+    :param date: 日期（YYYY-MM-DD）
+    :param game: 遊戲名稱或「总计」
+    :return: 指標數組（只讀，下標見 METRIC_*）
+    """
+    games = _daily.get((user_id, date))
+    if games is None or game not in games:
+        return _EMPTY
+    metrics = _daily_metrics[games[game]]
+    metrics.flags.writeable = False
+    return metrics
+
+
+def get_monthly_rollup(user_id: int, month: str, game: str = REPORT_TOTAL) -> np.ndarray:
+    """
+    獲取用戶一個月的報表指標，O(1)
+    :param user_id: 用戶ID
+    :param month: 月份（YYYY-MM）
+    :param game: 遊戲名稱或「总计」
+    :return: 指標數組（只讀，下標見 METRIC_*）
+    """
+    games = _monthly.get((user_id, month))
+    if games is None:
+        return _EMPTY
+    return games.get(game, _EMPTY)
+
+
+def get_range_rollup(user_id: int, start_date: str, end_date: str, game: str = REPORT_TOTAL) -> np.ndarray:
+    """
+    獲取用戶一個日期範圍（含首尾）的報表指標，O(log n)：截至 end_date 的累計減去截至 start_date 前一天的累計
+    超出保留天數的部分沒有數據（按 0 計）
+    :param user_id: 用戶ID
+    :param start_date: 開始日期（YYYY-MM-DD）
+    :param end_date: 結束日期（YYYY-MM-DD）
+    :param game: 遊戲名稱或「总计」
+    :return: 指標數組（下標見 METRIC_*）
+    :raises ValueError: 日期格式錯誤
+    """
+    start = date_type.fromisoformat(start_date).toordinal()
+    end = date_type.fromisoformat(end_date).toordinal()
+    series = _prefix.get((user_id, game))
+    if series is None or end < start:
+        return _EMPTY
+    return series.cumulative(end) - series.cumulative(start - 1)
+
+
+def get_daily_bet_volumes(date: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    獲取某一天所有用戶在各遊戲的投注金額（不含「总计」和全平台合計），只讀取當天的日桶行
+    :param date: 日期（YYYY-MM-DD）
+    :return: (用戶ID數組, 遊戲名稱數組, 投注金額數組（微 USDT）)，均為副本，按 (用戶ID, 遊戲代碼) 排序
+    """
+    rows = np.asarray(_day_rows.get(date, ()), dtype=np.int64)
+    rows = rows[
+        (_daily_users[rows] != PLATFORM_ROLLUP_ID)
+        & (_daily_games[rows] != _game_codes.get(REPORT_TOTAL, -1))
+        & (_daily_metrics[rows, METRIC_BET_AMOUNT] > 0)
+    ]
+    rows = rows[np.lexsort((_daily_games[rows], _daily_users[rows]))]
+    return (
+        _daily_users[rows],
+        np.array(_game_names, dtype=object)[_daily_games[rows]],
+        _daily_metrics[rows, METRIC_BET_AMOUNT]
+    )
+
+
+def prune_report_rollup(before: str) -> int:
+    """
+    刪除某一天之前的日桶，並把前綴數組改為從該天起算（月桶保留）
+    :param before: 保留的第一天（YYYY-MM-DD）
+    :return: 刪除的日桶行數
+    """
+    global _daily_count
+    count = _daily_count
+    keep = _daily_days[:count] >= date_type.fromisoformat(before).toordinal()
+    removed = count - int(np.count_nonzero(keep))
+    if not removed:
+        return 0
+
+    # 壓縮各列，並把索引中的行號換成壓縮後的行號
+    new_rows = np.cumsum(keep) - 1
+    for column in (_daily_metrics, _daily_users, _daily_days, _daily_games):
+        column[:count - removed] = column[:count][keep]
+    _daily_count = count - removed
+    for key in [key for key in _daily if key[1] < before]:
+        del _daily[key]
+    for games in _daily.values():
+        for game, row in games.items():
+            games[game] = int(new_rows[row])
+    for date in [date for date in _day_rows if date < before]:
+        del _day_rows[date]
+    for date, rows in _day_rows.items():
+        _day_rows[date] = new_rows[rows].tolist()
+
+    ordinal = date_type.fromisoformat(before).toordinal()
+    for key in list(_prefix):
+        series = _prefix[key]
+        series.prune(ordinal)
+        if not series.length:
+            del _prefix[key]
+    return removed
+
+
+async def run_report_rollup_pruner(retention_days: int = REPORT_DAILY_RETENTION_DAYS) -> None:
+    """
+    每天刪除超過保留天數的日桶的後台任務（啟動時先刪除一次）
+    :param retention_days: 保留天數（含今天）
+    """
+    while True:
+        before = (datetime.now() - timedelta(days=retention_days - 1)).strftime("%Y-%m-%d")
+        try:
+            removed = prune_report_rollup(before)
+            if removed:
+                logger.info(f"已刪除 {before} 之前的 {removed} 行日報表數據")
+        except Exception as e:
+            logger.error(f"刪除過期的日報表數據時發生錯誤: {e}", exc_info=True)
+        await asyncio.sleep(24 * 60 * 60)
+
+
+def dump_report_rollup() -> dict:
+    """取得日桶和月桶的數據副本（用於快照，按列存放）"""
+    month_keys = [(user_id, month, game) for (user_id, month), games in _monthly.items() for game in games]
+    return {
+        "user_ids": _daily_users[:_daily_count].copy(),
+        "days": _daily_days[:_daily_count].copy(),
+        "games": _daily_games[:_daily_count].copy(),
+        "game_names": list(_game_names),
+        "metrics": _daily_metrics[:_daily_count].copy(),
+        "monthly_keys": month_keys,
+        "monthly_metrics": np.array(
+            [_monthly[(user_id, month)][game] for user_id, month, game in month_keys], dtype=np.int64
+        ).reshape(-1, METRIC_COUNT)
+    }
+
+
+def load_report_rollup(data: dict) -> None:
+    """用快照數據覆蓋日桶和月桶，並由日桶重新匯總前綴數組（沒有月桶的舊快照由日桶重新匯總月桶）"""
+    global _daily_count
+    _daily.clear()
+    _monthly.clear()
+    _prefix.clear()
+    _day_rows.clear()
+    _game_names[:] = data["game_names"]
+    _game_codes.clear()
+    _game_codes.update((name, code) for code, name in enumerate(_game_names))
+    _daily_count = 0
+    # 按日期順序重建，前綴數組每次都只追加到末尾
+    order = np.argsort(data["days"], kind="stable")
+    user_ids, days, games = data["user_ids"][order], data["days"][order], data["games"][order]
+    metrics = data["metrics"][order]
+    dates = {int(ordinal): date_type.fromordinal(int(ordinal)).isoformat() for ordinal in np.unique(days)}
+    for user_id, ordinal, code, row in zip(user_ids.tolist(), days.tolist(), games.tolist(), metrics):
+        date, game = dates[ordinal], _game_names[code]
+        _daily.setdefault((user_id, date), {})[game] = _new_daily_row(user_id, date, ordinal, game)
+        if "monthly_keys" not in data:
+            month_bucket = _monthly.setdefault((user_id, date[:7]), {})
+            month_row = month_bucket.get(game)
+            if month_row is None:
+                month_bucket[game] = row.copy()
+            else:
+                month_row += row
+        series = _prefix.get((user_id, game))
+        if series is None:
+            series = _prefix[(user_id, game)] = _PrefixSeries()
+        series.add(ordinal, row)
+        # 版本只增不減，恢復前生成的報表一律視為過期
+        _versions[user_id] = _versions.get(user_id, 0) + 1
+    _daily_metrics[:_daily_count] = metrics
+    for (user_id, month, game), row in zip(data.get("monthly_keys", ()), data.get("monthly_metrics", ())):
+        _monthly.setdefault((user_id, month), {})[game] = row.copy()
+
+
+__all__ = [
+    'REPORT_DAILY_RETENTION_DAYS',
+    'METRIC_BET_AMOUNT',
+    'METRIC_BET_COUNT',
+    'METRIC_PAYOUT',
+    'METRIC_DEPOSIT',
+    'METRIC_WITHDRAW',
+    'METRIC_TRANSFER_COUNT',
+    'METRIC_COUNT',
+    'REPORT_TOTAL',
+    'PLATFORM_ROLLUP_ID',
+    'record_round_bets',
+    'record_deposit',
+    'record_withdrawal',
+    'get_rollup_version',
+    'get_daily_rollup',
+    'get_monthly_rollup',
+    'get_range_rollup',
+    'get_daily_bet_volumes',
+    'prune_report_rollup',
+    'run_report_rollup_pruner',
+    'dump_report_rollup',
+    'load_report_rollup'
+]
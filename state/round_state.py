@@ -0,0 +1,99 @@
+"""
+狀態管理模組 - round_state
+哈希輪次的持久狀態，都寫入快照：
+- 當前輪次已扣款、未開獎的投注（按列存放）：進程在兩次開獎之間崩潰時，快照中的餘額已扣除這些投注，
+  恢復時按快照中的投注退款，投注金額不會丟失；開獎回調只在 handlers/round_settlement.py 中按相同順序保存，不寫入快照
+- 最近一個輪次的輪次號和本地哈希鏈的鏈頭（handlers/round_oracle.py 使用）：重啟後輪次號和哈希不會重複
+只在事件循環上讀寫，不加鎖
+"""
+
+from array import array
+
+import numpy as np
+
+# 當前輪次的投注：用戶ID、投注金額（微 USDT），一一對應
+_open_user_ids = array("q")
+_open_stakes = array("q")
+
+# 最近一個輪次的輪次號
+_round_seq = 0
+
+# 本地哈希鏈的鏈頭（下一個輪次使用的哈希），None 表示還沒有開過獎（從種子開始）
+_chain_head: str | None = None
+
+
+def add_open_round_bet(user_id: int, stake_micros: int) -> None:
+    """把一注（已扣款）記入當前輪次"""
+    _open_user_ids.append(user_id)
+    _open_stakes.append(stake_micros)
+
+
+def take_open_round_bets() -> tuple[np.ndarray, np.ndarray]:
+    """
+    取出當前輪次的全部投注並清空（開獎或退款時調用）
+    :return: (用戶ID數組, 投注金額數組（微 USDT）)
+    """
+    user_ids = np.array(_open_user_ids, dtype=np.int64)
+    stakes = np.array(_open_stakes, dtype=np.int64)
+    del _open_user_ids[:]
+    del _open_stakes[:]
+    return user_ids, stakes
+
+
+def dump_open_round() -> dict:
+    """取得當前輪次投注的數據副本（用於快照）"""
+    return {
+        "user_ids": np.array(_open_user_ids, dtype=np.int64),
+        "stakes": np.array(_open_stakes, dtype=np.int64)
+    }
+
+
+def load_open_round(data: dict) -> None:
+    """用快照數據覆蓋當前輪次的投注（恢復後由 restore_state 退款）"""
+    del _open_user_ids[:]
+    del _open_stakes[:]
+    _open_user_ids.extend(data["user_ids"].tolist())
+    _open_stakes.extend(data["stakes"].tolist())
+
+
+def next_round_seq() -> int:
+    """分配下一個輪次號"""
+    global _round_seq
+    _round_seq += 1
+    return _round_seq
+
+
+def get_round_chain_head() -> str | None:
+    """本地哈希鏈的鏈頭（下一個輪次使用的哈希），還沒有開過獎時返回 None"""
+    return _chain_head
+
+
+def set_round_chain_head(head: str) -> None:
+    """記錄本地哈希鏈的鏈頭"""
+    global _chain_head
+    _chain_head = head
+
+
+def dump_round_oracle() -> dict:
+    """取得輪次號和本地哈希鏈鏈頭（用於快照）"""
+    return {"round_seq": _round_seq, "chain_head": _chain_head}
+
+
+def load_round_oracle(data: dict) -> None:
+    """從快照恢復輪次號和本地哈希鏈鏈頭"""
+    global _round_seq, _chain_head
+    _round_seq = data["round_seq"]
+    _chain_head = data["chain_head"]
+
+
+__all__ = [
+    'add_open_round_bet',
+    'take_open_round_bets',
+    'dump_open_round',
+    'load_open_round',
+    'next_round_seq',
+    'get_round_chain_head',
+    'set_round_chain_head',
+    'dump_round_oracle',
+    'load_round_oracle'
+]
@@ -0,0 +1,269 @@
+"""
+狀態管理模組 - snapshot
+將內存中的狀態定期寫入緊湊的二進制快照，啟動時恢復，實現重啟不丟數據
+"""
+
+import asyncio
+import logging
+import os
+import pickle
+import struct
+import time
+import zlib
+from typing import Callable
+
+from state import menu_state, input_state, report_state, user_data, binding_state, withdraw_state, betting_state, ledger, report_rollup, active_users, leaderboard, rebate_state, referral, round_state
+from state.expiry import TRANSIENT_USER_STATE, touch_user_activity
+
+# 快照文件路徑，可在 config.py 中覆蓋
+try:
+    from config import SNAPSHOT_PATH
+except ImportError:
+    SNAPSHOT_PATH = "data/state.snapshot"
+
+# 定期寫入快照的間隔（秒），可在 config.py 中覆蓋
+try:
+    from config import SNAPSHOT_INTERVAL
+except ImportError:
+    SNAPSHOT_INTERVAL = 60
+
+logger = logging.getLogger(__name__)
+
+# 文件頭：魔數、格式版本、壓縮後內容的 CRC32
+SNAPSHOT_MAGIC = b"TGBS"
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct("<4sHI")
+
+# 已註冊的快照分區
+# key: 分區名稱, value: (dump, load)，dump 在事件循環上取得數據副本，load 用快照數據覆蓋內存狀態
+_snapshot_sections: dict[str, tuple[Callable[[], object], Callable[[object], None]]] = {}
+
+# 防止兩次寫入重疊
+_checkpoint_lock = asyncio.Lock()
+
+
+def register_snapshot_section(name: str, dump: Callable[[], object], load: Callable[[object], None]) -> None:
+    """
+    註冊一個快照分區
+    :param name: 分區名稱（寫入快照文件，改名會導致舊快照中的該分區被忽略）
+    :param dump: 返回可序列化的數據副本（在事件循環上調用，必須快速且不與後續修改共享可變對象）
+    :param load: 用快照中的數據覆蓋內存狀態
+    """
+    _snapshot_sections[name] = (dump, load)
+
+
+def register_snapshot_dict(name: str, store: dict, nested: bool = False) -> None:
+    """
+    將一個 user_id 字典註冊為快照分區（恢復時原地更新，保持其他模組持有的引用有效）
+    :param name: 分區名稱
+    :param store: 狀態字典
+    :param nested: 值是否為字典（需要逐個複製，避免寫入線程讀到正在修改的內層字典）
+    """
+    def dump() -> dict:
+        if nested:
+            return {key: dict(value) for key, value in store.items()}
+        return store.copy()
+
+    def load(data: dict) -> None:
+        store.clear()
+        store.update(data)
+
+    register_snapshot_section(name, dump, load)
+
+
+# 持久數據
+register_snapshot_dict("user_account", user_data.user_account)
+register_snapshot_dict("user_password", user_data.user_password)
+register_snapshot_dict("user_login_status", user_data.user_login_status)
+register_snapshot_dict("user_bank_card_number", withdraw_state.user_bank_card_number)
+register_snapshot_dict("user_bank_card_password", withdraw_state.user_bank_card_password)
+register_snapshot_dict("user_wallet_addresses", withdraw_state.user_wallet_addresses, nested=True)
+register_snapshot_section("ledger", ledger.dump_ledger, ledger.load_ledger)
+register_snapshot_section("report_rollup", report_rollup.dump_report_rollup, report_rollup.load_report_rollup)
+register_snapshot_section("active_users", active_users.dump_active_users, active_users.load_active_users)
+register_snapshot_section("leaderboard", leaderboard.dump_leaderboard, leaderboard.load_leaderboard)
+register_snapshot_dict("rebate_progress", rebate_state.rebate_progress)
+register_snapshot_section("referrals", referral.dump_referrals, referral.load_referrals)
+# 已扣款、未開獎的投注（與餘額在同一時刻複製，恢復後退款）
+register_snapshot_section("open_round", round_state.dump_open_round, round_state.load_open_round)
+register_snapshot_section("round_oracle", round_state.dump_round_oracle, round_state.load_round_oracle)
+
+# 菜單和流程狀態（重啟後用戶的底部菜單仍然有效）
+# 自動下注運行狀態和投注確認不寫入：重啟後對應的循環和超時任務已不存在
+register_snapshot_dict("user_menu_state", menu_state.user_menu_state)
+register_snapshot_dict("user_previous_state", menu_state.user_previous_state)
+register_snapshot_dict("user_pending_input", input_state.user_pending_input)
+register_snapshot_dict("user_report_date", report_state.user_report_date)
+register_snapshot_dict("user_report_game", report_state.user_report_game)
+register_snapshot_dict("user_report_message_id", report_state.user_report_message_id)
+register_snapshot_dict("user_monthly_report_month", report_state.user_monthly_report_month)
+register_snapshot_dict("user_monthly_report_message_id", report_state.user_monthly_report_message_id)
+register_snapshot_dict("user_monthly_report_game", report_state.user_monthly_report_game)
+register_snapshot_dict("user_betting_source", betting_state.user_betting_source)
+register_snapshot_dict("user_deposit_withdraw_state", user_data.user_deposit_withdraw_state)
+register_snapshot_dict("user_bank_card_binding_state", binding_state.user_bank_card_binding_state)
+register_snapshot_dict("user_wallet_binding_state", binding_state.user_wallet_binding_state)
+register_snapshot_dict("user_withdrawal_password_state", binding_state.user_withdrawal_password_state)
+register_snapshot_dict("user_withdrawal_password_input", binding_state.user_withdrawal_password_input)
+register_snapshot_dict("user_withdrawal_password_confirm", binding_state.user_withdrawal_password_confirm)
+register_snapshot_dict("user_withdrawal_password_message_id", binding_state.user_withdrawal_password_message_id)
+register_snapshot_dict("user_withdraw_state", withdraw_state.user_withdraw_state)
+register_snapshot_dict("user_withdraw_method", withdraw_state.user_withdraw_method)
+register_snapshot_dict("user_withdraw_amount", withdraw_state.user_withdraw_amount)
+
+
+def capture_snapshot() -> dict[str, object]:
+    """
+    在事件循環上取得所有分區的數據副本（只做字典複製，不做序列化）
+    :return: {分區名稱: 數據}
+    """
+    return {name: dump() for name, (dump, _) in _snapshot_sections.items()}
+
+
+def encode_snapshot(payload: dict[str, object]) -> bytes:
+    """
+    將快照數據編碼為二進制（pickle + zlib，帶文件頭和校驗）
+    :param payload: capture_snapshot() 的返回值
+    :return: 快照文件內容
+    """
+    body = zlib.compress(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL), 1)
+    return _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, zlib.crc32(body)) + body
+
+
+def decode_snapshot(raw: bytes) -> dict[str, object]:
+    """
+    解碼快照文件內容
+    :param raw: 快照文件內容
+    :return: {分區名稱: 數據}
+    :raises ValueError: 文件頭、版本或校驗不正確
+    """
+    if len(raw) < _HEADER.size:
+        raise ValueError("快照文件過短")
+    magic, version, checksum = _HEADER.unpack_from(raw)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("不是有效的快照文件")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"不支持的快照版本: {version}")
+    body = raw[_HEADER.size:]
+    if zlib.crc32(body) != checksum:
+        raise ValueError("快照校驗失敗")
+    return pickle.loads(zlib.decompress(body))
+
+
+def write_snapshot_file(payload: dict[str, object], path: str = SNAPSHOT_PATH) -> int:
+    """
+    原子地寫入快照文件（先寫臨時文件再替換，寫到一半崩潰不會破壞舊快照）
+    在後台線程中調用
+    :param payload: capture_snapshot() 的返回值
+    :param path: 快照文件路徑
+    :return: 寫入的字節數
+    """
+    raw = encode_snapshot(payload)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as snapshot_file:
+        snapshot_file.write(raw)
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(tmp_path, path)
+    return len(raw)
+
+
+async def checkpoint_state(path: str = SNAPSHOT_PATH) -> int:
+    """
+    寫入一次快照：在事件循環上複製數據，序列化和磁盤 IO 在後台線程完成
+    :param path: 快照文件路徑
+    :return: 寫入的字節數
+    """
+    async with _checkpoint_lock:
+        started = time.perf_counter()
+        payload = capture_snapshot()
+        size = await asyncio.to_thread(write_snapshot_file, payload, path)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"已寫入狀態快照: {path}，大小 {size} 字節，耗時 {elapsed_ms:.1f} ms")
+        return size
+
+
+def restore_state(path: str = SNAPSHOT_PATH) -> bool:
+    """
+    啟動時從快照恢復狀態（在 Bot 開始處理更新之前調用）
+    :param path: 快照文件路徑
+    :return: 是否成功恢復
+    """
+    if not os.path.exists(path):
+        logger.info(f"未找到狀態快照，以空狀態啟動: {path}")
+        return False
+
+    started = time.perf_counter()
+    try:
+        with open(path, "rb") as snapshot_file:
+            payload = decode_snapshot(snapshot_file.read())
+    except Exception as e:
+        logger.error(f"讀取狀態快照失敗，以空狀態啟動: {path}, 錯誤: {e}", exc_info=True)
+        return False
+
+    # 恢復前的狀態（啟動時為空狀態）：任何分區恢復失敗時用它覆蓋全部分區，與讀取失敗一樣以空狀態啟動，不留下只恢復了一部分的狀態
+    before = capture_snapshot()
+    for name, data in payload.items():
+        section = _snapshot_sections.get(name)
+        if section is None:
+            logger.warning(f"忽略未知的快照分區: {name}")
+            continue
+        try:
+            section[1](data)
+        except Exception as e:
+            logger.error(f"恢復快照分區 {name} 失敗，以空狀態啟動: {path}, 錯誤: {e}", exc_info=True)
+            for reset_name, reset_data in before.items():
+                _snapshot_sections[reset_name][1](reset_data)
+            return False
+
+    # 快照時仍未開獎的投注：開獎回調已不存在，按快照中的金額退款
+    user_ids, stakes = round_state.take_open_round_bets()
+    if len(user_ids):
+        ledger.ledger_credit_many(user_ids, stakes, "bet_refund")
+        logger.warning(f"已退還快照中 {len(user_ids)} 注未開獎的投注")
+
+    # 恢復的臨時狀態從現在開始計算閒置時間
+    now = time.monotonic()
+    for store in TRANSIENT_USER_STATE:
+        for user_id in store:
+            touch_user_activity(user_id, now)
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        f"已從快照恢復狀態: {path}，{len(payload)} 個分區，"
+        f"{len(user_data.user_account)} 個賬號，耗時 {elapsed_ms:.1f} ms"
+    )
+    return True
+
+
+async def run_snapshot_checkpointer(interval: float = SNAPSHOT_INTERVAL, path: str = SNAPSHOT_PATH) -> None:
+    """
+    定期寫入狀態快照的後台任務
+    :param interval: 寫入間隔（秒）
+    :param path: 快照文件路徑
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await checkpoint_state(path)
+        except Exception as e:
+            logger.error(f"寫入狀態快照時發生錯誤: {e}", exc_info=True)
+
+
+__all__ = [
+    'SNAPSHOT_PATH',
+    'SNAPSHOT_INTERVAL',
+    'register_snapshot_section',
+    'register_snapshot_dict',
+    'capture_snapshot',
+    'encode_snapshot',
+    'decode_snapshot',
+    'write_snapshot_file',
+    'checkpoint_state',
+    'restore_state',
+    'run_snapshot_checkpointer'
+]
@@ -2,6 +2,8 @@
 狀態管理模組 - user_data
 """
 
+from state.input_state import set_user_pending_input, clear_user_pending_input
+
 # 用於追蹤用戶是否在輸入充值/提現金額
 # key: user_id, value: "deposit" | "withdraw" | None
 user_deposit_withdraw_state: dict[int, str | None] = {}
@@ -17,8 +19,10 @@ def set_user_deposit_withdraw_state(user_id: int, state: str | None) -> None:
     if state is None:
         if user_id in user_deposit_withdraw_state:
             del user_deposit_withdraw_state[user_id]
+        clear_user_pending_input(user_id, "deposit_withdraw")
     else:
         user_deposit_withdraw_state[user_id] = state
+        set_user_pending_input(user_id, "deposit_withdraw")
 
 
 # 用於存儲用戶的網投平台賬號
@@ -0,0 +1,88 @@
+"""
+狀態管理模組 - user_index
+把稀疏的 64 位 Telegram 用戶ID映射為從 0 開始連續的行號，供按行存放的數組表（餘額等）使用
+行號只在進程內有效：需要持久化的數據按用戶ID保存，恢復時重新分配行號
+"""
+
+import threading
+
+import numpy as np
+
+# 用戶ID -> 行號
+_index_by_user: dict[int, int] = {}
+
+# 行號 -> 用戶ID（容量不足時翻倍）
+_user_ids = np.zeros(1024, dtype=np.int64)
+_count = 0
+
+# 分配新行號時加鎖（賬本可能在後台線程中被調用）
+_lock = threading.Lock()
+
+
+def intern_user(user_id: int) -> int:
+    """
+    獲取用戶的行號，新用戶分配下一個行號
+    :param user_id: 用戶ID
+    :return: 行號
+    """
+    index = _index_by_user.get(user_id)
+    if index is not None:
+        return index
+    global _user_ids, _count
+    with _lock:
+        index = _index_by_user.get(user_id)
+        if index is not None:
+            return index
+        index = _count
+        if index >= len(_user_ids):
+            grown = np.zeros(len(_user_ids) * 2, dtype=np.int64)
+            grown[:index] = _user_ids[:index]
+            _user_ids = grown
+        _user_ids[index] = user_id
+        _index_by_user[user_id] = index
+        _count = index + 1
+        return index
+
+
+def intern_users(user_ids) -> np.ndarray:
+    """
+    批量獲取行號（新用戶依次分配）
+    :param user_ids: 用戶ID序列（列表或 NumPy 數組）
+    :return: 行號數組（int64）
+    """
+    get = _index_by_user.get
+    indexes = [get(user_id) for user_id in np.asarray(user_ids, dtype=np.int64).tolist()]
+    if None in indexes:
+        indexes = [intern_user(user_id) for user_id in np.asarray(user_ids, dtype=np.int64).tolist()]
+    return np.asarray(indexes, dtype=np.int64)
+
+
+def lookup_user_index(user_id: int) -> int | None:
+    """獲取用戶的行號，未分配時返回 None（不分配）"""
+    return _index_by_user.get(user_id)
+
+
+def get_user_id_at(index: int) -> int:
+    """根據行號獲取用戶ID"""
+    if not 0 <= index < _count:
+        raise IndexError(f"行號超出範圍: {index}")
+    return int(_user_ids[index])
+
+
+def user_ids_view() -> np.ndarray:
+    """
+    行號 -> 用戶ID 的只讀視圖（零拷貝；之後分配新行號可能使視圖與最新數據脫節，用完即棄）
+    :return: 長度為已分配用戶數的 int64 數組
+    """
+    view = _user_ids[:_count]
+    view.flags.writeable = False
+    return view
+
+
+__all__ = [
+    'intern_user',
+    'intern_users',
+    'lookup_user_index',
+    'get_user_id_at',
+    'user_ids_view'
+]
@@ -2,6 +2,8 @@
 狀態管理模組 - withdraw_state
 """
 
+from state.input_state import set_user_pending_input, clear_user_pending_input
+
 # 用於存儲用戶已綁定的銀行卡號
 # key: user_id, value: 銀行卡號（完整）
 user_bank_card_number: dict[int, str] = {}
@@ -98,8 +100,10 @@ def set_user_withdraw_state(user_id: int, state: str | None) -> None:
     if state is None:
         if user_id in user_withdraw_state:
             del user_withdraw_state[user_id]
+        clear_user_pending_input(user_id, "withdraw")
     else:
         user_withdraw_state[user_id] = state
+        set_user_pending_input(user_id, "withdraw")
 
 
 # 用於存儲用戶選擇的提款方式